@@ -4,22 +4,41 @@ from flask_migrate import Migrate
 from flasgger import Swagger
 from flask_cors import CORS
 from flask_socketio import SocketIO
+from .procedures import ProcedureExecutor
+from .storage import BlobStorage
+from .previews import PreviewPipeline
+from .message_queue import make_client_manager
+from .audit import AuditWriter
+from .metrics import Metrics
 
 db = SQLAlchemy()
 migrate = Migrate()
 socketio = SocketIO()
+procedures = ProcedureExecutor(db)
+blob_storage = BlobStorage(db)
+previews = PreviewPipeline(blob_storage)
+audit = AuditWriter(db)
+metrics = Metrics()
 
 def create_app(config_class='config.DevelopmentConfig'):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # First, so its hooks time everything the others add to a request.
+    metrics.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
-    socketio.init_app(app)
+    procedures.init_app(app)
+    blob_storage.init_app(app)
+    previews.init_app(app)
+    audit.init_app(app)
+    socketio.init_app(app, client_manager=make_client_manager(
+        app.config.get('SOCKETIO_MESSAGE_QUEUE'), channel=app.config.get('SOCKETIO_CHANNEL', 'flask-socketio')))
     CORS(app)
 
     Swagger(app)
 
+    from .routes.auth import auth_bp
     from .routes.usuarios import usuarios_bp
     from .routes.perfiles import perfiles_bp
     from .routes.tareas import tareas_bp
@@ -27,7 +46,16 @@ def create_app(config_class='config.DevelopmentConfig'):
     from .routes.notificaciones import notificaciones_bp
     from .routes.etiquetas import etiquetas_bp
     from .routes.adjuntos import adjuntos_bp
+    from .routes.boards import boards_bp
+    from .routes.search import search_bp
+    from .routes.proyectos import proyectos_bp
+    from .routes.auditoria import auditoria_bp
+    from .routes.admin import admin_bp
+    from .search import search_cli
+    from .stats import stats_cli
+    from .audit_archive import auditoria_cli
 
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(usuarios_bp, url_prefix='/api')
     app.register_blueprint(perfiles_bp, url_prefix='/api')
     app.register_blueprint(tareas_bp, url_prefix='/api')
@@ -35,6 +63,17 @@ def create_app(config_class='config.DevelopmentConfig'):
     app.register_blueprint(notificaciones_bp, url_prefix='/api')
     app.register_blueprint(etiquetas_bp, url_prefix='/api')
     app.register_blueprint(adjuntos_bp, url_prefix='/api')
+    app.register_blueprint(boards_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(proyectos_bp, url_prefix='/api')
+    app.register_blueprint(auditoria_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api')
+    app.cli.add_command(search_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(auditoria_cli)
+
+    from . import events
+    events.init_app(app)
 
     @app.route('/swagger')
     def swagger_ui():
@@ -0,0 +1,207 @@
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+AUDITED_BLUEPRINTS = frozenset(('tareas', 'usuarios', 'perfiles', 'etiquetas', 'adjuntos', 'comentarios',
+                                'notificaciones', 'boards', 'proyectos', 'admin'))
+MUTATING_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+OVERFLOW_POLICIES = ('block', 'drop')
+COUNTERS = ('recorded', 'written', 'dropped', 'failed', 'batches')
+
+
+class _Marker:
+    """Queued by flush() and shutdown(); set once everything before it is written."""
+
+    def __init__(self, stop=False):
+        self.stop = stop
+        self.done = threading.Event()
+
+
+class AuditWriter:
+    """Write AuditLogs rows off the request path.
+
+    ``record`` puts a row on a bounded queue. A worker thread writes rows
+    with one multi-row INSERT once ``batch_size`` of them are waiting or
+    ``flush_interval`` has passed since the oldest one. When the queue is
+    full, ``overflow='block'`` makes the request wait up to
+    ``block_timeout`` for room and ``'drop'`` gives up at once; either way
+    a record that does not fit is counted in ``dropped``. Pending rows are
+    written on interpreter exit.
+
+    An in-memory SQLite database is one connection shared by every thread,
+    so there rows are written in the request instead.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.app = None
+        self.enabled = True
+        self.inline = False
+        self.batch_size = 500
+        self.flush_interval = 0.2
+        self.overflow = 'block'
+        self.block_timeout = 0.05
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(COUNTERS, 0)
+        self._atexit = False
+
+    def init_app(self, app):
+        overflow = app.config.get('AUDIT_OVERFLOW', 'block')
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('AUDIT_OVERFLOW must be one of %s' % ', '.join(OVERFLOW_POLICIES))
+        self.shutdown()
+        self.app = app
+        self.enabled = app.config.get('AUDIT_ENABLED', True)
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', 500)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL_MS', 200) / 1000.0
+        self.overflow = overflow
+        self.block_timeout = app.config.get('AUDIT_BLOCK_TIMEOUT_MS', 50) / 1000.0
+        self._queue = queue.Queue(maxsize=app.config.get('AUDIT_QUEUE_SIZE', 10000))
+        self._counts = dict.fromkeys(COUNTERS, 0)
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        self.inline = uri.startswith('sqlite') and uri.rstrip('/').endswith((':memory:', 'sqlite:'))
+        if 'audit' not in app.extensions:
+            app.after_request(self._after_request)
+        app.extensions['audit'] = self
+
+    def _after_request(self, response):
+        if (request.method in MUTATING_METHODS and request.blueprint in AUDITED_BLUEPRINTS
+                and response.status_code < 400):
+            current_user = g.get('current_user')
+            self.record(request.endpoint, {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'args': request.view_args,
+            }, current_user.UsuarioID if current_user else None)
+        return response
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counts[key] += n
+
+    def record(self, accion, detalles=None, usuario_id=None):
+        """Queue one AuditLogs row. Returns False if it was dropped."""
+        if not self.enabled:
+            return False
+        row = {
+            'UsuarioID': usuario_id,
+            'Accion': accion[:100],
+            'Detalles': json.dumps(detalles, default=str, separators=(',', ':')) if detalles is not None else None,
+            'Fecha': datetime.datetime.utcnow(),
+        }
+        if self.inline:
+            self._count('recorded')
+            self._write([row])
+            return True
+        self._ensure_worker()
+        try:
+            if self.overflow == 'block':
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._count('dropped')
+            logger.warning('Audit queue full; dropped %s', accion)
+            return False
+        self._count('recorded')
+        return True
+
+    def _ensure_worker(self):
+        with self._lock:
+            # A forked worker process inherits the queue but not the thread.
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            if not self._atexit:
+                atexit.register(self.shutdown)
+                self._atexit = True
+
+    def _run(self):
+        batch, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if isinstance(item, _Marker):
+                self._write(batch)
+                batch, deadline = [], None
+                item.done.set()
+                if item.stop:
+                    return
+                continue
+            if item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+
+    def _write(self, rows):
+        if not rows:
+            return
+        from .models import AuditLog
+        table = AuditLog.__table__
+        try:
+            with self.db.get_engine(self.app).begin() as conn:
+                for start in range(0, len(rows), self.batch_size):
+                    conn.execute(table.insert().values(rows[start:start + self.batch_size]))
+        except Exception:
+            self._count('failed', len(rows))
+            logger.exception('Could not write %d audit records', len(rows))
+            return
+        self._count('written', len(rows))
+        self._count('batches')
+
+    def _send(self, marker, timeout):
+        with self._lock:
+            alive = self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+        if not alive:
+            return False
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def flush(self, timeout=10):
+        """Block until every record queued so far is written."""
+        return self._send(_Marker(), timeout)
+
+    def shutdown(self, timeout=10):
+        """Write what is pending and stop the worker."""
+        stopped = self._send(_Marker(stop=True), timeout)
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and stopped:
+            thread.join(timeout)
+        # Whatever the worker did not get to is written here.
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(item, _Marker):
+                rows.append(item)
+        self._write(rows)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, queued=self._queue.qsize())
@@ -0,0 +1,184 @@
+import datetime
+import gzip
+import heapq
+import itertools
+import json
+import os
+import re
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from . import db
+from .filters import audit_logs_query
+from .models import AuditLog
+
+ARCHIVE_NAME = 'auditlogs-%04d-%02d.ndjson.gz'
+ARCHIVE_PATTERN = re.compile(r'^auditlogs-(\d{4})-(\d{2})\.ndjson\.gz$')
+
+
+def log_dict(row):
+    fecha = row.Fecha
+    return {
+        'LogID': row.LogID,
+        'UsuarioID': row.UsuarioID,
+        'Accion': row.Accion,
+        'Detalles': row.Detalles,
+        'Fecha': fecha.isoformat() if fecha is not None else None,
+    }
+
+
+def _key(log):
+    return datetime.datetime.fromisoformat(log['Fecha']), log['LogID']
+
+
+def _month_start(value):
+    return datetime.datetime(value.year, value.month, 1)
+
+
+def _next_month(start):
+    return datetime.datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def archive_dir():
+    return current_app.config.get('AUDIT_ARCHIVE_DIR', 'audit_archive')
+
+
+def archive_months(directory):
+    """Months with an archive file in ``directory``, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    months = []
+    for name in os.listdir(directory):
+        match = ARCHIVE_PATTERN.match(name)
+        if match:
+            months.append(datetime.datetime(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months, reverse=True)
+
+
+def _read(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _matches(log, filters):
+    if 'usuario_id' in filters and log['UsuarioID'] != filters['usuario_id']:
+        return False
+    return 'accion' not in filters or log['Accion'] == filters['accion']
+
+
+def archived_logs(filters, after=None, directory=None):
+    """Archived rows matching ``filters``, newest first.
+
+    Only the monthly files overlapping ``desde``/``hasta`` and older than
+    the cursor are opened. A file is read from its newest row, so a page
+    deep into a month decompresses the rows before it.
+    """
+    directory = directory or archive_dir()
+    desde, hasta = filters.get('desde'), filters.get('hasta')
+    for start in archive_months(directory):
+        if (hasta is not None and start >= hasta) or (desde is not None and _next_month(start) <= desde) \
+                or (after is not None and start > after[0]):
+            continue
+        for log in _read(os.path.join(directory, ARCHIVE_NAME % (start.year, start.month))):
+            key = _key(log)
+            if after is not None and key >= tuple(after):
+                continue
+            if hasta is not None and key[0] >= hasta:
+                continue
+            if desde is not None and key[0] < desde:
+                break
+            if _matches(log, filters):
+                yield log
+
+
+def audit_logs(filters, after=None, limit=None):
+    """Rows of AuditLogs and of the archive merged by (Fecha, LogID), newest first, at most ``limit``.
+
+    The two sources overlap: the audit writer can commit a row dated in a
+    month already archived, and an interrupted compaction leaves rows in
+    both. Rows in both places come out once.
+    """
+    query = audit_logs_query(filters, after, limit)
+    if limit is None:
+        query = query.execution_options(stream_results=True)
+    table = (log_dict(row) for row in db.session.execute(query))
+    logs = _dedupe(heapq.merge(table, archived_logs(filters, after), key=_key, reverse=True))
+    yield from itertools.islice(logs, limit)
+
+
+def retention_cutoff(days, today=None):
+    """First day of the month holding ``today - days``; older rows get archived."""
+    today = today or datetime.date.today()
+    return _month_start(today - datetime.timedelta(days=days))
+
+
+def _write(path, logs):
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        for log in logs:
+            f.write(json.dumps(log, separators=(',', ':')) + '\n')
+    os.replace(tmp, path)
+
+
+def _dedupe(logs):
+    last = None
+    for log in logs:
+        if log['LogID'] != last:
+            yield log
+        last = log['LogID']
+
+
+def compact(before, directory=None):
+    """Move AuditLogs rows older than ``before`` into monthly gzip NDJSON files.
+
+    ``before`` is rounded down to the first of its month so every file
+    holds a whole month. Rows already archived for a month (a row that
+    arrived late, or a run interrupted before the DELETE) are merged with
+    the new ones by LogID. The file is written in full before the rows are
+    deleted, so an interrupted run loses nothing. Returns the number of
+    rows moved per month.
+    """
+    directory = directory or archive_dir()
+    before = _month_start(before)
+    logs = AuditLog.__table__
+    oldest = db.session.execute(select(func.min(logs.c.Fecha)).where(logs.c.Fecha < before)).scalar()
+    moved = {}
+    if oldest is None:
+        return moved
+    os.makedirs(directory, exist_ok=True)
+    start = _month_start(oldest)
+    while start < before:
+        end = _next_month(start)
+        last_id = db.session.execute(select(func.max(logs.c.LogID))
+                                     .where(logs.c.Fecha >= start, logs.c.Fecha < end)).scalar()
+        if last_id is not None:
+            month = {'desde': start, 'hasta': end}
+            query = audit_logs_query(month).where(logs.c.LogID <= last_id)
+            rows = (log_dict(row) for row in db.session.execute(query.execution_options(stream_results=True)))
+            path = os.path.join(directory, ARCHIVE_NAME % (start.year, start.month))
+            if os.path.exists(path):
+                rows = _dedupe(heapq.merge(rows, _read(path), key=_key, reverse=True))
+            _write(path, rows)
+            moved[start.strftime('%Y-%m')] = db.session.execute(
+                logs.delete().where(logs.c.Fecha >= start, logs.c.Fecha < end, logs.c.LogID <= last_id)).rowcount
+            db.session.commit()
+        start = end
+    return moved
+
+
+auditoria_cli = AppGroup('auditoria', help='Audit log retention.')
+
+
+@auditoria_cli.command('compact')
+@click.option('--dias', type=int, default=None,
+              help='Keep this many days in the table (AUDIT_RETENTION_DAYS by default).')
+def compact_command(dias):
+    """Archive audit log months older than the retention period."""
+    if dias is None:
+        dias = current_app.config.get('AUDIT_RETENTION_DAYS', 90)
+    moved = compact(retention_cutoff(dias))
+    for month, count in sorted(moved.items()):
+        click.echo('%s: archived %d rows.' % (month, count))
+    click.echo('Archived %d rows into %s.' % (sum(moved.values()), archive_dir()))
@@ -0,0 +1,121 @@
+import threading
+import time
+
+OVERFLOW_POLICIES = ('flush', 'drop')
+
+
+class _Pending:
+    __slots__ = ('before', 'after', 'rooms', 'deadline')
+
+    def __init__(self, before, after, rooms, deadline):
+        self.before = before
+        self.after = after
+        self.rooms = rooms
+        self.deadline = deadline
+
+
+class TaskEventCoalescer:
+    """Merge the ``update_task`` events of each task within a short window.
+
+    The first update of a task opens a window of ``window`` seconds. Later
+    updates of the same task inside it are merged into one pending entry.
+    When the window closes, a single event goes out with only the fields that
+    differ from the state before the first update. If nothing changed, no
+    event is sent.
+
+    At most ``max_pending`` tasks wait at a time. When a new task would
+    exceed that, the ``'flush'`` policy sends the oldest entry right away and
+    the ``'drop'`` policy discards the new update. A window of 0 sends every
+    update immediately, still as a diff.
+    """
+
+    def __init__(self, emit, window=0.05, max_pending=10000, overflow='flush', start_task=None, sleep=time.sleep):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('overflow must be one of %s' % ', '.join(OVERFLOW_POLICIES))
+        self.emit = emit
+        self.window = window
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self.start_task = start_task or self._start_thread
+        self.sleep = sleep
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flushing = False
+        self._counters = dict.fromkeys(('events_in', 'events_out', 'merged', 'unchanged', 'dropped', 'overflow_flushes'), 0)
+
+    @staticmethod
+    def _start_thread(target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    def submit(self, tarea_id, before, after, rooms):
+        """Queue an update of ``tarea_id`` from the ``before`` to the ``after`` field values."""
+        overflowed = None
+        with self._lock:
+            self._counters['events_in'] += 1
+            pending = self._pending.get(tarea_id)
+            if pending is not None:
+                self._counters['merged'] += 1
+                for field, value in after.items():
+                    pending.before.setdefault(field, before.get(field))
+                pending.after.update(after)
+                pending.rooms.update(rooms)
+                return
+            if self.window > 0 and len(self._pending) >= self.max_pending:
+                if self.overflow == 'drop':
+                    self._counters['dropped'] += 1
+                    return
+                self._counters['overflow_flushes'] += 1
+                oldest = next(iter(self._pending))
+                overflowed = (oldest, self._pending.pop(oldest))
+            entry = _Pending(dict(before), dict(after), set(rooms), time.monotonic() + self.window)
+            if self.window <= 0:
+                ready = [(tarea_id, entry)]
+            else:
+                self._pending[tarea_id] = entry
+                ready = []
+                if not self._flushing:
+                    self._flushing = True
+                    self.start_task(self._run)
+        if overflowed is not None:
+            ready.insert(0, overflowed)
+        self._send(ready)
+
+    def discard(self, tarea_id):
+        """Forget the pending update of a task, e.g. because it was deleted."""
+        with self._lock:
+            self._pending.pop(tarea_id, None)
+
+    def flush(self, now=None):
+        """Send every pending entry whose window closed by ``now``; all of them if None."""
+        with self._lock:
+            due = [(tarea_id, entry) for tarea_id, entry in self._pending.items()
+                   if now is None or entry.deadline <= now]
+            for tarea_id, _ in due:
+                del self._pending[tarea_id]
+        self._send(due)
+
+    def _run(self):
+        while True:
+            self.sleep(self.window)
+            self.flush(time.monotonic())
+            with self._lock:
+                if not self._pending:
+                    self._flushing = False
+                    return
+
+    def _send(self, entries):
+        for tarea_id, entry in entries:
+            changes = {field: value for field, value in entry.after.items() if entry.before.get(field) != value}
+            if not changes:
+                with self._lock:
+                    self._counters['unchanged'] += 1
+                continue
+            self.emit('update_task', {'task': dict(changes, TareaID=tarea_id)}, sorted(entry.rooms))
+            with self._lock:
+                self._counters['events_out'] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, pending=len(self._pending))
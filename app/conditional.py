@@ -0,0 +1,46 @@
+import datetime
+import hashlib
+from flask import request, make_response
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _as_utc(value):
+    # DATETIME columns come back naive; every connection sets its session
+    # time zone to UTC (see Config.SQLALCHEMY_ENGINE_OPTIONS).
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def _matches(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole seconds. Comparing the exact value means a row
+        # changed later within the second the client saw is never reported
+        # as unchanged; such rows are revalidated through their ETag instead.
+        return _as_utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None, weak=False):
+    response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag, last_modified=None, weak=False):
+    """Return a 304 response when the request's validators still match.
+
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 7232.
+    Returns None when the representation has to be sent.
+    """
+    if not _matches(etag, last_modified):
+        return None
+    response = make_response('', 304)
+    return set_validators(response, etag, last_modified, weak=weak)
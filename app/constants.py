@@ -5,5 +5,9 @@ COMMENT_NOT_FOUND = 'Comment not found'
 NOTIFICATION_NOT_FOUND = 'Notification not found'
 TAG_NOT_FOUND = 'Tag not found'
 ATTACHMENT_NOT_FOUND = 'Attachment not found'
+FILE_TOO_LARGE = 'File too large'
+BOARD_NOT_FOUND = 'Board not found'
+PROJECT_NOT_FOUND = 'Project not found'
 INVALID_INPUT = 'Invalid input'
+MOVE_CONFLICT = 'The neighbors of the card changed; reload the column and retry'
 SUCCESS_MESSAGE = 'Operation completed successfully'
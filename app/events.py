@@ -0,0 +1,164 @@
+from flask import request, session
+from flask_socketio import join_room, leave_room, emit
+from . import socketio, db
+from .coalescer import TaskEventCoalescer
+from .metrics import timed
+from .models import Board, Proyecto, Tarea, AsignacionTarea, Invitacion
+from .routes.auth import decode_token
+
+FORBIDDEN = 'Forbidden'
+
+coalescer = None
+
+
+def board_room(board_id):
+    return 'board:%d' % board_id
+
+
+def proyecto_room(proyecto_id):
+    return 'proyecto:%d' % proyecto_id
+
+
+def can_access_board(usuario_id, board_id):
+    """A user may follow a board they own, were invited to by its owner, or
+    have a task assigned in."""
+    board = Board.query.get(board_id)
+    if board is None or usuario_id is None:
+        return False
+    if board.UsuarioPropietarioID == usuario_id:
+        return True
+    asignado = (db.session.query(AsignacionTarea.AsignacionID)
+                .join(Tarea, AsignacionTarea.TareaID == Tarea.TareaID)
+                .join(Proyecto, Tarea.ProyectoID == Proyecto.ProyectoID)
+                .filter(Proyecto.BoardID == board_id, AsignacionTarea.UsuarioID == usuario_id)
+                .first())
+    if asignado is not None:
+        return True
+    invitado = Invitacion.query.filter_by(
+        UsuarioOrigenID=board.UsuarioPropietarioID,
+        UsuarioDestinoID=usuario_id,
+        Estado='aceptada'
+    ).first()
+    return invitado is not None
+
+
+def boards_by_proyecto(proyecto_ids):
+    proyecto_ids = {p for p in proyecto_ids if p is not None}
+    if not proyecto_ids:
+        return {}
+    rows = (db.session.query(Proyecto.ProyectoID, Proyecto.BoardID)
+            .filter(Proyecto.ProyectoID.in_(proyecto_ids)).all())
+    return dict(rows)
+
+
+def task_rooms(proyecto_ids):
+    boards = boards_by_proyecto(proyecto_ids)
+    return [proyecto_room(p) for p in boards] + [board_room(b) for b in set(boards.values())]
+
+
+@timed('socket_emit')
+def _emit(event, payload, rooms):
+    socketio.emit(event, payload, to=rooms)
+
+
+def emit_to_rooms(event, payload, rooms):
+    if rooms:
+        _emit(event, payload, rooms)
+
+
+def emit_task_event(event, payload, proyecto_ids):
+    """Emit a task event to the project and board rooms of ``proyecto_ids``.
+
+    Clients sitting in several of those rooms get the event once.
+    """
+    emit_to_rooms(event, payload, task_rooms(proyecto_ids))
+
+
+def emit_task_update(tarea_id, before, after, proyecto_ids):
+    """Queue an ``update_task`` event carrying only the fields that changed.
+
+    Updates to the same task within SOCKETIO_COALESCE_WINDOW_MS go out as one event.
+    """
+    coalescer.submit(tarea_id, before, after, task_rooms(proyecto_ids))
+
+
+def discard_task_update(tarea_id):
+    coalescer.discard(tarea_id)
+
+
+def emit_tasks_by_board(event, tasks):
+    """Emit one ``{'tasks': [...]}`` event per board for ``(ProyectoID, task)`` pairs."""
+    boards = boards_by_proyecto(proyecto_id for proyecto_id, _ in tasks)
+    grouped = {}
+    for proyecto_id, task in tasks:
+        board_id = boards.get(proyecto_id)
+        if board_id is None:
+            continue
+        rooms, payload = grouped.setdefault(board_id, ({board_room(board_id)}, []))
+        rooms.add(proyecto_room(proyecto_id))
+        payload.append(task)
+    for rooms, payload in grouped.values():
+        _emit(event, {'tasks': payload}, sorted(rooms))
+
+
+def on_connect(auth=None):
+    token = (auth or {}).get('token') or request.args.get('token')
+    if not token:
+        return False
+    try:
+        session['UsuarioID'] = decode_token(token)['UsuarioID']
+    except Exception:
+        return False
+
+
+def on_join_board(data):
+    board_id = (data or {}).get('BoardID')
+    if not isinstance(board_id, int) or not can_access_board(session.get('UsuarioID'), board_id):
+        emit('error', {'message': FORBIDDEN})
+        return
+    join_room(board_room(board_id))
+    emit('joined', {'room': board_room(board_id)})
+
+
+def on_join_proyecto(data):
+    proyecto_id = (data or {}).get('ProyectoID')
+    proyecto = Proyecto.query.get(proyecto_id) if isinstance(proyecto_id, int) else None
+    if proyecto is None or not can_access_board(session.get('UsuarioID'), proyecto.BoardID):
+        emit('error', {'message': FORBIDDEN})
+        return
+    join_room(proyecto_room(proyecto_id))
+    emit('joined', {'room': proyecto_room(proyecto_id)})
+
+
+def on_leave_board(data):
+    board_id = (data or {}).get('BoardID')
+    if isinstance(board_id, int):
+        leave_room(board_room(board_id))
+
+
+def on_leave_proyecto(data):
+    proyecto_id = (data or {}).get('ProyectoID')
+    if isinstance(proyecto_id, int):
+        leave_room(proyecto_room(proyecto_id))
+
+
+def init_app(app):
+    """Bind the socket handlers to the server ``socketio.init_app`` just created
+    and set up the update coalescer from the app config.
+
+    Flask-SocketIO attaches decorated handlers to whichever server exists when
+    the module is imported, so they are registered per application instead.
+    """
+    global coalescer
+    coalescer = TaskEventCoalescer(
+        emit_to_rooms,
+        window=app.config.get('SOCKETIO_COALESCE_WINDOW_MS', 50) / 1000.0,
+        max_pending=app.config.get('SOCKETIO_COALESCE_MAX_PENDING', 10000),
+        overflow=app.config.get('SOCKETIO_COALESCE_OVERFLOW', 'flush'),
+        start_task=socketio.start_background_task,
+        sleep=socketio.sleep)
+    socketio.on_event('connect', on_connect)
+    socketio.on_event('join_board', on_join_board)
+    socketio.on_event('join_proyecto', on_join_proyecto)
+    socketio.on_event('leave_board', on_leave_board)
+    socketio.on_event('leave_proyecto', on_leave_proyecto)
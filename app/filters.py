@@ -0,0 +1,151 @@
+import datetime
+from flask import request
+from sqlalchemy import or_, select
+from .models import Tarea, TareaEtiqueta, AsignacionTarea, AuditLog
+
+ESTADOS = ('pendiente', 'en_proceso', 'completada')
+
+
+def _int_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('Invalid %s' % name)
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError('Invalid %s' % name)
+
+
+def _datetime_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('Invalid %s' % name)
+
+
+def get_tarea_filters(usuario_id):
+    """Read the task filters from the query string.
+
+    ``estado`` takes a comma-separated list, ``usuario_id=me`` stands for
+    ``usuario_id``. Returns a dict holding only the filters that were given,
+    so an empty dict means an unfiltered listing. Raises ValueError on
+    malformed input.
+    """
+    filters = {}
+    estado = request.args.get('estado')
+    if estado is not None:
+        estados = estado.split(',')
+        if not all(e in ESTADOS for e in estados):
+            raise ValueError('Invalid estado')
+        filters['estado'] = estados
+    for name in ('proyecto_id', 'importancia_min', 'importancia_max', 'etiqueta_id'):
+        value = _int_arg(name)
+        if value is not None:
+            filters[name] = value
+    for name in ('vence_desde', 'vence_hasta'):
+        value = _date_arg(name)
+        if value is not None:
+            filters[name] = value
+    if request.args.get('usuario_id') == 'me':
+        filters['usuario_id'] = usuario_id
+    else:
+        value = _int_arg('usuario_id')
+        if value is not None:
+            filters['usuario_id'] = value
+    return filters
+
+
+def tareas_query(filters, after_id=0, limit=None):
+    """Build the single SELECT behind a filtered task listing.
+
+    Rows have the columns of ``SELECT * FROM Tareas`` and are keyset-ordered
+    by TareaID like ObtenerTareasPaginadas. Tags and assignees are semi-joins
+    (``TareaID IN (...)``), so a task matching twice is still returned once.
+    """
+    tareas = Tarea.__table__
+    query = select(tareas).where(tareas.c.TareaID > after_id)
+    if 'proyecto_id' in filters:
+        query = query.where(tareas.c.ProyectoID == filters['proyecto_id'])
+    if 'estado' in filters:
+        query = query.where(tareas.c.Estado.in_(filters['estado']))
+    if 'importancia_min' in filters:
+        query = query.where(tareas.c.Importancia >= filters['importancia_min'])
+    if 'importancia_max' in filters:
+        query = query.where(tareas.c.Importancia <= filters['importancia_max'])
+    if 'vence_desde' in filters:
+        query = query.where(tareas.c.FechaVencimiento >= filters['vence_desde'])
+    if 'vence_hasta' in filters:
+        query = query.where(tareas.c.FechaVencimiento <= filters['vence_hasta'])
+    if 'etiqueta_id' in filters:
+        etiquetas = TareaEtiqueta.__table__
+        query = query.where(tareas.c.TareaID.in_(
+            select(etiquetas.c.TareaID).where(etiquetas.c.EtiquetaID == filters['etiqueta_id'])))
+    if 'usuario_id' in filters:
+        asignaciones = AsignacionTarea.__table__
+        query = query.where(tareas.c.TareaID.in_(
+            select(asignaciones.c.TareaID).where(asignaciones.c.UsuarioID == filters['usuario_id'])))
+    query = query.order_by(tareas.c.TareaID)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def get_audit_filters():
+    """Read the audit log filters from the query string.
+
+    ``desde`` is inclusive and ``hasta`` exclusive; both take an ISO date or
+    datetime. Raises ValueError on malformed input.
+    """
+    filters = {}
+    usuario_id = _int_arg('usuario_id')
+    if usuario_id is not None:
+        filters['usuario_id'] = usuario_id
+    accion = request.args.get('accion')
+    if accion is not None:
+        filters['accion'] = accion
+    for name in ('desde', 'hasta'):
+        value = _datetime_arg(name)
+        if value is not None:
+            filters[name] = value
+    return filters
+
+
+def audit_logs_query(filters, after=None, limit=None):
+    """Build the SELECT behind an audit log listing, newest first.
+
+    ``after`` is the ``(Fecha, LogID)`` of the last row of the previous
+    page. The order matches idx_auditlogs_fecha_log, or
+    idx_auditlogs_usuario_fecha_log when filtering by user, so a page reads
+    ``limit`` index entries past the cursor.
+    """
+    logs = AuditLog.__table__
+    query = select(logs)
+    if 'usuario_id' in filters:
+        query = query.where(logs.c.UsuarioID == filters['usuario_id'])
+    if 'accion' in filters:
+        query = query.where(logs.c.Accion == filters['accion'])
+    if 'desde' in filters:
+        query = query.where(logs.c.Fecha >= filters['desde'])
+    if 'hasta' in filters:
+        query = query.where(logs.c.Fecha < filters['hasta'])
+    if after is not None:
+        fecha, log_id = after
+        # Fecha <= fecha bounds the index range; the OR alone would not.
+        query = query.where(logs.c.Fecha <= fecha, or_(logs.c.Fecha < fecha, logs.c.LogID < log_id))
+    query = query.order_by(logs.c.Fecha.desc(), logs.c.LogID.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
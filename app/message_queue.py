@@ -0,0 +1,73 @@
+import pickle
+import queue
+import threading
+import socketio
+
+DEFAULT_CHANNEL = 'flask-socketio'
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """In-process stand-in for the Redis message queue.
+
+    Every manager on the same channel in this process receives every message,
+    so tests can run several Socket.IO servers as if they were separate
+    workers. Messages are pickled like RedisManager does, which catches
+    payloads that would not survive a real queue. It does not cross process
+    boundaries; use ``redis://`` for that.
+    """
+    name = 'local'
+    _subscribers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, url='local://', channel=DEFAULT_CHANNEL, write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.messages = queue.Queue()
+
+    def initialize(self):
+        if not self.write_only:
+            with self._lock:
+                self._subscribers.setdefault(self.channel, []).append(self.messages)
+        super().initialize()
+
+    def close(self):
+        with self._lock:
+            subscribers = self._subscribers.get(self.channel, [])
+            if self.messages in subscribers:
+                subscribers.remove(self.messages)
+        self.messages.put(None)
+
+    def _publish(self, data):
+        message = pickle.dumps(data)
+        with self._lock:
+            subscribers = list(self._subscribers.get(self.channel, ()))
+        for messages in subscribers:
+            messages.put(message)
+
+    def _listen(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                return
+            yield message
+
+
+def make_client_manager(url, channel=DEFAULT_CHANNEL, write_only=False):
+    """Build the client manager for a SOCKETIO_MESSAGE_QUEUE url.
+
+    Returns None without a url, which keeps the default single-process
+    manager. The schemes are the ones Flask-SocketIO understands plus
+    ``local://``.
+    """
+    if not url:
+        return None
+    if url.startswith('local://'):
+        manager_class = LocalPubSubManager
+    elif url.startswith(('redis://', 'rediss://')):
+        manager_class = socketio.RedisManager
+    elif url.startswith('kafka://'):
+        manager_class = socketio.KafkaManager
+    elif url.startswith('zmq'):
+        manager_class = socketio.ZmqManager
+    else:
+        manager_class = socketio.KombuManager
+    return manager_class(url, channel=channel, write_only=write_only)
@@ -0,0 +1,277 @@
+import bisect
+import functools
+import logging
+import threading
+import time
+from flask import Response, g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = ['%s="%s"' % (name, _label_value(value)) for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+class Histogram:
+    """Prometheus histogram: per label set, a count per bucket, a sum and a count."""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        # bisect_left puts a value equal to a bound in that bound's bucket (le is inclusive).
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def totals(self, labels):
+        """``(count, sum)`` of the observations with ``labels``."""
+        with self._lock:
+            series = self._series.get(labels)
+            return (series[2], series[1]) if series else (0, 0)
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s histogram' % self.name]
+        with self._lock:
+            series = sorted((labels, list(counts), total, n) for labels, (counts, total, n) in self._series.items())
+        for labels, counts, total, n in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (self.name, _labels(self.labels, labels, 'le="%s"' % bound), cumulative))
+            lines.append('%s_sum%s %r' % (self.name, _labels(self.labels, labels), float(total)))
+            lines.append('%s_count%s %d' % (self.name, _labels(self.labels, labels), n))
+        return lines
+
+
+class Counter:
+    """Prometheus counter per label set."""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s counter' % self.name]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend('%s%s %d' % (self.name, _labels(self.labels, labels), value) for labels, value in values)
+        return lines
+
+
+class RequestRecord:
+    """What one request spent, gathered while it runs and observed when it ends."""
+
+    __slots__ = ('start', 'phases', 'db_calls', 'profiling')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.db_calls = 0
+        self.profiling = False
+
+    def add(self, phase, elapsed):
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+
+def current_record():
+    """The RequestRecord of the request being served, or None."""
+    return g.get('_metrics') if has_app_context() else None
+
+
+def timed(phase):
+    """Decorator adding the wrapped call's time to ``phase`` of the current request.
+
+    Outside a request, or with metrics disabled, it only costs the lookup of
+    the record.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            record = current_record()
+            if record is None:
+                return f(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                record.add(phase, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count_db_call():
+    record = current_record()
+    if record is not None:
+        record.db_calls += 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record = current_record()
+    if record is not None:
+        record.db_calls += 1
+        conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_metrics_query_start')
+    if starts:
+        record = current_record()
+        start = starts.pop()
+        if record is not None:
+            record.add('sql', time.perf_counter() - start)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with ``dumps`` counted in the serialization phase."""
+
+    dumps = timed('serialization')(DefaultJSONProvider.dumps)
+
+
+class Metrics:
+    """Per-endpoint request metrics, served at ``/metrics`` in Prometheus text format.
+
+    Each request records its total time, the time spent in each phase
+    (``auth``, ``user_lookup``, ``procedure``, ``sql``, ``validation``,
+    ``serialization``, ``socket_emit``; see ``timed``), how many database
+    calls it made, and its request and response body sizes. Phases can
+    nest, e.g. ``user_lookup`` includes the ``sql`` it runs. Streamed
+    responses are timed until their first byte.
+
+    With ``profile_slow`` set, every request is also sampled by a
+    SamplingProfiler, and the stacks of those slower than ``profile_slow``
+    seconds are written to METRICS_PROFILE_DIR as folded stacks.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.profiler = None
+        self.profile_slow = None
+        self.reset()
+        if app is not None:
+            self.init_app(app)
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        self.requests = Counter('http_requests_total', 'Requests served.', ('endpoint', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Time to serve a request.',
+                                 ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.phases = Histogram('http_request_phase_seconds', 'Time a request spent in each phase.',
+                                ('endpoint', 'phase'), LATENCY_BUCKETS)
+        self.db_calls = Histogram('http_request_db_calls', 'SQL statements and procedure calls per request.',
+                                  ('endpoint',), COUNT_BUCKETS)
+        self.request_size = Histogram('http_request_size_bytes', 'Request body size.', ('endpoint',), SIZE_BUCKETS)
+        self.response_size = Histogram('http_response_size_bytes', 'Response body size, when known.',
+                                       ('endpoint',), SIZE_BUCKETS)
+        self.profiles = Counter('http_slow_request_profiles_total', 'Slow request profiles written.', ('endpoint',))
+        self.collected = (self.requests, self.latency, self.phases, self.db_calls,
+                          self.request_size, self.response_size, self.profiles)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.reset()
+        slow_ms = app.config.get('METRICS_PROFILE_SLOW_MS', 0)
+        if slow_ms:
+            self.profile_slow = slow_ms / 1000.0
+            self.profiler = SamplingProfiler(interval=app.config.get('METRICS_PROFILE_INTERVAL_MS', 5) / 1000.0,
+                                             directory=app.config.get('METRICS_PROFILE_DIR', 'profiles'))
+        else:
+            self.profile_slow = self.profiler = None
+        if not self.enabled or 'metrics' in app.extensions:
+            return
+        app.extensions['metrics'] = self
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.render_response)
+
+    def _before_request(self):
+        if not self.enabled:
+            return
+        record = g._metrics = RequestRecord()
+        if self.profiler is not None:
+            record.profiling = True
+            self.profiler.start()
+
+    def _after_request(self, response):
+        record = g.pop('_metrics', None)
+        if record is None:
+            return response
+        elapsed = time.perf_counter() - record.start
+        endpoint = request.endpoint or 'unmatched'
+        self.requests.inc((endpoint, request.method, response.status_code))
+        self.latency.observe((endpoint, request.method), elapsed)
+        for phase, seconds in record.phases.items():
+            self.phases.observe((endpoint, phase), seconds)
+        self.db_calls.observe((endpoint,), record.db_calls)
+        self.request_size.observe((endpoint,), request.content_length or 0)
+        size = response.calculate_content_length()
+        if size is not None:
+            self.response_size.observe((endpoint,), size)
+        if record.profiling:
+            self._finish_profile(endpoint, elapsed)
+        return response
+
+    def _teardown_request(self, exc=None):
+        # after_request did not run, e.g. an exception escaped the error handlers.
+        record = g.pop('_metrics', None)
+        if record is not None and record.profiling:
+            self.profiler.stop()
+
+    def _finish_profile(self, endpoint, elapsed):
+        counts = self.profiler.stop()
+        if not counts or elapsed < self.profile_slow:
+            return
+        try:
+            path = self.profiler.dump(counts, '%s-%dms' % (endpoint, elapsed * 1000))
+        except OSError:
+            logger.exception('Could not write the profile of a slow %s request', endpoint)
+            return
+        self.profiles.inc((endpoint,))
+        logger.info('Slow %s request (%.0f ms) profiled in %s', endpoint, elapsed * 1000, path)
+
+    def render(self):
+        lines = []
+        for metric in self.collected:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def render_response(self):
+        return Response(self.render(), mimetype=None, content_type=PROMETHEUS_CONTENT_TYPE)
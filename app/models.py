@@ -1,4 +1,6 @@
+from sqlalchemy.dialects import mysql
 from . import db
+from .serialization import model_encoder
 
 USUARIO_ID = 'Usuarios.UsuarioID'
 TAREA_ID = 'Tareas.TareaID'
@@ -53,7 +55,29 @@ class Tarea(db.Model):
     Estado = db.Column(db.Enum('pendiente', 'en_proceso', 'completada'), default='pendiente')
     FechaVencimiento = db.Column(db.Date)
     FechaCreacion = db.Column(db.DateTime, default=db.func.current_timestamp())
-    UltimaActualizacion = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    # Microsecond precision so that ETags change on updates within the same second.
+    UltimaActualizacion = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'),
+                                    default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    __table_args__ = (
+        db.Index('idx_tareas_ultima_actualizacion', 'UltimaActualizacion'),
+        db.Index('idx_tareas_proyecto_estado', 'ProyectoID', 'Estado', 'TareaID'),
+    )
+
+# Task counts per project and open tasks per due date, kept current by the
+# triggers on Tareas (see BasedeDatos.txt and app/stats.py).
+class EstadisticaProyecto(db.Model):
+    __tablename__ = 'EstadisticasProyectos'
+    ProyectoID = db.Column(db.Integer, db.ForeignKey('Proyectos.ProyectoID'), primary_key=True)
+    Total = db.Column(db.Integer, nullable=False, default=0)
+    Pendientes = db.Column(db.Integer, nullable=False, default=0)
+    EnProceso = db.Column(db.Integer, nullable=False, default=0)
+    Completadas = db.Column(db.Integer, nullable=False, default=0)
+
+class VencimientoProyecto(db.Model):
+    __tablename__ = 'VencimientosProyectos'
+    ProyectoID = db.Column(db.Integer, db.ForeignKey('Proyectos.ProyectoID'), primary_key=True)
+    FechaVencimiento = db.Column(db.Date, primary_key=True)
+    Abiertas = db.Column(db.Integer, nullable=False, default=0)
 
 class Columna(db.Model):
     __tablename__ = 'Columnas'
@@ -65,13 +89,20 @@ class TareaColumna(db.Model):
     __tablename__ = 'Tareas_Columnas'
     TareaID = db.Column(db.Integer, db.ForeignKey(TAREA_ID), primary_key=True)
     ColumnaID = db.Column(db.Integer, db.ForeignKey('Columnas.ColumnaID'), primary_key=True)
-    Posicion = db.Column(db.Integer, nullable=False)
+    # Sparse rank (see app/ordering.py): cards sort by Posicion, then TareaID.
+    Posicion = db.Column(db.BigInteger, nullable=False)
+    __table_args__ = (
+        db.Index('idx_tareas_columnas_columna_posicion', 'ColumnaID', 'Posicion'),
+    )
 
 class AsignacionTarea(db.Model):
     __tablename__ = 'AsignacionesTareas'
     AsignacionID = db.Column(db.Integer, primary_key=True)
     TareaID = db.Column(db.Integer, db.ForeignKey(TAREA_ID), nullable=False)
     UsuarioID = db.Column(db.Integer, db.ForeignKey(USUARIO_ID), nullable=False)
+    __table_args__ = (
+        db.Index('idx_asignaciones_usuario_tarea', 'UsuarioID', 'TareaID'),
+    )
 
 class AuditLog(db.Model):
     __tablename__ = 'AuditLogs'
@@ -80,6 +111,10 @@ class AuditLog(db.Model):
     Accion = db.Column(db.String(100), nullable=False)
     Detalles = db.Column(db.Text)
     Fecha = db.Column(db.DateTime, default=db.func.current_timestamp())
+    __table_args__ = (
+        db.Index('idx_auditlogs_fecha_log', 'Fecha', 'LogID'),
+        db.Index('idx_auditlogs_usuario_fecha_log', 'UsuarioID', 'Fecha', 'LogID'),
+    )
 
 class Notificacion(db.Model):
     __tablename__ = 'Notificaciones'
@@ -88,6 +123,16 @@ class Notificacion(db.Model):
     Mensaje = db.Column(db.String(255), nullable=False)
     Fecha = db.Column(db.DateTime, default=db.func.current_timestamp())
     Leida = db.Column(db.Boolean, default=False)
+    __table_args__ = (
+        # The inbox pages by (Fecha, NotificacionID), with or without a Leida filter.
+        db.Index('idx_notificaciones_usuario_fecha', 'UsuarioID', 'Fecha', 'NotificacionID'),
+        db.Index('idx_notificaciones_usuario_leida_fecha', 'UsuarioID', 'Leida', 'Fecha', 'NotificacionID'),
+    )
+
+class ContadorNotificaciones(db.Model):
+    __tablename__ = 'ContadoresNotificaciones'
+    UsuarioID = db.Column(db.Integer, db.ForeignKey(USUARIO_ID), primary_key=True)
+    NoLeidas = db.Column(db.Integer, nullable=False, default=0)
 
 class Comentario(db.Model):
     __tablename__ = 'Comentarios'
@@ -106,6 +151,16 @@ class TareaEtiqueta(db.Model):
     __tablename__ = 'Tareas_Etiquetas'
     TareaID = db.Column(db.Integer, db.ForeignKey(TAREA_ID), primary_key=True)
     EtiquetaID = db.Column(db.Integer, db.ForeignKey('Etiquetas.EtiquetaID'), primary_key=True)
+    __table_args__ = (
+        db.Index('idx_tareas_etiquetas_etiqueta', 'EtiquetaID', 'TareaID'),
+    )
+
+class Blob(db.Model):
+    __tablename__ = 'Blobs'
+    Hash = db.Column(db.String(64), primary_key=True)
+    Tamano = db.Column(db.BigInteger, nullable=False)
+    Referencias = db.Column(db.Integer, nullable=False, default=0)
+    FechaCreacion = db.Column(db.DateTime, default=db.func.current_timestamp())
 
 class Adjunto(db.Model):
     __tablename__ = 'Adjuntos'
@@ -113,3 +168,35 @@ class Adjunto(db.Model):
     TareaID = db.Column(db.Integer, db.ForeignKey(TAREA_ID))
     Archivo = db.Column(db.String(255), nullable=False)
     Fecha = db.Column(db.DateTime, default=db.func.current_timestamp())
+    Nombre = db.Column(db.String(255))
+    Hash = db.Column(db.String(64), db.ForeignKey('Blobs.Hash'), index=True)
+    Tamano = db.Column(db.BigInteger)
+    TipoContenido = db.Column(db.String(100))
+
+class IndiceBusqueda(db.Model):
+    __tablename__ = 'IndiceBusqueda'
+    # Binary collation: accent-insensitive collations would make "año" equal "ano".
+    Termino = db.Column(db.String(40).with_variant(mysql.VARCHAR(40, collation='utf8mb4_bin'), 'mysql'),
+                        primary_key=True)
+    Tipo = db.Column(db.String(10), primary_key=True)
+    DocumentoID = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    Peso = db.Column(db.SmallInteger, nullable=False)
+    __table_args__ = (
+        db.Index('idx_indice_busqueda_documento', 'Tipo', 'DocumentoID'),
+        db.Index('idx_indice_busqueda_termino_peso', 'Termino', 'Peso', 'Tipo', 'DocumentoID'),
+    )
+
+# Documents written since their postings were last updated; see search.sync.
+class IndiceBusquedaPendiente(db.Model):
+    __tablename__ = 'IndiceBusquedaPendientes'
+    Tipo = db.Column(db.String(10), primary_key=True)
+    DocumentoID = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Bumped by every write, so a mark is only cleared if no write came after it was read.
+    Cambios = db.Column(db.Integer, nullable=False, default=1)
+
+# Row -> dict encoders built once from the columns of each model, used by
+# the routes in place of the marshmallow schemas: ``Tarea.to_dict(tarea)``
+# takes an instance or a Core row of the table.
+for _model in (Usuario, PerfilUsuario, Invitacion, Board, Proyecto, Tarea, Columna, AsignacionTarea, AuditLog,
+               Notificacion, Comentario, Etiqueta, Adjunto):
+    _model.to_dict = model_encoder(_model)
@@ -0,0 +1,186 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import func
+from . import db
+from .models import Columna, Tarea, TareaColumna
+
+# Distance between consecutive cards after a rebalance; about 16 moves into
+# the same slot fit before the slot runs out.
+GAP = 2 ** 16
+# Once a move leaves less than this on either side, the column is
+# renumbered in the background.
+REBALANCE_BELOW = 2 ** 6
+
+
+class MoveConflict(Exception):
+    """The neighbors sent by the client are no longer in that order."""
+
+
+def between(lower, upper):
+    """Integer rank strictly between two neighbors, or None if they are adjacent.
+
+    ``None`` neighbors stand for the top and the bottom of the column.
+    """
+    if lower is None and upper is None:
+        return GAP
+    if lower is None:
+        return upper - GAP
+    if upper is None:
+        return lower + GAP
+    if upper - lower < 2:
+        return None
+    return (lower + upper) // 2
+
+
+def _position(columna_id, tarea_id):
+    if tarea_id is None:
+        return None
+    row = (db.session.query(TareaColumna.Posicion)
+           .filter_by(ColumnaID=columna_id, TareaID=tarea_id)
+           .with_for_update().first())
+    if row is None:
+        raise ValueError('Neighbor %d is not in column %d' % (tarea_id, columna_id))
+    return row[0]
+
+
+def _neighbor(columna_id, tarea_id, posicion, below):
+    """Position of the card right below (or above) ``posicion``, skipping ``tarea_id``."""
+    query = db.session.query(TareaColumna.Posicion).filter(TareaColumna.ColumnaID == columna_id,
+                                                          TareaColumna.TareaID != tarea_id)
+    if below:
+        query = query.filter(TareaColumna.Posicion > posicion).order_by(TareaColumna.Posicion)
+    else:
+        query = query.filter(TareaColumna.Posicion < posicion).order_by(TareaColumna.Posicion.desc())
+    row = query.with_for_update().first()
+    return row[0] if row else None
+
+
+def _bottom(columna_id, tarea_id):
+    return (db.session.query(func.max(TareaColumna.Posicion))
+            .filter(TareaColumna.ColumnaID == columna_id, TareaColumna.TareaID != tarea_id)
+            .scalar())
+
+
+def _bounds(columna_id, tarea_id, anterior_id, siguiente_id):
+    """Positions of the cards the moved card goes between; None is an end of the column."""
+    lower = _position(columna_id, anterior_id)
+    upper = _position(columna_id, siguiente_id)
+    if anterior_id is not None and siguiente_id is None:
+        upper = _neighbor(columna_id, tarea_id, lower, below=True)
+    elif siguiente_id is not None and anterior_id is None:
+        lower = _neighbor(columna_id, tarea_id, upper, below=False)
+    elif anterior_id is None:
+        lower = _bottom(columna_id, tarea_id)
+    if lower is not None and upper is not None and lower >= upper:
+        raise MoveConflict('Neighbors are out of order')
+    return lower, upper
+
+
+def rebalance(columna_id, commit=True):
+    """Renumber a column to multiples of GAP, keeping the order of its cards."""
+    tareas = [row[0] for row in (db.session.query(TareaColumna.TareaID)
+                                 .filter_by(ColumnaID=columna_id)
+                                 .order_by(TareaColumna.Posicion, TareaColumna.TareaID)
+                                 .with_for_update())]
+    if tareas:
+        table = TareaColumna.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.ColumnaID == columna_id)
+            .where(table.c.TareaID == db.bindparam('b_TareaID'))
+            .values(Posicion=db.bindparam('b_Posicion')),
+            [{'b_TareaID': tarea_id, 'b_Posicion': (i + 1) * GAP} for i, tarea_id in enumerate(tareas)])
+    if commit:
+        db.session.commit()
+    return len(tareas)
+
+
+def move_tarea(tarea_id, columna_id, anterior_id=None, siguiente_id=None):
+    """Move a card to ``columna_id`` between two neighbors in one row write.
+
+    ``anterior_id`` is the card that ends up right above it and
+    ``siguiente_id`` the one right below; either may be omitted and is then
+    looked up. With neither, the card goes to the bottom. The card leaves
+    any other column it was in. Returns ``(Posicion, ProyectoID)`` or None
+    if the task does not exist. Raises ValueError for a bad column or
+    neighbor and MoveConflict when the neighbors are out of order.
+    """
+    tarea = db.session.query(Tarea.ProyectoID).filter_by(TareaID=tarea_id).first()
+    if tarea is None:
+        return None
+    columna = db.session.query(Columna.ProyectoID).filter_by(ColumnaID=columna_id).first()
+    if columna is None or columna[0] != tarea[0]:
+        raise ValueError('Column %d is not in the project of task %d' % (columna_id, tarea_id))
+    if tarea_id in (anterior_id, siguiente_id):
+        raise ValueError('A task cannot be its own neighbor')
+    try:
+        lower, upper = _bounds(columna_id, tarea_id, anterior_id, siguiente_id)
+        posicion = between(lower, upper)
+        if posicion is None:
+            # No room left between the neighbors: renumber now and look again.
+            rebalance(columna_id, commit=False)
+            lower, upper = _bounds(columna_id, tarea_id, anterior_id, siguiente_id)
+            posicion = between(lower, upper)
+        table = TareaColumna.__table__
+        db.session.execute(table.delete().where(table.c.TareaID == tarea_id).where(table.c.ColumnaID != columna_id))
+        updated = db.session.execute(table.update().where(table.c.TareaID == tarea_id)
+                                     .where(table.c.ColumnaID == columna_id).values(Posicion=posicion)).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(TareaID=tarea_id, ColumnaID=columna_id, Posicion=posicion))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if (lower is not None and posicion - lower < REBALANCE_BELOW) or \
+            (upper is not None and upper - posicion < REBALANCE_BELOW):
+        rebalancer.submit(columna_id)
+    return posicion, tarea[0]
+
+
+class Rebalancer:
+    """Renumber columns on a background thread, at most once per column at a time.
+
+    Moves and rebalances serialize on the FOR UPDATE row locks. SQLite
+    ignores FOR UPDATE, so there the column is renumbered in the request
+    instead.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, columna_id):
+        if db.engine.dialect.name == 'sqlite':
+            rebalance(columna_id)
+            return None
+        app = current_app._get_current_object()
+        with self._lock:
+            if columna_id in self._pending:
+                return None
+            self._pending.add(columna_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rebalance')
+        return self._executor.submit(self._run, app, columna_id)
+
+    def _run(self, app, columna_id):
+        try:
+            with app.app_context():
+                try:
+                    rebalance(columna_id)
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Rebalancing column %d failed', columna_id)
+                    raise
+        finally:
+            with self._lock:
+                self._pending.discard(columna_id)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+rebalancer = Rebalancer()
@@ -0,0 +1,70 @@
+import base64
+import json
+from flask import request
+from .serialization import json_response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values):
+    """Pack the keyset values of the last row into an opaque cursor."""
+    raw = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def get_page_args():
+    """Read ``limit`` and ``after`` from the query string.
+
+    Returns ``(limit, after)`` where ``after`` is the list of keyset values
+    decoded from the cursor, or None for the first page. Raises ValueError on
+    malformed input.
+    """
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('Invalid limit')
+    limit = min(limit, MAX_PAGE_SIZE)
+    after = request.args.get('after')
+    return limit, decode_cursor(after) if after else None
+
+
+def get_id_page_args():
+    """Like get_page_args for listings keyed on a single integer primary key.
+
+    Returns ``(limit, after_id)`` with ``after_id`` 0 for the first page.
+    """
+    limit, after = get_page_args()
+    if after is None:
+        return limit, 0
+    if len(after) != 1 or not isinstance(after[0], int):
+        raise ValueError('Invalid cursor')
+    return limit, after[0]
+
+
+def _first_column(row):
+    return (next(iter(row.values())) if isinstance(row, dict) else row[0],)
+
+
+def page_response(rows, limit, key=_first_column):
+    """Build the paginated JSON body from ``limit + 1`` fetched rows.
+
+    The extra row only tells whether another page exists; it is not returned.
+    By default the cursor is the first column, the primary key of the
+    ``Obtener*Paginados`` procedures.
+    """
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(*key(items[-1]))
+    return json_response({'items': items, 'next_cursor': next_cursor})
@@ -0,0 +1,123 @@
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .cache import TTLCache
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it every preview is a placeholder.
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp')
+DEFAULT_PREVIEW_SIZE = 256
+DEFAULT_FAILED_MAX = 10000
+DEFAULT_FAILED_TTL = 3600
+
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">'
+    '<rect width="100" height="100" rx="8" fill="#e5e7eb"/>'
+    '<text x="50" y="56" font-family="sans-serif" font-size="16" text-anchor="middle" fill="#6b7280">{label}</text>'
+    '</svg>'
+)
+
+
+class PreviewPipeline:
+    """Build JPEG thumbnails of image attachments on a worker pool.
+
+    Uploads call ``submit`` after CrearAdjunto and return immediately. A
+    worker writes ``<blob>.preview.jpg`` next to the blob, so attachments
+    sharing content share the preview. Each hash is queued at most once at a
+    time. A hash whose preview could not be built, e.g. a corrupt image, is
+    not queued again and keeps the placeholder. Failures are remembered in
+    an LRU of PREVIEWS_FAILED_MAX hashes for PREVIEWS_FAILED_TTL seconds, so
+    a hash evicted or expired from it gets one more try.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.enabled = True
+        self.size = DEFAULT_PREVIEW_SIZE
+        self.workers = 2
+        self._executor = None
+        self._pending = set()
+        self._failed = TTLCache(maxsize=DEFAULT_FAILED_MAX, ttl=DEFAULT_FAILED_TTL)
+        self._lock = threading.Lock()
+        self._placeholders = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PREVIEWS_ENABLED', True) and Image is not None
+        self.size = app.config.get('PREVIEWS_SIZE', DEFAULT_PREVIEW_SIZE)
+        self.workers = app.config.get('PREVIEWS_WORKERS', 2)
+        self._failed = TTLCache(maxsize=app.config.get('PREVIEWS_FAILED_MAX', DEFAULT_FAILED_MAX),
+                                ttl=app.config.get('PREVIEWS_FAILED_TTL', DEFAULT_FAILED_TTL))
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='previews')
+        return self._executor
+
+    def wants(self, content_type):
+        return self.enabled and content_type in PREVIEW_TYPES
+
+    def submit(self, blob_hash, content_type):
+        """Queue a thumbnail for ``blob_hash``. Returns the future, or None if nothing was queued."""
+        if not self.wants(content_type) or os.path.exists(self.storage.preview_path(blob_hash)):
+            return None
+        with self._lock:
+            if blob_hash in self._pending or self.has_failed(blob_hash):
+                return None
+            self._pending.add(blob_hash)
+        return self._get_executor().submit(self._run, blob_hash)
+
+    def is_pending(self, blob_hash):
+        with self._lock:
+            return blob_hash in self._pending
+
+    def has_failed(self, blob_hash):
+        return self._failed.get(blob_hash) is not None
+
+    def _run(self, blob_hash):
+        try:
+            self.generate(blob_hash)
+        except Exception:
+            logger.exception('Could not build the preview of blob %s', blob_hash)
+            self._failed.set(blob_hash, True)
+        finally:
+            with self._lock:
+                self._pending.discard(blob_hash)
+
+    def generate(self, blob_hash):
+        target = self.storage.preview_path(blob_hash)
+        with Image.open(self.storage.path(blob_hash)) as image:
+            # Lets the JPEG decoder skip most of the full-size pixels.
+            image.draft('RGB', (self.size, self.size))
+            image.thumbnail((self.size, self.size))
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    image.save(out, 'JPEG', quality=80)
+                os.replace(temp_path, target)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        return target
+
+    def placeholder(self, nombre):
+        """SVG shown while a preview is missing, labelled with the file extension."""
+        # Only letters and digits, so the label never needs escaping inside the SVG.
+        label = re.sub(r'[^A-Z0-9]', '', os.path.splitext(nombre or '')[1].upper())[:4] or 'FILE'
+        if label not in self._placeholders:
+            self._placeholders[label] = PLACEHOLDER_SVG.format(size=self.size, label=label).encode()
+        return self._placeholders[label]
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,296 @@
+import collections
+import datetime
+import logging
+import threading
+import time
+from flask import g, has_app_context
+from .metrics import count_db_call, timed
+from .serialization import description_encoder
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_PREFIXES = ('Obtener',)
+# Positions of the parameters the slow log never shows, per procedure.
+REDACTED_PARAMS = {
+    'CrearUsuario': (5,),
+    'ActualizarUsuario': (6,),
+}
+REDACTED = '[redacted]'
+# Rows whose size is measured; larger results are extrapolated from them.
+SIZE_SAMPLE_ROWS = 20
+
+
+def redact(procedure_name, params):
+    positions = REDACTED_PARAMS.get(procedure_name)
+    if not positions:
+        return list(params)
+    return [REDACTED if i in positions else value for i, value in enumerate(params)]
+
+
+def result_size(rows):
+    """Approximate bytes in ``rows``: text and binary values by length, others as 8.
+
+    Only the first SIZE_SAMPLE_ROWS rows are measured; the rest are assumed
+    to be of the same average size.
+    """
+    size = 0
+    sample = rows[:SIZE_SAMPLE_ROWS]
+    for row in sample:
+        for value in row:
+            size += len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+    return size * len(rows) // len(sample) if sample else 0
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+class PoolMetrics:
+    """Counters about connection checkouts made by the procedure executor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+            self.reused = 0
+
+    def record_checkout(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_total += wait
+            if wait > self.checkout_wait_max:
+                self.checkout_wait_max = wait
+
+    def record_reuse(self):
+        with self._lock:
+            self.reused += 1
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.checkout_wait_total / self.checkouts if self.checkouts else 0.0
+            return {
+                'checkouts': self.checkouts,
+                'reused': self.reused,
+                'checkout_wait_avg_ms': round(avg * 1000, 3),
+                'checkout_wait_max_ms': round(self.checkout_wait_max * 1000, 3),
+            }
+
+
+class ProcedureStats:
+    """Per-procedure call counts, latency, rows and bytes, and a slow call log.
+
+    Percentiles are computed over the last ``samples`` calls of each
+    procedure; counts and totals cover every call since the last ``reset``.
+    Calls taking ``slow_threshold`` seconds or more are logged, with their
+    parameters passed through ``redact``, and the last ``slow_log_size`` of
+    them are kept for ``slow_calls``.
+    """
+
+    def __init__(self, samples=1024, slow_threshold=0.2, slow_log_size=100):
+        self.samples = samples
+        self.slow_threshold = slow_threshold
+        self._lock = threading.Lock()
+        self._slow = collections.deque(maxlen=slow_log_size)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._procedures = {}
+            self._slow.clear()
+
+    def record(self, procedure_name, params, elapsed, rows=0, size=0, failed=False):
+        with self._lock:
+            entry = self._procedures.get(procedure_name)
+            if entry is None:
+                entry = self._procedures[procedure_name] = {
+                    'calls': 0, 'errors': 0, 'rows': 0, 'bytes': 0, 'total': 0.0, 'max': 0.0,
+                    'latencies': collections.deque(maxlen=self.samples),
+                }
+            entry['calls'] += 1
+            entry['errors'] += failed
+            entry['rows'] += rows
+            entry['bytes'] += size
+            entry['total'] += elapsed
+            if elapsed > entry['max']:
+                entry['max'] = elapsed
+            entry['latencies'].append(elapsed)
+        if elapsed >= self.slow_threshold:
+            call = {
+                'procedure': procedure_name,
+                'params': redact(procedure_name, params),
+                'ms': round(elapsed * 1000, 3),
+                'rows': rows,
+                'failed': failed,
+                'at': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            }
+            with self._lock:
+                self._slow.append(call)
+            logger.warning('Slow procedure %s (%.1f ms, %d rows) params=%r',
+                           procedure_name, call['ms'], rows, call['params'])
+
+    def snapshot(self):
+        with self._lock:
+            procedures = {name: dict(entry, latencies=sorted(entry['latencies']))
+                          for name, entry in self._procedures.items()}
+        result = {}
+        for name, entry in sorted(procedures.items()):
+            ordered = entry['latencies']
+            result[name] = {
+                'calls': entry['calls'],
+                'errors': entry['errors'],
+                'rows': entry['rows'],
+                'bytes': entry['bytes'],
+                'mean_ms': round(entry['total'] / entry['calls'] * 1000, 3),
+                'p50_ms': round(_percentile(ordered, 50) * 1000, 3),
+                'p95_ms': round(_percentile(ordered, 95) * 1000, 3),
+                'p99_ms': round(_percentile(ordered, 99) * 1000, 3),
+                'max_ms': round(entry['max'] * 1000, 3),
+            }
+        return result
+
+    def slow_calls(self):
+        """The logged slow calls, newest first."""
+        with self._lock:
+            return list(reversed(self._slow))
+
+
+class ProcedureExecutor:
+    """Runs stored procedures over pooled DB-API connections.
+
+    Inside an app context the raw connection is checked out once and kept in
+    ``g`` so every procedure a handler calls shares it; it goes back to the
+    pool on teardown. Calls whose name starts with one of READ_ONLY_PREFIXES
+    skip the commit. Every call is recorded in ``stats``.
+    """
+
+    def __init__(self, db=None, app=None):
+        self.db = db
+        self.metrics = PoolMetrics()
+        self.stats = ProcedureStats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.stats = ProcedureStats(samples=app.config.get('PROCEDURES_LATENCY_SAMPLES', 1024),
+                                    slow_threshold=app.config.get('PROCEDURES_SLOW_MS', 200) / 1000.0,
+                                    slow_log_size=app.config.get('PROCEDURES_SLOW_LOG_SIZE', 100))
+        app.teardown_appcontext(self.release)
+
+    def _checkout(self):
+        start = time.perf_counter()
+        conn = self.db.engine.raw_connection()
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def connection(self):
+        """Return the connection bound to the current app context."""
+        conn = g.get('_procedure_conn')
+        if conn is None:
+            conn = g._procedure_conn = self._checkout()
+        else:
+            self.metrics.record_reuse()
+        return conn
+
+    def release(self, exc=None):
+        conn = g.pop('_procedure_conn', None)
+        if conn is not None:
+            # The pool rolls back on return, which also ends read snapshots.
+            conn.close()
+
+    @staticmethod
+    def is_read_only(procedure_name):
+        return procedure_name.startswith(READ_ONLY_PREFIXES)
+
+    @timed('procedure')
+    def call(self, procedure_name, params, read_only=None, named=False):
+        """Run a procedure and return its rows.
+
+        Rows are tuples, or dicts keyed by column name with ``named``; the
+        names are read from ``cursor.description`` once per call.
+        """
+        if read_only is None:
+            read_only = self.is_read_only(procedure_name)
+        count_db_call()
+        shared = has_app_context()
+        conn = self.connection() if shared else self._checkout()
+        start = time.perf_counter()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.callproc(procedure_name, params)
+                result = cursor.fetchall()
+                description = cursor.description
+            finally:
+                cursor.close()
+            if not read_only:
+                conn.commit()
+            self.stats.record(procedure_name, params, time.perf_counter() - start, len(result), result_size(result))
+            if named and description:
+                encode = description_encoder(description)
+                result = [encode(row) for row in result]
+            return result
+        except Exception:
+            conn.rollback()
+            self.stats.record(procedure_name, params, time.perf_counter() - start, failed=True)
+            raise
+        finally:
+            if not shared:
+                conn.close()
+
+    def _unbuffered_cursor_args(self):
+        if self.db.engine.dialect.driver == 'pymysql':
+            from pymysql.cursors import SSCursor
+            return (SSCursor,)
+        return ()
+
+    def stream(self, procedure_name, params, batch_size=1000, named=False):
+        """Yield the rows of a read-only procedure in fetchmany batches.
+
+        Uses a dedicated connection, since an unbuffered cursor keeps it busy
+        until the whole result set has been read. ``named`` works as in call.
+        Its stats count only the time spent in the database, not the time
+        the consumer takes between batches.
+        """
+        conn = self._checkout()
+        elapsed, count, size, failed = 0.0, 0, 0, False
+        try:
+            cursor = conn.cursor(*self._unbuffered_cursor_args())
+            try:
+                start = time.perf_counter()
+                cursor.callproc(procedure_name, params)
+                elapsed += time.perf_counter() - start
+                encode = description_encoder(cursor.description) if named and cursor.description else None
+                while True:
+                    start = time.perf_counter()
+                    rows = cursor.fetchmany(batch_size)
+                    elapsed += time.perf_counter() - start
+                    if not rows:
+                        break
+                    count += len(rows)
+                    size += result_size(rows)
+                    if encode is not None:
+                        rows = [encode(row) for row in rows]
+                    yield from rows
+            finally:
+                cursor.close()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            conn.close()
+            self.stats.record(procedure_name, params, elapsed, count, size, failed=failed)
+
+    def pool_status(self):
+        pool = self.db.engine.pool
+        status = {'pool_class': type(pool).__name__}
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            method = getattr(pool, name, None)
+            if callable(method):
+                status[name] = method()
+        status.update(self.metrics.snapshot())
+        return status
@@ -0,0 +1,80 @@
+import collections
+import datetime
+import os
+import re
+import sys
+import threading
+import time
+
+
+def fold(frame):
+    """``frame``'s stack, outermost first, in the collapsed format of flamegraph.pl."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Sample the stacks of the threads serving requests.
+
+    ``start`` registers the calling thread; a sampler thread then reads its
+    stack every ``interval`` seconds until ``stop``, which returns how many
+    times each folded stack was seen. ``dump`` writes those counts as one
+    ``stack count`` line each, which flamegraph.pl, speedscope and inferno
+    read as they are.
+    """
+
+    def __init__(self, interval=0.005, directory='profiles'):
+        self.interval = interval
+        self.directory = directory
+        self.dumped = 0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if not self._active:
+                # Idle until a request starts, so an unused profiler costs nothing.
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, counts in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    counts[fold(frame)] += 1
+
+    def start(self):
+        self._active[threading.get_ident()] = collections.Counter()
+        self._ensure_thread()
+        self._wake.set()
+
+    def stop(self):
+        return self._active.pop(threading.get_ident(), None)
+
+    def dump(self, counts, name):
+        """Write ``counts`` to ``<directory>/<timestamp>-<name>.folded`` and return the path."""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(self.directory, '%s-%s.folded' % (stamp, re.sub(r'[^\w.-]+', '_', name)))
+        with open(path, 'w') as f:
+            for stack, count in counts.most_common():
+                f.write('%s %d\n' % (stack, count))
+        self.dumped += 1
+        return path
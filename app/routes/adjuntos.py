@@ -1,54 +1,115 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
 import os
+from flask import Blueprint, request, jsonify, current_app, make_response
+from werkzeug.utils import send_file
+from .. import blob_storage, previews
+from ..conditional import make_etag, not_modified, set_validators
+from ..storage import BlobTooLarge, CappedStream
 from ..utils import call_procedure
 from app.routes.auth import token_required
 from ..schemas import AdjuntoSchema
+from ..constants import ATTACHMENT_NOT_FOUND, FILE_TOO_LARGE
+from ..serialization import json_response
 
 adjuntos_bp = Blueprint('adjuntos', __name__)
 
 adjunto_schema = AdjuntoSchema()
 adjuntos_schema = AdjuntoSchema(many=True)
 
+# Columns of SELECT * FROM Adjuntos.
+ADJUNTO_COLUMNAS = ('AdjuntoID', 'TareaID', 'Archivo', 'Fecha', 'Nombre', 'Hash', 'Tamano', 'TipoContenido')
+OFFLOAD_MODES = ('x-sendfile', 'x-accel-redirect')
+# Previews never change for a given attachment; placeholders are retried soon.
+PREVIEW_MAX_AGE = 24 * 3600
+PLACEHOLDER_MAX_AGE = 5
+
 @adjuntos_bp.route('/tareas/<int:tarea_id>/adjuntos', methods=['POST'])
 @token_required
-def upload_adjunto(tarea_id):
+def upload_adjunto(current_user, tarea_id):
     """
     Upload Attachment to Task
     ---
     tags:
       - adjuntos
+    consumes:
+      - multipart/form-data
+      - application/octet-stream
     parameters:
+      - in: path
+        name: tarea_id
+        type: integer
+        required: true
       - in: formData
         name: file
         type: file
-        required: true
+        required: false
+        description: The file, when sending a multipart form
+      - in: query
+        name: nombre
+        type: string
+        required: false
+        description: File name, when the request body is the raw file
     responses:
       201:
         description: Attachment uploaded successfully
-        schema:
-          $ref: '#/definitions/Adjunto'
       400:
         description: Invalid input
+      413:
+        description: File too large
     """
-    if 'file' not in request.files:
-        return jsonify({'message': 'No file part'}), 400
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'message': 'No selected file'}), 400
-    if file:
-        filename = secure_filename(file.filename)
-        filepath = os.path.join('uploads', filename)
-        file.save(filepath)
-        call_procedure('CrearAdjunto', [
+    max_length = current_app.config.get('MAX_CONTENT_LENGTH')
+    if max_length is not None and (request.content_length or 0) > max_length:
+        return jsonify({'message': FILE_TOO_LARGE}), 413
+    if max_length is not None and request.content_length is None:
+        # Werkzeug before 2.3 only checks MAX_CONTENT_LENGTH against
+        # Content-Length, so chunked bodies are cut off while being parsed.
+        request.environ['wsgi.input'] = CappedStream(request.environ['wsgi.input'], max_length)
+    if request.mimetype == 'multipart/form-data':
+        try:
+            files = request.files
+        except BlobTooLarge:
+            return jsonify({'message': FILE_TOO_LARGE}), 413
+        if 'file' not in files:
+            return jsonify({'message': 'No file part'}), 400
+        file = files['file']
+        if file.filename == '':
+            return jsonify({'message': 'No selected file'}), 400
+        nombre, tipo, stream = file.filename, file.mimetype, file.stream
+    else:
+        nombre = request.args.get('nombre', '')
+        if not nombre:
+            return jsonify({'message': 'No selected file'}), 400
+        tipo, stream = request.mimetype, request.stream
+    nombre = nombre.replace('\\', '/').rsplit('/', 1)[-1][:255]
+    tipo = tipo or 'application/octet-stream'
+
+    try:
+        blob = blob_storage.receive(stream)
+    except BlobTooLarge:
+        return jsonify({'message': FILE_TOO_LARGE}), 413
+    try:
+        result = call_procedure('CrearAdjunto', [
             tarea_id,
-            filepath
+            blob_storage.relative_path(blob.Hash),
+            nombre,
+            blob.Hash,
+            blob.Tamano,
+            tipo
         ])
-        return jsonify({'message': 'Attachment uploaded successfully'}), 201
+    except Exception:
+        blob_storage.discard(blob)
+        raise
+    blob_storage.commit(blob)
+    previews.submit(blob.Hash, tipo)
+    return jsonify({
+        'message': 'Attachment uploaded successfully',
+        'AdjuntoID': result[0][0],
+        'Hash': blob.Hash,
+        'Tamano': blob.Tamano
+    }), 201
 
 @adjuntos_bp.route('/adjuntos/<int:id>', methods=['GET'])
 @token_required
-def get_adjunto(id):
+def get_adjunto(current_user, id):
     """
     Get an Attachment by ID
     ---
@@ -68,14 +129,148 @@ def get_adjunto(id):
       404:
         description: Attachment not found
     """
-    result = call_procedure('ObtenerAdjuntoPorID', [id])
+    result = call_procedure('ObtenerAdjuntoPorID', [id], named=True)
     if not result:
         return jsonify({'message': 'Attachment not found'}), 404
-    return jsonify(result[0]), 200
+    return json_response(result[0]), 200
+
+@adjuntos_bp.route('/adjuntos/<int:id>/content', methods=['GET'])
+@token_required
+def download_adjunto(current_user, id):
+    """
+    Download the content of an Attachment
+    ---
+    tags:
+      - adjuntos
+    produces:
+      - application/octet-stream
+    parameters:
+      - in: path
+        name: id
+        type: integer
+        required: true
+        description: ID of the attachment
+      - in: header
+        name: Range
+        type: string
+        required: false
+        description: Byte range to resume a download, e.g. bytes=1048576-
+    responses:
+      200:
+        description: The file
+      206:
+        description: The requested byte range
+      304:
+        description: Not modified
+      404:
+        description: Attachment not found
+      416:
+        description: Range not satisfiable
+    """
+    result = call_procedure('ObtenerAdjuntoPorID', [id])
+    if not result:
+        return jsonify({'message': ATTACHMENT_NOT_FOUND}), 404
+    adjunto = dict(zip(ADJUNTO_COLUMNAS, result[0]))
+    if adjunto['Hash']:
+        path, etag = blob_storage.path(adjunto['Hash']), adjunto['Hash']
+    else:
+        # Attachments uploaded before content addressing keep their own path.
+        path, etag = adjunto['Archivo'], True
+    path = os.path.abspath(path)
+    if not os.path.isfile(path):
+        return jsonify({'message': ATTACHMENT_NOT_FOUND}), 404
+
+    offload = current_app.config.get('ADJUNTOS_OFFLOAD')
+    if offload == 'x-accel-redirect' and not adjunto['Hash']:
+        # The nginx location only maps the blob directory.
+        offload = None
+    environ = request.environ
+    if offload in OFFLOAD_MODES:
+        # The front server answers Range requests from the file itself.
+        environ = dict(environ)
+        environ.pop('HTTP_RANGE', None)
+    response = send_file(
+        path,
+        environ,
+        mimetype=adjunto['TipoContenido'] or None,
+        as_attachment=True,
+        download_name=adjunto['Nombre'] or os.path.basename(adjunto['Archivo']),
+        etag=etag,
+        use_x_sendfile=offload in OFFLOAD_MODES,
+        response_class=current_app.response_class
+    )
+    if offload == 'x-accel-redirect' and 'X-Sendfile' in response.headers:
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = (current_app.config['ADJUNTOS_ACCEL_PREFIX'].rstrip('/') + '/'
+                                                 + blob_storage.relative_path(adjunto['Hash']).replace(os.sep, '/'))
+    elif offload is None and response.status_code == 200:
+        # Werkzeug only announces range support when answering a Range request.
+        response.accept_ranges = 'bytes'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@adjuntos_bp.route('/adjuntos/<int:id>/preview', methods=['GET'])
+@token_required
+def preview_adjunto(current_user, id):
+    """
+    Get the preview thumbnail of an Attachment
+    ---
+    tags:
+      - adjuntos
+    produces:
+      - image/jpeg
+      - image/svg+xml
+    parameters:
+      - in: path
+        name: id
+        type: integer
+        required: true
+        description: ID of the attachment
+    responses:
+      200:
+        description: A JPEG thumbnail, or an SVG placeholder while it is not ready or the file is not an image
+      304:
+        description: Not modified
+      404:
+        description: Attachment not found
+    """
+    result = call_procedure('ObtenerAdjuntoPorID', [id])
+    if not result:
+        return jsonify({'message': ATTACHMENT_NOT_FOUND}), 404
+    adjunto = dict(zip(ADJUNTO_COLUMNAS, result[0]))
+    blob_hash = adjunto['Hash']
+    if blob_hash and os.path.isfile(blob_storage.preview_path(blob_hash)):
+        response = send_file(
+            os.path.abspath(blob_storage.preview_path(blob_hash)),
+            request.environ,
+            mimetype='image/jpeg',
+            etag=blob_hash + '-preview',
+            max_age=PREVIEW_MAX_AGE,
+            response_class=current_app.response_class
+        )
+        response.cache_control.public = None
+        response.cache_control.private = True
+        return response
+
+    pending = False
+    if blob_hash and previews.wants(adjunto['TipoContenido']):
+        # Covers previews lost or never built, e.g. after a restart.
+        previews.submit(blob_hash, adjunto['TipoContenido'])
+        pending = previews.is_pending(blob_hash)
+    body = previews.placeholder(adjunto['Nombre'] or adjunto['Archivo'])
+    etag = make_etag('placeholder', body)
+    response = not_modified(etag) or make_response(body)
+    response.mimetype = 'image/svg+xml'
+    set_validators(response, etag)
+    if pending:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = PLACEHOLDER_MAX_AGE
+    response.headers['X-Preview-Status'] = 'pending' if pending else 'placeholder'
+    return response
 
 @adjuntos_bp.route('/adjuntos/<int:id>', methods=['DELETE'])
 @token_required
-def delete_adjunto(id):
+def delete_adjunto(current_user, id):
     """
     Delete an Attachment
     ---
@@ -96,5 +291,7 @@ def delete_adjunto(id):
     result = call_procedure('ObtenerAdjuntoPorID', [id])
     if not result:
         return jsonify({'message': 'Attachment not found'}), 404
-    call_procedure('EliminarAdjunto', [id])
+    blob = call_procedure('EliminarAdjunto', [id])
+    if blob and blob[0][1] == 0:
+        blob_storage.release(blob[0][0])
     return '', 204
@@ -0,0 +1,91 @@
+from flask import Blueprint, jsonify
+from app.routes.auth import admin_required
+from .. import procedures
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/admin/procedures', methods=['GET'])
+@admin_required
+def get_procedure_stats(current_user):
+    """
+    Get Stored Procedure Statistics
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: Per-procedure statistics since the last reset, the slow call log (newest first) and the connection pool status
+        schema:
+          properties:
+            procedures:
+              type: object
+              additionalProperties:
+                type: object
+                properties:
+                  calls:
+                    type: integer
+                  errors:
+                    type: integer
+                  rows:
+                    type: integer
+                  bytes:
+                    type: integer
+                    description: Approximate size of the rows returned
+                  mean_ms:
+                    type: number
+                  p50_ms:
+                    type: number
+                  p95_ms:
+                    type: number
+                  p99_ms:
+                    type: number
+                  max_ms:
+                    type: number
+            slow_calls:
+              type: array
+              items:
+                type: object
+                properties:
+                  procedure:
+                    type: string
+                  params:
+                    type: array
+                    items: {}
+                  ms:
+                    type: number
+                  rows:
+                    type: integer
+                  failed:
+                    type: boolean
+                  at:
+                    type: string
+                    format: date-time
+            pool:
+              type: object
+      403:
+        description: Not an administrator
+    """
+    return jsonify({
+        'procedures': procedures.stats.snapshot(),
+        'slow_calls': procedures.stats.slow_calls(),
+        'pool': procedures.pool_status(),
+    })
+
+@admin_bp.route('/admin/procedures', methods=['DELETE'])
+@admin_required
+def reset_procedure_stats(current_user):
+    """
+    Reset Stored Procedure Statistics
+    Clears the per-procedure statistics, the slow call log and the pool counters.
+    ---
+    tags:
+      - admin
+    responses:
+      200:
+        description: Statistics reset
+      403:
+        description: Not an administrator
+    """
+    procedures.stats.reset()
+    procedures.metrics.reset()
+    return jsonify({'message': 'Procedure statistics reset'}), 200
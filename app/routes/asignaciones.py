@@ -1,18 +1,18 @@
 from flask import Blueprint, request, jsonify
 from ..models import db, AsignacionTarea
 from app.routes.auth import token_required
+from ..serialization import json_response
 from ..schemas import AsignacionTareaSchema
 
 asignaciones_bp = Blueprint('asignaciones', __name__)
 
 asignacion_schema = AsignacionTareaSchema()
-asignaciones_schema = AsignacionTareaSchema(many=True)
 
 @asignaciones_bp.route('/asignaciones', methods=['GET'])
 @token_required
 def get_asignaciones(current_user):
     asignaciones = AsignacionTarea.query.all()
-    return asignaciones_schema.jsonify(asignaciones), 200
+    return json_response([AsignacionTarea.to_dict(asignacion) for asignacion in asignaciones]), 200
 
 @asignaciones_bp.route('/asignaciones', methods=['POST'])
 @token_required
@@ -27,4 +27,4 @@ def create_asignacion(current_user):
     )
     db.session.add(asignacion)
     db.session.commit()
-    return asignacion_schema.jsonify(asignacion), 201
+    return json_response(asignacion.to_dict()), 201
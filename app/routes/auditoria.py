@@ -1,28 +1,92 @@
+import datetime
 from flask import Blueprint, jsonify
-from ..models import db, AuditLog
 from app.routes.auth import token_required
-from ..schemas import AuditLogSchema
+from ..audit_archive import audit_logs
+from ..filters import get_audit_filters
+from ..pagination import get_page_args, page_response
+from ..streaming import get_stream_format, stream_rows
+from ..constants import INVALID_INPUT
 
 auditoria_bp = Blueprint('auditoria', __name__)
 
-audit_log_schema = AuditLogSchema()
-audit_logs_schema = AuditLogSchema(many=True)
+def get_audit_page_args():
+    """Read ``limit`` and the (Fecha, LogID) keyset cursor."""
+    limit, after = get_page_args()
+    if after is None:
+        return limit, None
+    if len(after) != 2 or not isinstance(after[0], str) or not isinstance(after[1], int):
+        raise ValueError('Invalid cursor')
+    return limit, (datetime.datetime.fromisoformat(after[0]), after[1])
 
 @auditoria_bp.route('/auditoria', methods=['GET'])
 @token_required
 def get_audit_logs(current_user):
     """
-    Get All Audit Logs
+    Get Audit Logs
     ---
     tags:
       - auditoria
+    parameters:
+      - in: query
+        name: usuario_id
+        type: integer
+        required: false
+        description: Only logs of this user
+      - in: query
+        name: accion
+        type: string
+        required: false
+        description: Only logs of this action (the endpoint, e.g. tareas.update_tarea)
+      - in: query
+        name: desde
+        type: string
+        format: date-time
+        required: false
+        description: Logs at or after this ISO date or datetime
+      - in: query
+        name: hasta
+        type: string
+        format: date-time
+        required: false
+        description: Logs before this ISO date or datetime
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
+      - in: query
+        name: stream
+        type: string
+        enum: ['ndjson', 'json']
+        required: false
+        description: Stream every matching row as NDJSON or a chunked JSON array instead of one page
     responses:
       200:
-        description: List of audit logs
+        description: Page of audit logs, newest first, archived months included
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/AuditLog'
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/AuditLog'
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
     """
-    logs = AuditLog.query.all()
-    return audit_logs_schema.jsonify(logs), 200
+    try:
+        stream_format = get_stream_format()
+        limit, after = get_audit_page_args()
+        filters = get_audit_filters()
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    if stream_format:
+        return stream_rows(audit_logs(filters), stream_format), 200
+    logs = list(audit_logs(filters, after, limit + 1))
+    return page_response(logs, limit, key=lambda log: (log['Fecha'], log['LogID'])), 200
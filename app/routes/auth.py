@@ -1,12 +1,51 @@
-from flask import Blueprint, request, jsonify, current_app as app
+from flask import Blueprint, request, jsonify, g, current_app as app
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.models import db, Usuario
+from app.cache import TTLCache
+from app.metrics import timed
 import jwt
 import datetime
+from collections import namedtuple
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
 
+AUTH_CACHE_SIZE = 4096
+AUTH_CACHE_TTL = 300
+
+# Authenticated principal cached in place of the ORM row; never carries the hash.
+CurrentUser = namedtuple('CurrentUser', [
+    column.name for column in Usuario.__table__.columns if column.name != 'PasswordHash'
+])
+
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+@timed('auth')
+def decode_token(token):
+    data = token_cache.get(token)
+    if data is None:
+        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+        token_cache.set(token, data, expires_at=data.get('exp'))
+    return data
+
+@timed('user_lookup')
+def load_user(usuario_id, expires_at=None):
+    current_user = user_cache.get(usuario_id)
+    if current_user is None:
+        user = Usuario.query.filter_by(UsuarioID=usuario_id).first()
+        if user is None:
+            return None
+        current_user = CurrentUser(*(getattr(user, field) for field in CurrentUser._fields))
+        user_cache.set(usuario_id, current_user, expires_at=expires_at)
+    return current_user
+
+def invalidate_user(usuario_id):
+    user_cache.invalidate(usuario_id)
+
+def auth_cache_stats():
+    return {'tokens': token_cache.stats(), 'users': user_cache.stats()}
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -14,10 +53,24 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing!'}), 403
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = Usuario.query.filter_by(UsuarioID=data['UsuarioID']).first()
+            data = decode_token(token)
+            current_user = load_user(data['UsuarioID'], expires_at=data.get('exp'))
         except Exception as e:
             return jsonify({'message': 'Token is invalid!', 'error': str(e)}), 403
+        if current_user is None:
+            # A valid token whose user has since been deleted.
+            return jsonify({'message': 'Token is invalid!'}), 403
+        g.current_user = current_user
+        return f(current_user, *args, **kwargs)
+    return decorated
+
+def admin_required(f):
+    """token_required, restricted to the users listed in ADMIN_USUARIO_IDS."""
+    @wraps(f)
+    @token_required
+    def decorated(current_user, *args, **kwargs):
+        if current_user.UsuarioID not in app.config.get('ADMIN_USUARIO_IDS', ()):
+            return jsonify({'message': 'Admin access required'}), 403
         return f(current_user, *args, **kwargs)
     return decorated
 
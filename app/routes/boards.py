@@ -1,18 +1,22 @@
 from flask import Blueprint, request, jsonify
-from ..models import db, Board
+from sqlalchemy import select
+from ..models import db, Board, Proyecto, Columna, Tarea, TareaColumna, Etiqueta, TareaEtiqueta, AsignacionTarea
 from app.routes.auth import token_required
 from ..schemas import BoardSchema
+from ..constants import BOARD_NOT_FOUND
+from ..conditional import make_etag, not_modified, set_validators
+from ..stats import board_stats
+from ..serialization import json_response
 
 boards_bp = Blueprint('boards', __name__)
 
 board_schema = BoardSchema()
-boards_schema = BoardSchema(many=True)
 
 @boards_bp.route('/boards', methods=['GET'])
 @token_required
 def get_boards(current_user):
     boards = Board.query.all()
-    return boards_schema.jsonify(boards), 200
+    return json_response([Board.to_dict(board) for board in boards]), 200
 
 @boards_bp.route('/boards', methods=['POST'])
 @token_required
@@ -27,4 +31,175 @@ def create_board(current_user):
     )
     db.session.add(board)
     db.session.commit()
-    return board_schema.jsonify(board), 201
+    return json_response(board.to_dict()), 201
+
+def build_board_snapshot(board_id):
+    """Load a board with its projects, columns and ordered tasks.
+
+    Every level is fetched with one query joined back to the board, so the
+    number of queries is constant no matter how many tasks the board holds.
+    Returns None when the board does not exist.
+    """
+    board = Board.query.get(board_id)
+    if board is None:
+        return None
+    in_board = Proyecto.BoardID == board_id
+
+    proyectos = Proyecto.query.filter(in_board).order_by(Proyecto.ProyectoID).all()
+    columnas = (Columna.query.join(Proyecto, Columna.ProyectoID == Proyecto.ProyectoID)
+                .filter(in_board).order_by(Columna.ColumnaID).all())
+    # Core rows: the tasks are only encoded, never changed, so skip the identity map.
+    tareas = db.session.execute(select(Tarea.__table__).join(Proyecto, Tarea.ProyectoID == Proyecto.ProyectoID)
+                                .where(in_board)).all()
+    posiciones = (db.session.query(TareaColumna.TareaID, TareaColumna.ColumnaID, TareaColumna.Posicion)
+                  .join(Tarea, TareaColumna.TareaID == Tarea.TareaID)
+                  .join(Proyecto, Tarea.ProyectoID == Proyecto.ProyectoID)
+                  .filter(in_board)
+                  .order_by(TareaColumna.ColumnaID, TareaColumna.Posicion, TareaColumna.TareaID).all())
+    etiquetas = (db.session.query(TareaEtiqueta.TareaID, Etiqueta.EtiquetaID, Etiqueta.Nombre)
+                 .join(Etiqueta, TareaEtiqueta.EtiquetaID == Etiqueta.EtiquetaID)
+                 .join(Tarea, TareaEtiqueta.TareaID == Tarea.TareaID)
+                 .join(Proyecto, Tarea.ProyectoID == Proyecto.ProyectoID)
+                 .filter(in_board).all())
+    asignaciones = (db.session.query(AsignacionTarea.TareaID, AsignacionTarea.UsuarioID)
+                    .join(Tarea, AsignacionTarea.TareaID == Tarea.TareaID)
+                    .join(Proyecto, Tarea.ProyectoID == Proyecto.ProyectoID)
+                    .filter(in_board).all())
+
+    etiquetas_por_tarea = {}
+    for tarea_id, etiqueta_id, nombre in etiquetas:
+        etiquetas_por_tarea.setdefault(tarea_id, []).append({'EtiquetaID': etiqueta_id, 'Nombre': nombre})
+    asignados_por_tarea = {}
+    for tarea_id, usuario_id in asignaciones:
+        asignados_por_tarea.setdefault(tarea_id, []).append(usuario_id)
+
+    tareas_por_id = {}
+    for tarea in tareas:
+        item = Tarea.to_dict(tarea)
+        item['etiquetas'] = etiquetas_por_tarea.get(tarea.TareaID, [])
+        item['asignados'] = asignados_por_tarea.get(tarea.TareaID, [])
+        tareas_por_id[tarea.TareaID] = item
+
+    tareas_por_columna = {}
+    con_columna = set()
+    for tarea_id, columna_id, posicion in posiciones:
+        tareas_por_columna.setdefault(columna_id, []).append(dict(tareas_por_id[tarea_id], Posicion=posicion))
+        con_columna.add(tarea_id)
+
+    columnas_por_proyecto = {}
+    for columna in columnas:
+        item = Columna.to_dict(columna)
+        item['tareas'] = tareas_por_columna.get(columna.ColumnaID, [])
+        columnas_por_proyecto.setdefault(columna.ProyectoID, []).append(item)
+
+    sin_columna_por_proyecto = {}
+    for tarea in tareas:
+        if tarea.TareaID not in con_columna:
+            sin_columna_por_proyecto.setdefault(tarea.ProyectoID, []).append(tareas_por_id[tarea.TareaID])
+
+    snapshot = Board.to_dict(board)
+    snapshot['proyectos'] = []
+    for proyecto in proyectos:
+        item = Proyecto.to_dict(proyecto)
+        item['columnas'] = columnas_por_proyecto.get(proyecto.ProyectoID, [])
+        item['tareas_sin_columna'] = sin_columna_por_proyecto.get(proyecto.ProyectoID, [])
+        snapshot['proyectos'].append(item)
+    return snapshot
+
+def board_version(board_id):
+    """Fingerprint of everything build_board_snapshot returns.
+
+    Tasks are summarized by their count and latest UltimaActualizacion.
+    Card positions, tags and assignees have no timestamp, so their rows are
+    taken as they are, ordered, narrowed to the columns the snapshot shows:
+    any sum or count of them would miss swaps between cards. Returns None
+    when the board does not exist.
+    """
+    board = (db.session.query(Board.BoardID, Board.UsuarioPropietarioID, Board.Titulo)
+             .filter_by(BoardID=board_id).first())
+    if board is None:
+        return None
+    proyecto_ids = db.session.query(Proyecto.ProyectoID).filter(Proyecto.BoardID == board_id)
+    tarea_ids = db.session.query(Tarea.TareaID).filter(Tarea.ProyectoID.in_(proyecto_ids))
+    tareas = (db.session.query(db.func.max(Tarea.UltimaActualizacion), db.func.count(Tarea.TareaID))
+              .filter(Tarea.ProyectoID.in_(proyecto_ids)).one())
+    proyectos = (db.session.query(Proyecto.ProyectoID, Proyecto.Titulo)
+                 .filter(Proyecto.BoardID == board_id).order_by(Proyecto.ProyectoID).all())
+    columnas = (db.session.query(Columna.ColumnaID, Columna.ProyectoID, Columna.ColumnaNombre)
+                .filter(Columna.ProyectoID.in_(proyecto_ids)).order_by(Columna.ColumnaID).all())
+    posiciones = (db.session.query(TareaColumna.TareaID, TareaColumna.ColumnaID, TareaColumna.Posicion)
+                  .filter(TareaColumna.TareaID.in_(tarea_ids))
+                  .order_by(TareaColumna.TareaID, TareaColumna.ColumnaID).all())
+    etiquetas = (db.session.query(TareaEtiqueta.TareaID, TareaEtiqueta.EtiquetaID, Etiqueta.Nombre)
+                 .join(Etiqueta, TareaEtiqueta.EtiquetaID == Etiqueta.EtiquetaID)
+                 .filter(TareaEtiqueta.TareaID.in_(tarea_ids))
+                 .order_by(TareaEtiqueta.TareaID, TareaEtiqueta.EtiquetaID).all())
+    asignaciones = (db.session.query(AsignacionTarea.TareaID, AsignacionTarea.UsuarioID)
+                    .filter(AsignacionTarea.TareaID.in_(tarea_ids))
+                    .order_by(AsignacionTarea.TareaID, AsignacionTarea.UsuarioID).all())
+    return (tuple(board), tuple(tareas), [tuple(p) for p in proyectos], [tuple(c) for c in columnas],
+            [tuple(p) for p in posiciones], [tuple(e) for e in etiquetas], [tuple(a) for a in asignaciones])
+
+@boards_bp.route('/boards/<int:id>/snapshot', methods=['GET'])
+@token_required
+def get_board_snapshot(current_user, id):
+    """
+    Get a Full Board Snapshot
+    ---
+    tags:
+      - boards
+    parameters:
+      - in: path
+        name: id
+        type: integer
+        required: true
+        description: ID of the board
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+    responses:
+      200:
+        description: Board with its projects, columns, ordered tasks, tags and assignees
+      304:
+        description: Not modified since the ETag sent by the client
+      404:
+        description: Board not found
+    """
+    version = board_version(id)
+    if version is None:
+        return jsonify({'message': BOARD_NOT_FOUND}), 404
+    # Columns and links carry no timestamp, so only a weak ETag is offered.
+    etag = make_etag(version)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
+    snapshot = build_board_snapshot(id)
+    if snapshot is None:
+        return jsonify({'message': BOARD_NOT_FOUND}), 404
+    return set_validators(json_response(snapshot), etag, weak=True), 200
+
+@boards_bp.route('/boards/<int:id>/stats', methods=['GET'])
+@token_required
+def get_board_stats(current_user, id):
+    """
+    Get Task Statistics of a Board
+    ---
+    tags:
+      - boards
+    parameters:
+      - in: path
+        name: id
+        type: integer
+        required: true
+        description: ID of the board
+    responses:
+      200:
+        description: Board totals and the statistics of each of its projects
+      404:
+        description: Board not found
+    """
+    stats = board_stats(id)
+    if stats is None:
+        return jsonify({'message': BOARD_NOT_FOUND}), 404
+    return jsonify(stats), 200
@@ -1,18 +1,18 @@
 from flask import Blueprint, request, jsonify
 from ..models import db, Columna
 from app.routes.auth import token_required
+from ..serialization import json_response
 from ..schemas import ColumnaSchema
 
 columnas_bp = Blueprint('columnas', __name__)
 
 columna_schema = ColumnaSchema()
-columnas_schema = ColumnaSchema(many=True)
 
 @columnas_bp.route('/columnas', methods=['GET'])
 @token_required
 def get_columnas(current_user):
     columnas = Columna.query.all()
-    return columnas_schema.jsonify(columnas), 200
+    return json_response([Columna.to_dict(columna) for columna in columnas]), 200
 
 @columnas_bp.route('/columnas', methods=['POST'])
 @token_required
@@ -27,4 +27,4 @@ def create_columna(current_user):
     )
     db.session.add(columna)
     db.session.commit()
-    return columna_schema.jsonify(columna), 201
+    return json_response(columna.to_dict()), 201
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from ..utils import call_procedure
+from ..pagination import get_id_page_args, page_response
+from ..streaming import get_stream_format, stream_procedure
 from app.routes.auth import token_required
 from ..schemas import ComentarioSchema
-from ..constants import COMMENT_NOT_FOUND
+from ..constants import COMMENT_NOT_FOUND, INVALID_INPUT
+from .. import search
+from ..serialization import json_response
 
 comentarios_bp = Blueprint('comentarios', __name__)
 
@@ -11,26 +15,57 @@ comentarios_schema = ComentarioSchema(many=True)
 
 @comentarios_bp.route('/comentarios', methods=['GET'])
 @token_required
-def get_comentarios():
+def get_comentarios(current_user):
     """
     Get All Comments
     ---
     tags:
       - comentarios
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
+      - in: query
+        name: stream
+        type: string
+        enum: ['ndjson', 'json']
+        required: false
+        description: Stream every row as NDJSON or a chunked JSON array instead of one page
     responses:
       200:
-        description: List of comments
+        description: Page of comments
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/Comentario'
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/Comentario'
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
     """
-    result = call_procedure('ObtenerComentarios', [])
-    return jsonify(result), 200
+    try:
+        stream_format = get_stream_format()
+        limit, after_id = get_id_page_args()
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    if stream_format:
+        return stream_procedure('ObtenerComentarios', [], stream_format)
+    result = call_procedure('ObtenerComentariosPaginados', [after_id, limit + 1], named=True)
+    return page_response(result, limit), 200
 
 @comentarios_bp.route('/comentarios/<int:id>', methods=['GET'])
 @token_required
-def get_comentario(id):
+def get_comentario(current_user, id):
     """
     Get a Comment by ID
     ---
@@ -50,14 +85,14 @@ def get_comentario(id):
       404:
         description: Comment not found
     """
-    result = call_procedure('ObtenerComentarioPorID', [id])
+    result = call_procedure('ObtenerComentarioPorID', [id], named=True)
     if not result:
         return jsonify({'message': COMMENT_NOT_FOUND}), 404
-    return jsonify(result[0]), 200
+    return json_response(result[0]), 200
 
 @comentarios_bp.route('/comentarios', methods=['POST'])
 @token_required
-def create_comentario():
+def create_comentario(current_user):
     """
     Create a New Comment
     ---
@@ -88,16 +123,18 @@ def create_comentario():
     errors = comentario_schema.validate(data)
     if errors:
         return jsonify(errors), 400
-    call_procedure('CrearComentario', [
+    result = call_procedure('CrearComentario', [
         data['TareaID'],
-        id.UsuarioID,
+        current_user.UsuarioID,
         data['Texto']
     ])
-    return jsonify({'message': 'Comment created successfully'}), 201
+    comentario_id = result[0][0]
+    search.refresh(search.COMENTARIO, [comentario_id])
+    return jsonify({'message': 'Comment created successfully', 'ComentarioID': comentario_id}), 201
 
 @comentarios_bp.route('/comentarios/<int:id>', methods=['PUT'])
 @token_required
-def update_comentario(id):
+def update_comentario(current_user, id):
     """
     Update a Comment
     ---
@@ -137,11 +174,12 @@ def update_comentario(id):
         id,
         data['Texto']
     ])
+    search.refresh(search.COMENTARIO, [id])
     return jsonify({'message': 'Comment updated successfully'}), 200
 
 @comentarios_bp.route('/comentarios/<int:id>', methods=['DELETE'])
 @token_required
-def delete_comentario(id):
+def delete_comentario(current_user, id):
     """
     Delete a Comment
     ---
@@ -163,4 +201,5 @@ def delete_comentario(id):
     if not result:
         return jsonify({'message': 'Comment not found'}), 404
     call_procedure('EliminarComentario', [id])
+    search.refresh(search.COMENTARIO, [id])
     return '', 204
@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
 from ..utils import call_procedure
+from ..pagination import get_id_page_args, page_response
 from app.routes.auth import token_required
 from ..schemas import EtiquetaSchema, TareaEtiquetaSchema
-from ..constants import TAG_NOT_FOUND
+from ..constants import TAG_NOT_FOUND, INVALID_INPUT
+from ..serialization import json_response
 
 etiquetas_bp = Blueprint('etiquetas', __name__)
 
@@ -12,26 +14,48 @@ tarea_etiqueta_schema = TareaEtiquetaSchema()
 
 @etiquetas_bp.route('/etiquetas', methods=['GET'])
 @token_required
-def get_etiquetas():
+def get_etiquetas(current_user):
     """
     Get All Tags
     ---
     tags:
       - etiquetas
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
     responses:
       200:
-        description: List of tags
+        description: Page of tags
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/Etiqueta'
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/Etiqueta'
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
     """
-    result = call_procedure('ObtenerEtiquetas', [])
-    return jsonify(result), 200
+    try:
+        limit, after_id = get_id_page_args()
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    result = call_procedure('ObtenerEtiquetasPaginadas', [after_id, limit + 1], named=True)
+    return page_response(result, limit), 200
 
 @etiquetas_bp.route('/etiquetas/<int:id>', methods=['GET'])
 @token_required
-def get_etiqueta(id):
+def get_etiqueta(current_user, id):
     """
     Get a Tag by ID
     ---
@@ -51,14 +75,14 @@ def get_etiqueta(id):
       404:
         description: Tag not found
     """
-    result = call_procedure('ObtenerEtiquetaPorID', [id])
+    result = call_procedure('ObtenerEtiquetaPorID', [id], named=True)
     if not result:
         return jsonify({'message': TAG_NOT_FOUND}), 404
-    return jsonify(result[0]), 200
+    return json_response(result[0]), 200
 
 @etiquetas_bp.route('/etiquetas', methods=['POST'])
 @token_required
-def create_etiqueta():
+def create_etiqueta(current_user):
     """
     Create a New Tag
     ---
@@ -93,7 +117,7 @@ def create_etiqueta():
 
 @etiquetas_bp.route('/etiquetas/<int:id>', methods=['PUT'])
 @token_required
-def update_etiqueta(id):
+def update_etiqueta(current_user, id):
     """
     Update a Tag
     ---
@@ -137,7 +161,7 @@ def update_etiqueta(id):
 
 @etiquetas_bp.route('/etiquetas/<int:id>', methods=['DELETE'])
 @token_required
-def delete_etiqueta(id):
+def delete_etiqueta(current_user, id):
     """
     Delete a Tag
     ---
@@ -163,7 +187,7 @@ def delete_etiqueta(id):
 
 @etiquetas_bp.route('/tareas/<int:tarea_id>/etiquetas', methods=['POST'])
 @token_required
-def add_etiqueta_to_tarea(tarea_id):
+def add_etiqueta_to_tarea(current_user, tarea_id):
     """
     Add Tag to Task
     ---
@@ -199,7 +223,7 @@ def add_etiqueta_to_tarea(tarea_id):
 
 @etiquetas_bp.route('/tareas/<int:tarea_id>/etiquetas/<int:etiqueta_id>', methods=['DELETE'])
 @token_required
-def remove_etiqueta_from_tarea(tarea_id, etiqueta_id):
+def remove_etiqueta_from_tarea(current_user, tarea_id, etiqueta_id):
     """
     Remove Tag from Task
     ---
@@ -1,18 +1,18 @@
 from flask import Blueprint, request, jsonify
 from ..models import db, Invitacion
 from app.routes.auth import token_required
+from ..serialization import json_response
 from ..schemas import InvitacionSchema
 
 invitaciones_bp = Blueprint('invitaciones', __name__)
 
 invitacion_schema = InvitacionSchema()
-invitaciones_schema = InvitacionSchema(many=True)
 
 @invitaciones_bp.route('/invitaciones', methods=['GET'])
 @token_required
 def get_invitaciones(current_user):
     invitaciones = Invitacion.query.all()
-    return invitaciones_schema.jsonify(invitaciones), 200
+    return json_response([Invitacion.to_dict(invitacion) for invitacion in invitaciones]), 200
 
 @invitaciones_bp.route('/invitaciones', methods=['POST'])
 @token_required
@@ -29,4 +29,4 @@ def create_invitacion(current_user):
     )
     db.session.add(invitacion)
     db.session.commit()
-    return invitacion_schema.jsonify(invitacion), 201
+    return json_response(invitacion.to_dict()), 201
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
 from ..utils import call_procedure
+from ..pagination import get_id_page_args, get_page_args, page_response
+from ..streaming import get_stream_format, stream_procedure
 from app.routes.auth import token_required
 from ..schemas import NotificacionSchema
-from ..constants import NOTIFICATION_NOT_FOUND
+from ..constants import NOTIFICATION_NOT_FOUND, INVALID_INPUT
+from ..serialization import json_response
 
 notificaciones_bp = Blueprint('notificaciones', __name__)
 
@@ -11,26 +14,165 @@ notificaciones_schema = NotificacionSchema(many=True)
 
 @notificaciones_bp.route('/notificaciones', methods=['GET'])
 @token_required
-def get_notificaciones():
+def get_notificaciones(current_user):
     """
     Get All Notifications
     ---
     tags:
       - notificaciones
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
+      - in: query
+        name: stream
+        type: string
+        enum: ['ndjson', 'json']
+        required: false
+        description: Stream every row as NDJSON or a chunked JSON array instead of one page
     responses:
       200:
-        description: List of notifications
+        description: Page of notifications
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/Notificacion'
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/Notificacion'
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
     """
-    result = call_procedure('ObtenerNotificaciones', [])
-    return jsonify(result), 200
+    try:
+        stream_format = get_stream_format()
+        limit, after_id = get_id_page_args()
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    if stream_format:
+        return stream_procedure('ObtenerNotificaciones', [], stream_format)
+    result = call_procedure('ObtenerNotificacionesPaginadas', [after_id, limit + 1], named=True)
+    return page_response(result, limit), 200
+
+BOOLEAN_ARGS = {'true': True, '1': True, 'false': False, '0': False}
+
+def get_inbox_args():
+    """Read the ``leida`` filter and the (Fecha, NotificacionID) keyset cursor."""
+    leida = request.args.get('leida')
+    if leida is not None:
+        if leida.lower() not in BOOLEAN_ARGS:
+            raise ValueError('Invalid leida')
+        leida = BOOLEAN_ARGS[leida.lower()]
+    limit, after = get_page_args()
+    if after is None:
+        return leida, limit, None, None
+    if len(after) != 2 or not isinstance(after[0], str) or not isinstance(after[1], int):
+        raise ValueError('Invalid cursor')
+    return leida, limit, after[0], after[1]
+
+@notificaciones_bp.route('/notificaciones/bandeja', methods=['GET'])
+@token_required
+def get_bandeja(current_user):
+    """
+    Get the Current User's Notification Inbox
+    ---
+    tags:
+      - notificaciones
+    parameters:
+      - in: query
+        name: leida
+        type: boolean
+        required: false
+        description: Only read (true) or unread (false) notifications
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
+    responses:
+      200:
+        description: Page of notifications, newest first
+        schema:
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/Notificacion'
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
+    """
+    try:
+        leida, limit, after_fecha, after_id = get_inbox_args()
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    result = call_procedure('ObtenerBandejaNotificaciones', [
+        current_user.UsuarioID,
+        leida,
+        after_fecha,
+        after_id,
+        limit + 1
+    ], named=True)
+    return page_response(result, limit, key=lambda row: (row['Fecha'], row['NotificacionID'])), 200
+
+@notificaciones_bp.route('/notificaciones/no-leidas', methods=['GET'])
+@token_required
+def get_no_leidas(current_user):
+    """
+    Get the Current User's Unread Notification Count
+    ---
+    tags:
+      - notificaciones
+    responses:
+      200:
+        description: Unread notification count
+        schema:
+          type: object
+          properties:
+            NoLeidas:
+              type: integer
+    """
+    result = call_procedure('ObtenerContadorNotificaciones', [current_user.UsuarioID])
+    return jsonify({'NoLeidas': int(result[0][0]) if result else 0}), 200
+
+@notificaciones_bp.route('/notificaciones/marcar-leidas', methods=['POST'])
+@token_required
+def marcar_leidas(current_user):
+    """
+    Mark All of the Current User's Notifications as Read
+    ---
+    tags:
+      - notificaciones
+    responses:
+      200:
+        description: Notifications marked as read
+        schema:
+          type: object
+          properties:
+            Actualizadas:
+              type: integer
+    """
+    result = call_procedure('MarcarNotificacionesLeidas', [current_user.UsuarioID])
+    return jsonify({'Actualizadas': int(result[0][0]) if result else 0}), 200
 
 @notificaciones_bp.route('/notificaciones/<int:id>', methods=['GET'])
 @token_required
-def get_notificacion(id):
+def get_notificacion(current_user, id):
     """
     Get a Notification by ID
     ---
@@ -50,14 +192,14 @@ def get_notificacion(id):
       404:
         description: Notification not found
     """
-    result = call_procedure('ObtenerNotificacionPorID', [id])
+    result = call_procedure('ObtenerNotificacionPorID', [id], named=True)
     if not result:
         return jsonify({'message': NOTIFICATION_NOT_FOUND}), 404
-    return jsonify(result[0]), 200
+    return json_response(result[0]), 200
 
 @notificaciones_bp.route('/notificaciones', methods=['POST'])
 @token_required
-def create_notificacion():
+def create_notificacion(current_user):
     """
     Create a New Notification
     ---
@@ -97,7 +239,7 @@ def create_notificacion():
 
 @notificaciones_bp.route('/notificaciones/<int:id>', methods=['PUT'])
 @token_required
-def update_notificacion(id):
+def update_notificacion(current_user, id):
     """
     Update a Notification
     ---
@@ -144,7 +286,7 @@ def update_notificacion(id):
 
 @notificaciones_bp.route('/notificaciones/<int:id>', methods=['DELETE'])
 @token_required
-def delete_notificacion(id):
+def delete_notificacion(current_user, id):
     """
     Delete a Notification
     ---
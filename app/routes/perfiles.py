@@ -1,8 +1,10 @@
 from flask import Blueprint, request, jsonify
 from ..utils import call_procedure
+from ..pagination import get_id_page_args, page_response
 from app.routes.auth import token_required
 from ..schemas import PerfilUsuarioSchema
-from ..constants import PROFILE_NOT_FOUND
+from ..constants import PROFILE_NOT_FOUND, INVALID_INPUT
+from ..serialization import json_response
 
 perfiles_bp = Blueprint('perfiles', __name__)
 
@@ -11,26 +13,48 @@ perfiles_schema = PerfilUsuarioSchema(many=True)
 
 @perfiles_bp.route('/perfiles', methods=['GET'])
 @token_required
-def get_perfiles():
+def get_perfiles(current_user):
     """
     Get All Profiles
     ---
     tags:
       - perfiles
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
     responses:
       200:
-        description: List of profiles
+        description: Page of profiles
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/PerfilUsuario'
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/PerfilUsuario'
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
     """
-    result = call_procedure('ObtenerPerfilesUsuario', [])
-    return jsonify(result), 200
+    try:
+        limit, after_id = get_id_page_args()
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    result = call_procedure('ObtenerPerfilesUsuarioPaginados', [after_id, limit + 1], named=True)
+    return page_response(result, limit), 200
 
 @perfiles_bp.route('/perfiles/<int:id>', methods=['GET'])
 @token_required
-def get_perfil(id):
+def get_perfil(current_user, id):
     """
     Get a Profile by ID
     ---
@@ -50,14 +74,14 @@ def get_perfil(id):
       404:
         description: Profile not found
     """
-    result = call_procedure('ObtenerPerfilUsuarioPorID', [id])
+    result = call_procedure('ObtenerPerfilUsuarioPorID', [id], named=True)
     if not result:
         return jsonify({'message': PROFILE_NOT_FOUND}), 404
-    return jsonify(result[0]), 200
+    return json_response(result[0]), 200
 
 @perfiles_bp.route('/perfiles', methods=['POST'])
 @token_required
-def create_perfil():
+def create_perfil(current_user):
     """
     Create a New Profile
     ---
@@ -104,7 +128,7 @@ def create_perfil():
 
 @perfiles_bp.route('/perfiles/<int:id>', methods=['PUT'])
 @token_required
-def update_perfil(id):
+def update_perfil(current_user, id):
     """
     Update a Profile
     ---
@@ -158,7 +182,7 @@ def update_perfil(id):
 
 @perfiles_bp.route('/perfiles/<int:id>', methods=['DELETE'])
 @token_required
-def delete_perfil(id):
+def delete_perfil(current_user, id):
     """
     Delete a Profile
     ---
@@ -1,18 +1,20 @@
 from flask import Blueprint, request, jsonify
 from ..models import db, Proyecto
 from app.routes.auth import token_required
+from ..serialization import json_response
 from ..schemas import ProyectoSchema
+from ..constants import PROJECT_NOT_FOUND
+from ..stats import proyecto_stats
 
 proyectos_bp = Blueprint('proyectos', __name__)
 
 proyecto_schema = ProyectoSchema()
-proyectos_schema = ProyectoSchema(many=True)
 
 @proyectos_bp.route('/proyectos', methods=['GET'])
 @token_required
 def get_proyectos(current_user):
     proyectos = Proyecto.query.all()
-    return proyectos_schema.jsonify(proyectos), 200
+    return json_response([Proyecto.to_dict(proyecto) for proyecto in proyectos]), 200
 
 @proyectos_bp.route('/proyectos', methods=['POST'])
 @token_required
@@ -27,4 +29,48 @@ def create_proyecto(current_user):
     )
     db.session.add(proyecto)
     db.session.commit()
-    return proyecto_schema.jsonify(proyecto), 201
+    return json_response(proyecto.to_dict()), 201
+
+@proyectos_bp.route('/proyectos/<int:id>/stats', methods=['GET'])
+@token_required
+def get_proyecto_stats(current_user, id):
+    """
+    Get Task Statistics of a Project
+    ---
+    tags:
+      - proyectos
+    parameters:
+      - in: path
+        name: id
+        type: integer
+        required: true
+        description: ID of the project
+    responses:
+      200:
+        description: Task counts per state, overdue open tasks and completion rate
+        schema:
+          id: EstadisticasProyecto
+          properties:
+            ProyectoID:
+              type: integer
+            Total:
+              type: integer
+            Pendientes:
+              type: integer
+            EnProceso:
+              type: integer
+            Completadas:
+              type: integer
+            Vencidas:
+              type: integer
+              description: Tasks not completed whose FechaVencimiento is before today
+            TasaCompletadas:
+              type: number
+              description: Completadas / Total
+      404:
+        description: Project not found
+    """
+    stats = proyecto_stats(id)
+    if stats is None:
+        return jsonify({'message': PROJECT_NOT_FOUND}), 404
+    return jsonify(stats), 200
@@ -0,0 +1,77 @@
+from flask import Blueprint, request, jsonify
+from ..pagination import get_page_args, encode_cursor
+from app.routes.auth import token_required
+from ..constants import INVALID_INPUT
+from .. import search
+
+search_bp = Blueprint('search', __name__)
+
+# Ranked results are paged by offset; deeper pages are not worth their cost.
+MAX_SEARCH_OFFSET = 1000
+
+@search_bp.route('/search', methods=['GET'])
+@token_required
+def search_documents(current_user):
+    """
+    Search tasks and comments
+    ---
+    tags:
+      - search
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+        description: Words to look for; every word must match. Accents and case are ignored, ñ is kept
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
+    responses:
+      200:
+        description: Page of hits, best first
+        schema:
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  Tipo:
+                    type: string
+                    enum: ['tarea', 'comentario']
+                  TareaID:
+                    type: integer
+                  ComentarioID:
+                    type: integer
+                  ProyectoID:
+                    type: integer
+                  Titulo:
+                    type: string
+                  Fragmento:
+                    type: string
+                  Puntaje:
+                    type: number
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
+    """
+    query = request.args.get('q', '').strip()
+    try:
+        limit, after = get_page_args()
+        offset = after[0] if after else 0
+        if not query or not isinstance(offset, int) or not 0 <= offset <= MAX_SEARCH_OFFSET:
+            raise ValueError('Invalid search')
+    except (ValueError, IndexError):
+        return jsonify({'message': INVALID_INPUT}), 400
+    hits = search.search(query, limit + 1, offset)
+    next_cursor = encode_cursor(offset + limit) if len(hits) > limit else None
+    return jsonify({'items': search.hydrate(hits[:limit]), 'next_cursor': next_cursor}), 200
@@ -1,38 +1,149 @@
 from flask import Blueprint, request, jsonify
-from flask_socketio import emit
 from ..utils import call_procedure
+from ..models import db, Proyecto, Tarea
+from ..pagination import get_id_page_args, page_response
+from ..serialization import json_response
+from ..streaming import get_stream_format, stream_procedure, stream_query
+from ..filters import get_tarea_filters, tareas_query
+from ..conditional import make_etag, not_modified, set_validators
 from app.routes.auth import token_required
-from ..schemas import TareaSchema
-from .. import socketio
-from ..constants import TASK_NOT_FOUND
+from ..schemas import TareaSchema, MoverTareaSchema
+from ..events import emit_task_event, emit_tasks_by_board, emit_task_update, discard_task_update
+from ..constants import TASK_NOT_FOUND, INVALID_INPUT, MOVE_CONFLICT
+from ..ordering import move_tarea, MoveConflict
+from .. import search
 
 tareas_bp = Blueprint('tareas', __name__)
 
 tarea_schema = TareaSchema()
-tareas_schema = TareaSchema(many=True)
+mover_tarea_schema = MoverTareaSchema()
+
+# Columns ActualizarTarea writes, in the order of SELECT * FROM Tareas.
+CAMPOS_ACTUALIZABLES = ('ProyectoID', 'Titulo', 'Descripcion', 'Importancia', 'Estado', 'FechaVencimiento')
+
+def campos_tarea(row):
+    campos = dict(zip(CAMPOS_ACTUALIZABLES, row[1:1 + len(CAMPOS_ACTUALIZABLES)]))
+    if campos['FechaVencimiento'] is not None:
+        campos['FechaVencimiento'] = campos['FechaVencimiento'].isoformat()
+    return campos
 
 @tareas_bp.route('/tareas', methods=['GET'])
 @token_required
-def get_tareas():
+def get_tareas(current_user):
     """
     Get All Tasks
     ---
     tags:
       - tareas
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
+      - in: query
+        name: stream
+        type: string
+        enum: ['ndjson', 'json']
+        required: false
+        description: Stream every row as NDJSON or a chunked JSON array instead of one page
+      - in: query
+        name: estado
+        type: string
+        required: false
+        description: Comma-separated states, e.g. pendiente,en_proceso
+      - in: query
+        name: proyecto_id
+        type: integer
+        required: false
+      - in: query
+        name: importancia_min
+        type: integer
+        required: false
+      - in: query
+        name: importancia_max
+        type: integer
+        required: false
+      - in: query
+        name: vence_desde
+        type: string
+        format: date
+        required: false
+        description: Earliest FechaVencimiento, inclusive
+      - in: query
+        name: vence_hasta
+        type: string
+        format: date
+        required: false
+        description: Latest FechaVencimiento, inclusive
+      - in: query
+        name: etiqueta_id
+        type: integer
+        required: false
+        description: Only tasks with this tag
+      - in: query
+        name: usuario_id
+        type: string
+        required: false
+        description: Only tasks assigned to this user, or "me" for the authenticated user
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+      - in: header
+        name: If-Modified-Since
+        type: string
+        required: false
     responses:
       200:
-        description: List of tasks
+        description: Page of tasks
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/Tarea'
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/Tarea'
+            next_cursor:
+              type: string
+      304:
+        description: Not modified since the ETag or date sent by the client
+      400:
+        description: Invalid input
     """
-    result = call_procedure('ObtenerTareas', [])
-    return jsonify(result), 200
+    try:
+        stream_format = get_stream_format()
+        limit, after_id = get_id_page_args()
+        filters = get_tarea_filters(current_user.UsuarioID)
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    if filters:
+        # Tag and assignee changes do not touch Tareas.UltimaActualizacion,
+        # so filtered pages are always rebuilt instead of validated.
+        if stream_format:
+            return stream_query(tareas_query(filters), stream_format), 200
+        rows = db.session.execute(tareas_query(filters, after_id, limit + 1)).all()
+        return page_response([Tarea.to_dict(row) for row in rows], limit), 200
+    last_modified, total = call_procedure('ObtenerVersionTareas', [])[0]
+    etag = make_etag(last_modified, total, request.query_string)
+    cached = not_modified(etag, last_modified, weak=True)
+    if cached:
+        return cached
+    if stream_format:
+        response = stream_procedure('ObtenerTareas', [], stream_format)
+    else:
+        result = call_procedure('ObtenerTareasPaginadas', [after_id, limit + 1], named=True)
+        response = page_response(result, limit)
+    return set_validators(response, etag, last_modified, weak=True), 200
 
 @tareas_bp.route('/tareas/<int:id>', methods=['GET'])
 @token_required
-def get_tarea(id):
+def get_tarea(current_user, id):
     """
     Get a Task by ID
     ---
@@ -44,22 +155,38 @@ def get_tarea(id):
         type: integer
         required: true
         description: ID of the task
+      - in: header
+        name: If-None-Match
+        type: string
+        required: false
+      - in: header
+        name: If-Modified-Since
+        type: string
+        required: false
     responses:
       200:
         description: Task found
         schema:
           $ref: '#/definitions/Tarea'
+      304:
+        description: Not modified since the ETag or date sent by the client
       404:
         description: Task not found
     """
-    result = call_procedure('ObtenerTareaPorID', [id])
+    result = call_procedure('ObtenerTareaPorID', [id], named=True)
     if not result:
         return jsonify({'message': TASK_NOT_FOUND}), 404
-    return jsonify(result[0]), 200
+    tarea = result[0]
+    etag = make_etag(*tarea.values())
+    last_modified = tarea['UltimaActualizacion']
+    cached = not_modified(etag, last_modified)
+    if cached:
+        return cached
+    return set_validators(json_response(tarea), etag, last_modified), 200
 
 @tareas_bp.route('/tareas', methods=['POST'])
 @token_required
-def create_tarea():
+def create_tarea(current_user):
     """
     Create a New Task
     ---
@@ -100,7 +227,7 @@ def create_tarea():
     errors = tarea_schema.validate(data)
     if errors:
         return jsonify(errors), 400
-    call_procedure('CrearTarea', [
+    result = call_procedure('CrearTarea', [
         data['ProyectoID'],
         data['Titulo'],
         data.get('Descripcion', ''),
@@ -108,14 +235,17 @@ def create_tarea():
         data.get('Estado', 'pendiente'),
         data.get('FechaVencimiento', None)
     ])
-    emit('new_task', {'task': data}, broadcast=True)
-    return jsonify({'message': 'Task created successfully'}), 201
+    tarea_id = result[0][0]
+    search.refresh(search.TAREA, [tarea_id])
+    emit_task_event('new_task', {'task': dict(data, TareaID=tarea_id)}, [data['ProyectoID']])
+    return jsonify({'message': 'Task created successfully', 'TareaID': tarea_id}), 201
 
 @tareas_bp.route('/tareas/<int:id>', methods=['PUT'])
 @token_required
-def update_tarea(id):
+def update_tarea(current_user, id):
     """
     Update a Task
+    Fields left out of the body keep their current value.
     ---
     tags:
       - tareas
@@ -155,27 +285,24 @@ def update_tarea(id):
         description: Task not found
     """
     data = request.get_json()
-    errors = tarea_schema.validate(data)
+    # Only the fields sent are validated; the rest keep their stored values.
+    errors = tarea_schema.validate(data, partial=True)
     if errors:
         return jsonify(errors), 400
     result = call_procedure('ObtenerTareaPorID', [id])
     if not result:
         return jsonify({'message': 'Task not found'}), 404
-    call_procedure('ActualizarTarea', [
-        id,
-        data['ProyectoID'],
-        data['Titulo'],
-        data.get('Descripcion', ''),
-        data.get('Importancia', 1),
-        data.get('Estado', 'pendiente'),
-        data.get('FechaVencimiento', None)
-    ])
-    emit('update_task', {'task': data}, broadcast=True)
+    anterior = campos_tarea(result[0])
+    nuevos = dict(anterior, **{campo: data[campo] for campo in CAMPOS_ACTUALIZABLES if campo in data})
+    call_procedure('ActualizarTarea', [id] + [nuevos[campo] for campo in CAMPOS_ACTUALIZABLES])
+    if (anterior['Titulo'], anterior['Descripcion']) != (nuevos['Titulo'], nuevos['Descripcion']):
+        search.refresh(search.TAREA, [id])
+    emit_task_update(id, anterior, nuevos, [anterior['ProyectoID'], nuevos['ProyectoID']])
     return jsonify({'message': 'Task updated successfully'}), 200
 
 @tareas_bp.route('/tareas/<int:id>', methods=['DELETE'])
 @token_required
-def delete_tarea(id):
+def delete_tarea(current_user, id):
     """
     Delete a Task
     ---
@@ -197,5 +324,242 @@ def delete_tarea(id):
     if not result:
         return jsonify({'message': 'Task not found'}), 404
     call_procedure('EliminarTarea', [id])
-    emit('delete_task', {'task_id': id}, broadcast=True)
+    search.refresh(search.TAREA, [id])
+    discard_task_update(id)
+    emit_task_event('delete_task', {'task_id': id}, [result[0][1]])
     return '', 204
+
+@tareas_bp.route('/tareas/<int:id>/move', methods=['POST'])
+@token_required
+def move_tarea_route(current_user, id):
+    """
+    Move a Task Card
+    ---
+    tags:
+      - tareas
+    parameters:
+      - in: path
+        name: id
+        type: integer
+        required: true
+        description: ID of the task
+      - in: body
+        name: body
+        schema:
+          id: MoverTarea
+          required:
+            - ColumnaID
+          properties:
+            ColumnaID:
+              type: integer
+              description: Target column, in the task's project
+            AnteriorID:
+              type: integer
+              description: Card that ends up right above; omit or null for the top when SiguienteID is given
+            SiguienteID:
+              type: integer
+              description: Card that ends up right below; with neither neighbor the card goes to the bottom
+    responses:
+      200:
+        description: Task moved
+        schema:
+          properties:
+            TareaID:
+              type: integer
+            ColumnaID:
+              type: integer
+            Posicion:
+              type: integer
+      400:
+        description: Invalid input, or a column or neighbor outside the task's project
+      404:
+        description: Task not found
+      409:
+        description: The neighbors are no longer in that order
+    """
+    data = request.get_json()
+    errors = mover_tarea_schema.validate(data)
+    if errors:
+        return jsonify(errors), 400
+    try:
+        moved = move_tarea(id, data['ColumnaID'], data.get('AnteriorID'), data.get('SiguienteID'))
+    except MoveConflict:
+        return jsonify({'message': MOVE_CONFLICT}), 409
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    if moved is None:
+        return jsonify({'message': TASK_NOT_FOUND}), 404
+    posicion, proyecto_id = moved
+    payload = {'TareaID': id, 'ColumnaID': data['ColumnaID'], 'Posicion': posicion}
+    emit_task_event('move_task', {'task': payload}, [proyecto_id])
+    return jsonify(payload), 200
+
+BULK_MAX_ITEMS = 10000
+
+def load_bulk(schema, items, partial=False):
+    """Validate and load every item with the schema's compiled loader.
+
+    Returns ``(loaded, errors)`` where ``loaded`` maps item index to the
+    deserialized item and ``errors`` maps index to marshmallow messages.
+    """
+    loaded, errors = {}, {}
+    for i, item in enumerate(items):
+        data, item_errors = schema.check(item, partial=partial)
+        if item_errors:
+            errors[i] = item_errors
+        else:
+            loaded[i] = data
+    return loaded, errors
+
+def bulk_results(total, done, errors, not_found=(), ids=None):
+    results = []
+    for i in range(total):
+        if i in errors:
+            results.append({'index': i, 'status': 'invalid', 'errors': errors[i]})
+        elif i in not_found:
+            results.append({'index': i, 'status': 'not_found'})
+        elif ids is not None:
+            results.append({'index': i, 'status': done, 'TareaID': ids[i]})
+        else:
+            results.append({'index': i, 'status': done})
+    return results
+
+def bulk_status(results, done, ok_status):
+    return ok_status if all(r['status'] == done for r in results) else 207
+
+@tareas_bp.route('/tareas/bulk', methods=['POST'])
+@token_required
+def create_tareas_bulk(current_user):
+    """
+    Create Tasks in Bulk
+    ---
+    tags:
+      - tareas
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/CreateTarea'
+    responses:
+      201:
+        description: Every task was created
+      207:
+        description: Some items were invalid or their project was not found; see the per-item results
+      400:
+        description: Invalid input
+    """
+    data = request.get_json()
+    if not isinstance(data, list) or not data or len(data) > BULK_MAX_ITEMS:
+        return jsonify({'message': INVALID_INPUT}), 400
+    loaded, errors = load_bulk(tarea_schema, data)
+    proyectos = {item['ProyectoID'] for item in loaded.values()}
+    if proyectos:
+        proyectos = {row[0] for row in db.session.query(Proyecto.ProyectoID).filter(Proyecto.ProyectoID.in_(proyectos))}
+    not_found = {i for i, item in loaded.items() if item['ProyectoID'] not in proyectos}
+    rows = {i: {
+        'ProyectoID': item['ProyectoID'],
+        'Titulo': item['Titulo'],
+        'Descripcion': item.get('Descripcion', ''),
+        'Importancia': item.get('Importancia', 1),
+        'Estado': item.get('Estado', 'pendiente'),
+        'FechaVencimiento': item.get('FechaVencimiento', None)
+    } for i, item in loaded.items() if i not in not_found}
+    ids = {}
+    if rows:
+        # One INSERT per row so each reports its own TareaID: MySQL has no
+        # RETURNING, and the ids of a multi-row INSERT need not be consecutive.
+        insert = Tarea.__table__.insert()
+        try:
+            for i, row in rows.items():
+                ids[i] = db.session.execute(insert, row).inserted_primary_key[0]
+            search.sync(search.TAREA, ids.values(), commit=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        emit_tasks_by_board('new_tasks', [(data[i]['ProyectoID'], dict(data[i], TareaID=tarea_id))
+                                          for i, tarea_id in ids.items()])
+    results = bulk_results(len(data), 'created', errors, not_found, ids)
+    return jsonify({'results': results}), bulk_status(results, 'created', 201)
+
+@tareas_bp.route('/tareas/bulk', methods=['PATCH'])
+@token_required
+def update_tareas_bulk(current_user):
+    """
+    Update Tasks in Bulk
+    ---
+    tags:
+      - tareas
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: array
+          items:
+            allOf:
+              - $ref: '#/definitions/UpdateTarea'
+              - type: object
+                required:
+                  - TareaID
+                properties:
+                  TareaID:
+                    type: integer
+    responses:
+      200:
+        description: Every task was updated
+      207:
+        description: Some items were invalid or not found; see the per-item results
+      400:
+        description: Invalid input
+    """
+    data = request.get_json()
+    if not isinstance(data, list) or not data or len(data) > BULK_MAX_ITEMS:
+        return jsonify({'message': INVALID_INPUT}), 400
+    ids = {}
+    fields = []
+    for i, item in enumerate(data):
+        item = dict(item) if isinstance(item, dict) else {}
+        tarea_id = item.pop('TareaID', None)
+        if isinstance(tarea_id, int) and not isinstance(tarea_id, bool):
+            ids[i] = tarea_id
+        fields.append(item)
+    loaded, errors = load_bulk(tarea_schema, fields, partial=True)
+    for i in range(len(data)):
+        if i not in ids:
+            errors.setdefault(i, {})['TareaID'] = ['Missing data for required field.']
+            loaded.pop(i, None)
+    existing = {}
+    if loaded:
+        wanted = {ids[i] for i in loaded}
+        existing = dict(db.session.query(Tarea.TareaID, Tarea.ProyectoID).filter(Tarea.TareaID.in_(wanted)))
+    not_found = {i for i in loaded if ids[i] not in existing}
+
+    # executemany needs one statement per distinct set of columns.
+    groups = {}
+    for i, item in loaded.items():
+        if i not in not_found and item:
+            groups.setdefault(tuple(sorted(item)), []).append(
+                dict({'b_' + key: value for key, value in item.items()}, b_TareaID=ids[i]))
+    table = Tarea.__table__
+    try:
+        for columns, params in groups.items():
+            statement = (table.update()
+                         .where(table.c.TareaID == db.bindparam('b_TareaID'))
+                         .values({column: db.bindparam('b_' + column) for column in columns}))
+            db.session.execute(statement, params)
+        search.sync(search.TAREA, [ids[i] for i, item in loaded.items()
+                                   if i not in not_found and ('Titulo' in item or 'Descripcion' in item)], commit=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    updated = [(existing[ids[i]], data[i]) for i in loaded if i not in not_found]
+    # Tasks moved to another project are also announced where they landed.
+    updated += [(data[i]['ProyectoID'], data[i]) for i in loaded
+                if i not in not_found and data[i].get('ProyectoID', existing[ids[i]]) != existing[ids[i]]]
+    if updated:
+        emit_tasks_by_board('update_tasks', updated)
+    results = bulk_results(len(data), 'updated', errors, not_found)
+    return jsonify({'results': results}), bulk_status(results, 'updated', 200)
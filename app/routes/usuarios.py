@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from ..utils import call_procedure
-from app.routes.auth import token_required
+from ..pagination import get_id_page_args, page_response
+from ..streaming import get_stream_format, stream_procedure
+from app.routes.auth import token_required, invalidate_user
+from ..constants import INVALID_INPUT
 from ..schemas import UsuarioSchema
 from ..utils import generate_password_hash
+from ..serialization import json_response
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
@@ -11,26 +15,57 @@ usuarios_schema = UsuarioSchema(many=True)
 
 @usuarios_bp.route('/usuarios', methods=['GET'])
 @token_required
-def get_usuarios():
+def get_usuarios(current_user):
     """
     Get All Users
     ---
     tags:
       - usuarios
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        required: false
+        description: Page size (default 50, max 200)
+      - in: query
+        name: after
+        type: string
+        required: false
+        description: Cursor returned as next_cursor by the previous page
+      - in: query
+        name: stream
+        type: string
+        enum: ['ndjson', 'json']
+        required: false
+        description: Stream every row as NDJSON or a chunked JSON array instead of one page
     responses:
       200:
-        description: List of users
+        description: Page of users
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/Usuario'
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/Usuario'
+            next_cursor:
+              type: string
+      400:
+        description: Invalid input
     """
-    result = call_procedure('ObtenerUsuarios', [])
-    return jsonify(result), 200
+    try:
+        stream_format = get_stream_format()
+        limit, after_id = get_id_page_args()
+    except ValueError:
+        return jsonify({'message': INVALID_INPUT}), 400
+    if stream_format:
+        return stream_procedure('ObtenerUsuarios', [], stream_format)
+    result = call_procedure('ObtenerUsuariosPaginados', [after_id, limit + 1], named=True)
+    return page_response(result, limit), 200
 
 @usuarios_bp.route('/usuarios/<int:id>', methods=['GET'])
 @token_required
-def get_usuario(id):
+def get_usuario(current_user, id):
     """
     Get a User by ID
     ---
@@ -50,10 +85,10 @@ def get_usuario(id):
       404:
         description: User not found
     """
-    result = call_procedure('ObtenerUsuarioPorID', [id])
+    result = call_procedure('ObtenerUsuarioPorID', [id], named=True)
     if not result:
         return jsonify({'message': 'User not found'}), 404
-    return jsonify(result[0]), 200
+    return json_response(result[0]), 200
 
 @usuarios_bp.route('/usuarios', methods=['POST'])
 def create_usuario():
@@ -105,7 +140,7 @@ def create_usuario():
 
 @usuarios_bp.route('/usuarios/<int:id>', methods=['PUT'])
 @token_required
-def update_usuario(id):
+def update_usuario(current_user, id):
     """
     Update a User
     ---
@@ -156,11 +191,12 @@ def update_usuario(id):
         data.get('ImagenPerfil', ''),
         generate_password_hash(data['Password'])
     ])
+    invalidate_user(id)
     return jsonify({'message': 'User updated successfully'}), 200
 
 @usuarios_bp.route('/usuarios/<int:id>', methods=['DELETE'])
 @token_required
-def delete_usuario(id):
+def delete_usuario(current_user, id):
     """
     Delete a User
     ---
@@ -182,4 +218,5 @@ def delete_usuario(id):
     if not result:
         return jsonify({'message': 'User not found'}), 404
     call_procedure('EliminarUsuario', [id])
+    invalidate_user(id)
     return '', 204
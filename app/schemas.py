@@ -1,4 +1,5 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import fields, validate
+from .validation import CompiledSchema as Schema
 
 class UsuarioSchema(Schema):
     UsuarioID = fields.Int(dump_only=True)
@@ -85,10 +86,19 @@ class TareaEtiquetaSchema(Schema):
     TareaID = fields.Int(required=True)
     EtiquetaID = fields.Int(required=True)
 
+class MoverTareaSchema(Schema):
+    ColumnaID = fields.Int(required=True)
+    AnteriorID = fields.Int(allow_none=True)
+    SiguienteID = fields.Int(allow_none=True)
+
 class AdjuntoSchema(Schema):
     AdjuntoID = fields.Int(dump_only=True)
     TareaID = fields.Int(required=True)
     Archivo = fields.Str(required=True, validate=validate.Length(max=255))
     Fecha = fields.DateTime(dump_only=True)
+    Nombre = fields.Str(dump_only=True)
+    Hash = fields.Str(dump_only=True)
+    Tamano = fields.Int(dump_only=True)
+    TipoContenido = fields.Str(dump_only=True)
 
 
@@ -0,0 +1,335 @@
+import logging
+import math
+import re
+import unicodedata
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DDL, bindparam, event, func, or_
+from . import db
+from .cache import TTLCache
+from .models import IndiceBusqueda, IndiceBusquedaPendiente, Tarea, Comentario
+
+logger = logging.getLogger(__name__)
+
+TAREA = 'tarea'
+COMENTARIO = 'comentario'
+TITULO_PESO = 3
+TEXTO_PESO = 1
+MAX_PESO = 100
+MIN_TERM = 2
+MAX_TERM = 40
+MAX_QUERY_TERMS = 8
+REBUILD_BATCH = 5000
+
+STOPWORDS = frozenset('''
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante e el ella ellas
+ellos en entre era eran es esa esas ese eso esos esta estaba estan estas este esto estos fue fueron ha han hasta
+hay la las le les lo los mas me mi mis muy ni no nos o otra otras otro otros para pero poco por porque que
+quien se ser si sin sobre su sus tambien te tiene tienen todo todos tu un una unas uno unos y ya yo
+'''.split())
+
+_TOKEN = re.compile(r'[0-9a-zñ]+')
+_ENYE = '\x00'
+
+# Document counts behind the idf of each term.
+_document_count = TTLCache(maxsize=1, ttl=60)
+_document_frequency = TTLCache(maxsize=10000, ttl=300)
+
+
+def normalize(text):
+    """Lowercase and strip accents, keeping ñ apart from n."""
+    text = unicodedata.normalize('NFC', text).lower().replace('ñ', _ENYE)
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return text.replace(_ENYE, 'ñ')
+
+
+def singular(term):
+    """Fold common Spanish plurals so that "tareas" finds "tarea"."""
+    if len(term) <= 3 or not term.endswith('s') or term.isdigit():
+        return term
+    if term.endswith('ces'):
+        return term[:-3] + 'z'
+    if term.endswith('es') and term[-3] in 'rlndj':
+        return term[:-2]
+    return term[:-1]
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [singular(token)[:MAX_TERM] for token in _TOKEN.findall(normalize(text))
+            if len(token) >= MIN_TERM and token not in STOPWORDS]
+
+
+def weigh(fields):
+    """Map each term of ``[(text, weight), ...]`` to its summed weight."""
+    pesos = {}
+    for text, weight in fields:
+        for term in tokenize(text):
+            pesos[term] = min(pesos.get(term, 0) + weight, MAX_PESO)
+    return pesos
+
+
+def tarea_fields(titulo, descripcion):
+    return [(titulo, TITULO_PESO), (descripcion, TEXTO_PESO)]
+
+
+def comentario_fields(texto):
+    return [(texto, TEXTO_PESO)]
+
+
+def _postings(tipo, documents):
+    return [{'Termino': term, 'Tipo': tipo, 'DocumentoID': doc_id, 'Peso': peso}
+            for doc_id, fields in documents for term, peso in weigh(fields).items()]
+
+
+SOURCES = {
+    TAREA: ((Tarea.TareaID, Tarea.Titulo, Tarea.Descripcion), tarea_fields),
+    COMENTARIO: ((Comentario.ComentarioID, Comentario.Texto), comentario_fields),
+}
+
+
+def _mark_sqlite(tipo, doc_id):
+    """SQLite body of MarcarIndicePendiente."""
+    return '''
+    INSERT INTO IndiceBusquedaPendientes (Tipo, DocumentoID, Cambios) VALUES ('{t}', {d}, 1)
+    ON CONFLICT (Tipo, DocumentoID) DO UPDATE SET Cambios = Cambios + 1;
+    '''.format(t=tipo, d=doc_id)
+
+
+def _sqlite_triggers(tabla, key, tipo, campos):
+    cambio = ' OR '.join('OLD.{c} IS NOT NEW.{c}'.format(c=campo) for campo in campos)
+    return (
+        'CREATE TRIGGER %sIndiceInsert AFTER INSERT ON %s BEGIN %s END'
+        % (tabla, tabla, _mark_sqlite(tipo, 'NEW.' + key)),
+        'CREATE TRIGGER %sIndiceUpdate AFTER UPDATE OF %s ON %s WHEN %s BEGIN %s END'
+        % (tabla, ', '.join(campos), tabla, cambio, _mark_sqlite(tipo, 'NEW.' + key)),
+        'CREATE TRIGGER %sIndiceDelete AFTER DELETE ON %s BEGIN %s END'
+        % (tabla, tabla, _mark_sqlite(tipo, 'OLD.' + key)),
+    )
+
+
+# The MySQL triggers live in BasedeDatos.txt. Every write of a task or a
+# comment marks it in IndiceBusquedaPendientes within its own transaction.
+SQLITE_TRIGGERS = (_sqlite_triggers('Tareas', 'TareaID', TAREA, ('Titulo', 'Descripcion'))
+                   + _sqlite_triggers('Comentarios', 'ComentarioID', COMENTARIO, ('Texto',)))
+
+for trigger in SQLITE_TRIGGERS:
+    event.listen(db.Model.metadata, 'after_create', DDL(trigger).execute_if(dialect='sqlite'))
+
+
+def sync(tipo, doc_ids, commit=True):
+    """Index the ``tipo`` documents in ``doc_ids`` from their current rows and clear their marks.
+
+    Documents whose row is gone lose their postings. A mark is only cleared
+    if its Cambios still holds the value read here, so a write that lands in
+    between stays pending. With ``commit=False`` it all joins the caller's
+    transaction, next to the write that set the marks.
+    """
+    doc_ids = list(doc_ids)
+    if not doc_ids:
+        return
+    columns, to_fields = SOURCES[tipo]
+    table = IndiceBusqueda.__table__
+    pendientes = IndiceBusquedaPendiente.__table__
+    try:
+        marks = [{'b_id': doc_id, 'b_cambios': cambios} for doc_id, cambios in
+                 db.session.query(pendientes.c.DocumentoID, pendientes.c.Cambios)
+                 .filter(pendientes.c.Tipo == tipo, pendientes.c.DocumentoID.in_(doc_ids))]
+        rows = db.session.query(*columns).filter(columns[0].in_(doc_ids)).all()
+        db.session.execute(table.delete().where(table.c.Tipo == tipo).where(table.c.DocumentoID.in_(doc_ids)))
+        postings = _postings(tipo, [(row[0], to_fields(*row[1:])) for row in rows])
+        if postings:
+            db.session.execute(table.insert(), postings)
+        if marks:
+            db.session.execute(pendientes.delete()
+                               .where(pendientes.c.Tipo == tipo)
+                               .where(pendientes.c.DocumentoID == bindparam('b_id'))
+                               .where(pendientes.c.Cambios == bindparam('b_cambios')), marks)
+        if commit:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def refresh(tipo, doc_ids):
+    """sync after a write that is already committed.
+
+    The write stands either way, so a failure is only logged; its marks stay
+    for ``flask search sync``.
+    """
+    try:
+        sync(tipo, doc_ids)
+    except Exception:
+        logger.exception('Search index update failed for %s %r; left pending', tipo, list(doc_ids))
+
+
+def sync_pending(batch_size=REBUILD_BATCH):
+    """Sync every marked document, in batches; returns the number of documents synced."""
+    pendientes = IndiceBusquedaPendiente.__table__
+    last_tipo, last_id, synced = '', 0, 0
+    while True:
+        batch = (db.session.query(pendientes.c.Tipo, pendientes.c.DocumentoID)
+                 .filter(pendientes.c.Tipo >= last_tipo,
+                         or_(pendientes.c.Tipo > last_tipo, pendientes.c.DocumentoID > last_id))
+                 .order_by(pendientes.c.Tipo, pendientes.c.DocumentoID).limit(batch_size).all())
+        if not batch:
+            return synced
+        for tipo in SOURCES:
+            sync(tipo, [doc_id for t, doc_id in batch if t == tipo], commit=False)
+        db.session.commit()
+        last_tipo, last_id = batch[-1]
+        synced += len(batch)
+
+
+def document_count():
+    count = _document_count.get('total')
+    if count is None:
+        count = db.session.query(func.count(Tarea.TareaID)).scalar() + \
+            db.session.query(func.count(Comentario.ComentarioID)).scalar()
+        _document_count.set('total', count)
+    return count
+
+
+def document_frequency(term):
+    """Number of documents containing ``term``.
+
+    Only used for ranking, so a few minutes of staleness is fine. Zeros are
+    not cached, so a newly indexed term is found right away.
+    """
+    df = _document_frequency.get(term)
+    if df is None:
+        idx = IndiceBusqueda.__table__
+        df = db.session.query(func.count()).select_from(idx).filter(idx.c.Termino == term).scalar()
+        if df:
+            _document_frequency.set(term, df)
+    return df
+
+
+def search(query, limit, offset=0):
+    """Rank the documents containing every term of ``query``.
+
+    Each document scores sum(Peso * idf) over the query terms, with
+    idf = ln(1 + N / df). Returns ``[(Tipo, DocumentoID, Puntaje), ...]``.
+    The caller asks for one extra row to know whether a next page exists.
+
+    The rarest term drives the query, and each other term is a primary-key
+    lookup per candidate, so the cost follows the rarest term's postings.
+    A single term is read in (Termino, Peso) index order and stops after
+    ``limit + offset`` rows.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+    df = {term: document_frequency(term) for term in terms}
+    if not all(df.values()):
+        return []
+    total = max(document_count(), max(df.values()))
+    terms.sort(key=df.get)
+    idx = IndiceBusqueda.__table__
+    driver = idx.alias('r')
+    source, score = driver, driver.c.Peso * math.log(1 + total / df[terms[0]])
+    for n, term in enumerate(terms[1:]):
+        other = idx.alias('t%d' % n)
+        source = source.join(other, (other.c.Termino == term) & (other.c.Tipo == driver.c.Tipo)
+                             & (other.c.DocumentoID == driver.c.DocumentoID))
+        score = score + other.c.Peso * math.log(1 + total / df[term])
+    order = driver.c.Peso if len(terms) == 1 else score
+    rows = (db.session.query(driver.c.Tipo, driver.c.DocumentoID, score.label('Puntaje'))
+            .select_from(source)
+            .filter(driver.c.Termino == terms[0])
+            .order_by(order.desc(), driver.c.Tipo.desc(), driver.c.DocumentoID.desc())
+            .limit(limit).offset(offset)
+            .all())
+    return [(tipo, doc_id, float(puntaje)) for tipo, doc_id, puntaje in rows]
+
+
+def hydrate(hits, snippet=200):
+    """Turn ``search`` hits into JSON-ready dicts, with two queries at most."""
+    tarea_ids = [doc_id for tipo, doc_id, _ in hits if tipo == TAREA]
+    comentario_ids = [doc_id for tipo, doc_id, _ in hits if tipo == COMENTARIO]
+    comentarios = {}
+    if comentario_ids:
+        for comentario_id, tarea_id, texto in (db.session.query(Comentario.ComentarioID, Comentario.TareaID,
+                                                                Comentario.Texto)
+                                               .filter(Comentario.ComentarioID.in_(comentario_ids))):
+            comentarios[comentario_id] = (tarea_id, texto)
+            tarea_ids.append(tarea_id)
+    tareas = {}
+    if tarea_ids:
+        for tarea_id, proyecto_id, titulo, descripcion in (db.session.query(Tarea.TareaID, Tarea.ProyectoID,
+                                                                            Tarea.Titulo, Tarea.Descripcion)
+                                                           .filter(Tarea.TareaID.in_(set(tarea_ids)))):
+            tareas[tarea_id] = (proyecto_id, titulo, descripcion)
+    items = []
+    for tipo, doc_id, puntaje in hits:
+        if tipo == COMENTARIO:
+            if doc_id not in comentarios:
+                continue
+            tarea_id, texto = comentarios[doc_id]
+        else:
+            tarea_id, texto = doc_id, None
+        if tarea_id not in tareas:
+            continue
+        proyecto_id, titulo, descripcion = tareas[tarea_id]
+        texto = texto if tipo == COMENTARIO else descripcion
+        items.append({
+            'Tipo': tipo,
+            'TareaID': tarea_id,
+            'ComentarioID': doc_id if tipo == COMENTARIO else None,
+            'ProyectoID': proyecto_id,
+            'Titulo': titulo,
+            'Fragmento': (texto or '')[:snippet],
+            'Puntaje': round(puntaje, 4),
+        })
+    return items
+
+
+def _rebuild(tipo, columns, to_fields):
+    key = columns[0]
+    last_id, indexed = 0, 0
+    while True:
+        batch = (db.session.query(*columns).filter(key > last_id).order_by(key)
+                 .limit(REBUILD_BATCH).all())
+        if not batch:
+            return indexed
+        rows = _postings(tipo, [(row[0], to_fields(*row[1:])) for row in batch])
+        if rows:
+            db.session.execute(IndiceBusqueda.__table__.insert(), rows)
+        db.session.commit()
+        last_id = batch[-1][0]
+        indexed += len(batch)
+
+
+def rebuild():
+    """Rebuild the whole index from Tareas and Comentarios; returns documents indexed per type.
+
+    Marks are dropped first: a write after that point marks its document
+    again, whether or not its batch has been read yet.
+    """
+    db.session.execute(IndiceBusquedaPendiente.__table__.delete())
+    db.session.execute(IndiceBusqueda.__table__.delete())
+    db.session.commit()
+    _document_count.clear()
+    _document_frequency.clear()
+    return {
+        TAREA: _rebuild(TAREA, (Tarea.TareaID, Tarea.Titulo, Tarea.Descripcion), tarea_fields),
+        COMENTARIO: _rebuild(COMENTARIO, (Comentario.ComentarioID, Comentario.Texto), comentario_fields),
+    }
+
+
+search_cli = AppGroup('search', help='Full-text search index.')
+
+
+@search_cli.command('rebuild')
+def rebuild_command():
+    """Rebuild the search index from scratch."""
+    counts = rebuild()
+    click.echo('Indexed %d tasks and %d comments.' % (counts[TAREA], counts[COMENTARIO]))
+
+
+@search_cli.command('sync')
+def sync_command():
+    """Index the documents written since their last index update."""
+    click.echo('Synced %d documents.' % sync_pending())
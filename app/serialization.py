@@ -0,0 +1,77 @@
+import datetime
+import decimal
+import functools
+import json
+import operator
+from flask import Response
+from .metrics import timed
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; without it responses use the stdlib encoder.
+    orjson = None
+
+# Columns never sent to clients, whatever query or procedure they come from.
+SENSITIVE_FIELDS = frozenset(('PasswordHash',))
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError('%r is not JSON serializable' % type(value).__name__)
+
+
+if orjson is not None:
+    @timed('serialization')
+    def dumps(value):
+        """Encode ``value`` as JSON bytes; dates and datetimes become ISO 8601."""
+        return orjson.dumps(value, default=_default)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+    @timed('serialization')
+    def dumps(value):
+        """Encode ``value`` as JSON bytes; dates and datetimes become ISO 8601."""
+        return _encoder.encode(value).encode('utf-8')
+
+
+def json_response(value, status=None):
+    """jsonify for the hot paths: one encoder call and no key sorting."""
+    return Response(dumps(value), status=status, mimetype='application/json')
+
+
+def _encoder(names, getter):
+    """Encoder pairing each of ``names`` with the value ``getter`` takes from a row.
+
+    ``getter`` is an operator.itemgetter or attrgetter over one field per
+    name, so it returns a bare value when there is only one.
+    """
+    names = tuple(names)
+    if not names:
+        return lambda row: {}
+    if len(names) == 1:
+        name = names[0]
+        return lambda row: {name: getter(row)}
+    return lambda row: dict(zip(names, getter(row)))
+
+
+@functools.lru_cache(maxsize=256)
+def row_encoder(names):
+    """Encoder turning positional rows with columns ``names`` into dicts."""
+    positions = [i for i, name in enumerate(names) if name not in SENSITIVE_FIELDS]
+    if len(positions) == len(names):
+        return lambda row: dict(zip(names, row))
+    return _encoder([names[i] for i in positions], operator.itemgetter(*positions))
+
+
+def description_encoder(description):
+    """row_encoder for the columns of a DB-API ``cursor.description``."""
+    return row_encoder(tuple(column[0] for column in description))
+
+
+def model_encoder(model):
+    """Encoder turning instances of ``model``, or Core rows of its table, into dicts."""
+    names = [column.key for column in model.__table__.columns if column.key not in SENSITIVE_FIELDS]
+    return _encoder(names, operator.attrgetter(*names))
@@ -0,0 +1,133 @@
+import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DDL, case, event, func, or_, select
+from . import db
+from .models import Board, Proyecto, Tarea, EstadisticaProyecto, VencimientoProyecto
+
+CONTADORES = ('Total', 'Pendientes', 'EnProceso', 'Completadas')
+
+
+def _apply_sqlite(row, delta):
+    """SQLite body of AplicarEstadisticasTarea for the trigger row ``row``."""
+    return '''
+    INSERT INTO EstadisticasProyectos (ProyectoID, Total, Pendientes, EnProceso, Completadas)
+    VALUES ({r}.ProyectoID, {d}, {d} * ({r}.Estado IS 'pendiente'),
+            {d} * ({r}.Estado IS 'en_proceso'), {d} * ({r}.Estado IS 'completada'))
+    ON CONFLICT (ProyectoID) DO UPDATE SET
+        Total = Total + excluded.Total,
+        Pendientes = Pendientes + excluded.Pendientes,
+        EnProceso = EnProceso + excluded.EnProceso,
+        Completadas = Completadas + excluded.Completadas;
+    INSERT INTO VencimientosProyectos (ProyectoID, FechaVencimiento, Abiertas)
+    SELECT {r}.ProyectoID, {r}.FechaVencimiento, {d}
+    WHERE {r}.FechaVencimiento IS NOT NULL AND {r}.Estado IS NOT 'completada'
+    ON CONFLICT (ProyectoID, FechaVencimiento) DO UPDATE SET Abiertas = Abiertas + excluded.Abiertas;
+    DELETE FROM VencimientosProyectos
+    WHERE {d} < 0 AND ProyectoID = {r}.ProyectoID AND FechaVencimiento = {r}.FechaVencimiento AND Abiertas <= 0;
+    '''.format(r=row, d=delta)
+
+
+# The MySQL triggers live in BasedeDatos.txt. These are their SQLite
+# equivalents, so the development database keeps the same tables current.
+SQLITE_TRIGGERS = (
+    'CREATE TRIGGER TareasEstadisticasInsert AFTER INSERT ON Tareas BEGIN %s END'
+    % _apply_sqlite('NEW', 1),
+    'CREATE TRIGGER TareasEstadisticasUpdate AFTER UPDATE OF ProyectoID, Estado, FechaVencimiento ON Tareas '
+    'BEGIN %s %s END' % (_apply_sqlite('OLD', -1), _apply_sqlite('NEW', 1)),
+    'CREATE TRIGGER TareasEstadisticasDelete AFTER DELETE ON Tareas BEGIN %s END'
+    % _apply_sqlite('OLD', -1),
+)
+
+for trigger in SQLITE_TRIGGERS:
+    event.listen(db.Model.metadata, 'after_create', DDL(trigger).execute_if(dialect='sqlite'))
+
+
+def resumen(total, pendientes, en_proceso, completadas, vencidas):
+    return {
+        'Total': total,
+        'Pendientes': pendientes,
+        'EnProceso': en_proceso,
+        'Completadas': completadas,
+        'Vencidas': vencidas,
+        'TasaCompletadas': round(completadas / total, 4) if total else 0.0,
+    }
+
+
+def _vencidas(proyecto_ids, today):
+    """Open tasks due before ``today``, per project.
+
+    Sums one VencimientosProyectos row per overdue date that still has open
+    tasks; the triggers delete a date once its last open task goes.
+    """
+    rows = (db.session.query(VencimientoProyecto.ProyectoID, func.sum(VencimientoProyecto.Abiertas))
+            .filter(VencimientoProyecto.ProyectoID.in_(proyecto_ids),
+                    VencimientoProyecto.FechaVencimiento < today)
+            .group_by(VencimientoProyecto.ProyectoID))
+    return {proyecto_id: int(vencidas) for proyecto_id, vencidas in rows}
+
+
+def proyecto_stats(proyecto_id, today=None):
+    """Stats of one project from the aggregate tables, or None if it does not exist.
+
+    Reads one EstadisticasProyectos row plus one row per overdue date with
+    open tasks, so the cost grows with those dates, not with the tasks.
+    """
+    if db.session.query(Proyecto.ProyectoID).filter_by(ProyectoID=proyecto_id).first() is None:
+        return None
+    fila = (db.session.query(*[getattr(EstadisticaProyecto, c) for c in CONTADORES])
+            .filter_by(ProyectoID=proyecto_id).first())
+    vencidas = _vencidas([proyecto_id], today or datetime.date.today()).get(proyecto_id, 0)
+    return dict(resumen(*(fila or (0, 0, 0, 0)), vencidas), ProyectoID=proyecto_id)
+
+
+def board_stats(board_id, today=None):
+    """Totals of a board plus the stats of each of its projects; None if the board does not exist."""
+    if db.session.query(Board.BoardID).filter_by(BoardID=board_id).first() is None:
+        return None
+    rows = (db.session.query(Proyecto.ProyectoID,
+                             *[func.coalesce(getattr(EstadisticaProyecto, c), 0) for c in CONTADORES])
+            .outerjoin(EstadisticaProyecto, EstadisticaProyecto.ProyectoID == Proyecto.ProyectoID)
+            .filter(Proyecto.BoardID == board_id)
+            .order_by(Proyecto.ProyectoID).all())
+    vencidas = _vencidas([row[0] for row in rows], today or datetime.date.today())
+    proyectos = [dict(resumen(*row[1:], vencidas.get(row[0], 0)), ProyectoID=row[0]) for row in rows]
+    totales = [sum(p[c] for p in proyectos) for c in CONTADORES + ('Vencidas',)]
+    return dict(resumen(*totales), BoardID=board_id, proyectos=proyectos)
+
+
+def rebuild():
+    """Recompute both aggregate tables from Tareas; returns the number of projects with tasks."""
+    tareas = Tarea.__table__
+
+    def contar(estado):
+        return func.sum(case((tareas.c.Estado == estado, 1), else_=0))
+
+    try:
+        db.session.execute(VencimientoProyecto.__table__.delete())
+        db.session.execute(EstadisticaProyecto.__table__.delete())
+        db.session.execute(EstadisticaProyecto.__table__.insert().from_select(
+            ['ProyectoID'] + list(CONTADORES),
+            select(tareas.c.ProyectoID, func.count(), contar('pendiente'), contar('en_proceso'),
+                   contar('completada'))
+            .group_by(tareas.c.ProyectoID)))
+        db.session.execute(VencimientoProyecto.__table__.insert().from_select(
+            ['ProyectoID', 'FechaVencimiento', 'Abiertas'],
+            select(tareas.c.ProyectoID, tareas.c.FechaVencimiento, func.count())
+            .where(tareas.c.FechaVencimiento.isnot(None))
+            .where(or_(tareas.c.Estado.is_(None), tareas.c.Estado != 'completada'))
+            .group_by(tareas.c.ProyectoID, tareas.c.FechaVencimiento)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return db.session.query(func.count()).select_from(EstadisticaProyecto).scalar()
+
+
+stats_cli = AppGroup('stats', help='Per-project task statistics.')
+
+
+@stats_cli.command('rebuild')
+def rebuild_command():
+    """Recompute the project statistics from Tareas."""
+    click.echo('Rebuilt statistics of %d projects.' % rebuild())
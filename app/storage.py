@@ -0,0 +1,137 @@
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and headers around the file itself.
+MULTIPART_OVERHEAD = 16 * 1024
+
+# A received upload: content hash, size in bytes and the temporary file
+# holding it until commit() moves it to its content-addressed path.
+ReceivedBlob = namedtuple('ReceivedBlob', ['Hash', 'Tamano', 'temp_path'])
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+class CappedStream:
+    """Wrap a request body, raising BlobTooLarge once more than ``limit`` bytes are read."""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.remaining = limit
+
+    def _count(self, data):
+        self.remaining -= len(data)
+        if self.remaining < 0:
+            raise BlobTooLarge()
+        return data
+
+    def read(self, size=-1):
+        return self._count(self.stream.read(size))
+
+    def readline(self, size=-1):
+        return self._count(self.stream.readline(size))
+
+
+class BlobStorage:
+    """Content-addressed storage for attachment files.
+
+    Files live under ``ADJUNTOS_DIR`` at ``<hash[:2]>/<hash[2:4]>/<hash>``, so
+    identical uploads share one file. The ``Blobs`` table counts how many
+    attachments reference each hash. Uploading a file takes three steps:
+    ``receive`` streams it to a temporary file while hashing,
+    ``CrearAdjunto`` records the reference, and ``commit`` moves the file
+    into place. A blob whose last reference is deleted is removed with
+    ``release``.
+    """
+
+    def __init__(self, db, root=None, max_bytes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def init_app(self, app):
+        self.root = app.config.get('ADJUNTOS_DIR', 'uploads')
+        self.max_bytes = app.config.get('ADJUNTOS_MAX_BYTES')
+        self.chunk_size = app.config.get('ADJUNTOS_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        if self.max_bytes is not None and app.config.get('MAX_CONTENT_LENGTH') is None:
+            # Werkzeug then refuses larger bodies before parsing them.
+            app.config['MAX_CONTENT_LENGTH'] = self.max_bytes + MULTIPART_OVERHEAD
+
+    def relative_path(self, blob_hash):
+        return os.path.join(blob_hash[:2], blob_hash[2:4], blob_hash)
+
+    def path(self, blob_hash):
+        return os.path.join(self.root, self.relative_path(blob_hash))
+
+    def preview_path(self, blob_hash):
+        return self.path(blob_hash) + '.preview.jpg'
+
+    def receive(self, stream):
+        """Copy ``stream`` to a temporary file in ``chunk_size`` reads.
+
+        Raises BlobTooLarge as soon as more than ``max_bytes`` arrive, leaving
+        nothing behind.
+        """
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=tmp_dir)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if self.max_bytes is not None and size > self.max_bytes:
+                        raise BlobTooLarge()
+                    digest.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return ReceivedBlob(digest.hexdigest(), size, temp_path)
+
+    def commit(self, blob):
+        """Move a received file to its content path, or drop it if that content is already stored."""
+        final_path = self.path(blob.Hash)
+        if os.path.exists(final_path):
+            os.unlink(blob.temp_path)
+            return final_path
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(blob.temp_path, final_path)
+        return final_path
+
+    def discard(self, blob):
+        if os.path.exists(blob.temp_path):
+            os.unlink(blob.temp_path)
+
+    def release(self, blob_hash):
+        """Delete the file and ``Blobs`` row of a hash nobody references any more.
+
+        The row stays locked while the file is removed. A concurrent
+        CrearAdjunto for the same content therefore either keeps the blob
+        alive or recreates both the row and the file after this commits.
+        """
+        from .models import Blob
+        session = self.db.session
+        try:
+            blob = Blob.query.filter_by(Hash=blob_hash).with_for_update().first()
+            if blob is None or blob.Referencias > 0:
+                session.rollback()
+                return False
+            for path in (self.path(blob_hash), self.preview_path(blob_hash)):
+                if os.path.exists(path):
+                    os.unlink(path)
+            session.delete(blob)
+            session.commit()
+            return True
+        except Exception:
+            session.rollback()
+            raise
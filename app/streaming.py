@@ -0,0 +1,65 @@
+from flask import Response, request, stream_with_context
+from . import db, procedures
+from .serialization import dumps, row_encoder
+
+STREAM_BATCH_SIZE = 500
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def get_stream_format():
+    """Return the ``stream`` query argument, or None when not streaming."""
+    fmt = request.args.get('stream')
+    if fmt is not None and fmt not in STREAM_FORMATS:
+        raise ValueError('Invalid stream format')
+    return fmt
+
+
+def _batched(encoded, batch_size):
+    chunk = []
+    for item in encoded:
+        chunk.append(item)
+        if len(chunk) >= batch_size:
+            yield b''.join(chunk)
+            chunk = []
+    if chunk:
+        yield b''.join(chunk)
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield dumps(row) + b'\n'
+
+
+def _json_array(rows):
+    yield b'['
+    separator = b''
+    for row in rows:
+        yield separator + dumps(row)
+        separator = b','
+    yield b']'
+
+
+def stream_rows(rows, fmt, batch_size=STREAM_BATCH_SIZE):
+    """Stream ``rows`` as NDJSON or as a chunked JSON array.
+
+    Rows are encoded one by one and flushed every ``batch_size`` rows, so only
+    one chunk is ever held in memory.
+    """
+    encode = _ndjson if fmt == 'ndjson' else _json_array
+    body = _batched(encode(rows), batch_size)
+    return Response(stream_with_context(body), mimetype=STREAM_FORMATS[fmt])
+
+
+def stream_procedure(procedure_name, params, fmt, batch_size=STREAM_BATCH_SIZE):
+    rows = procedures.stream(procedure_name, params, batch_size=batch_size, named=True)
+    return stream_rows(rows, fmt, batch_size=batch_size)
+
+
+def stream_query(query, fmt, batch_size=STREAM_BATCH_SIZE):
+    """Like stream_procedure for a SQLAlchemy select, read with a server-side cursor."""
+    result = db.session.execute(query.execution_options(stream_results=True))
+    encode = row_encoder(tuple(result.keys()))
+    return stream_rows((encode(row) for row in result), fmt, batch_size=batch_size)
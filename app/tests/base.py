@@ -0,0 +1,44 @@
+"""Shared fixture of the app tests: fresh tables, user Ana and a token for her.
+
+Subclasses pick the app configuration with ``config``; tests that build it
+in setUp (e.g. around a temporary directory) assign ``self.config`` before
+calling ``super().setUp()``.
+"""
+import datetime
+import unittest
+import jwt
+from app import create_app, db
+from app.models import Usuario
+from app.routes.auth import token_cache, user_cache
+from config import DevelopmentConfig
+
+
+class TestConfig(DevelopmentConfig):
+    TESTING = True
+
+
+class AppTestCase(unittest.TestCase):
+    config = TestConfig
+
+    def setUp(self):
+        self.app = create_app(self.config)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        token_cache.clear()
+        user_cache.clear()
+        usuario = Usuario(Nombre='Ana', Apellido='Pérez', CorreoElectronico='ana@example.com', PasswordHash='x')
+        db.session.add(usuario)
+        db.session.commit()
+        self.usuario_id = usuario.UsuarioID
+        self.client = self.app.test_client()
+        self.headers = {'x-access-tokens': self.token(self.usuario_id)}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def token(self, usuario_id):
+        return jwt.encode({'UsuarioID': usuario_id, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=5)},
+                          self.app.config['SECRET_KEY'], algorithm="HS256")
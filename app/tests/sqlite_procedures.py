@@ -0,0 +1,123 @@
+"""SQLite versions of the stored procedures in BasedeDatos.txt, for route tests.
+
+SQLite has no stored procedures, so ``ProcedureConnection`` gives its cursors
+a ``callproc`` that runs the statements listed in PROCEDURES with the call's
+parameters bound as :p0, :p1, ... The rows of the last statement are the
+result. Columns in DATETIME_COLUMNS come back as datetimes, as they do from
+MySQL. Tests opt in by creating the app with ProcedureConfig.
+"""
+import datetime
+import sqlite3
+from config import DevelopmentConfig
+
+DATETIME_COLUMNS = frozenset(('Fecha', 'FechaCreacion', 'UltimaActualizacion'))
+
+PROCEDURES = {
+    'ObtenerUsuarios': (
+        'SELECT * FROM Usuarios',
+    ),
+    'ObtenerUsuariosPaginados': (
+        'SELECT * FROM Usuarios WHERE UsuarioID > :p0 ORDER BY UsuarioID LIMIT :p1',
+    ),
+    'ObtenerUsuarioPorID': (
+        'SELECT * FROM Usuarios WHERE UsuarioID = :p0',
+    ),
+    'ObtenerPerfilUsuarioPorID': (
+        'SELECT * FROM PerfilesUsuario WHERE PerfilID = :p0',
+    ),
+    'ObtenerTareaPorID': (
+        'SELECT * FROM Tareas WHERE TareaID = :p0',
+    ),
+    'CrearAdjunto': (
+        'INSERT INTO Blobs (Hash, Tamano, Referencias) VALUES (:p3, :p4, 1) '
+        'ON CONFLICT (Hash) DO UPDATE SET Referencias = Referencias + 1',
+        'INSERT INTO Adjuntos (TareaID, Archivo, Nombre, Hash, Tamano, TipoContenido) '
+        'VALUES (:p0, :p1, :p2, :p3, :p4, :p5)',
+        'SELECT last_insert_rowid() AS AdjuntoID',
+    ),
+    'ObtenerAdjuntoPorID': (
+        'SELECT * FROM Adjuntos WHERE AdjuntoID = :p0',
+    ),
+    'ObtenerEtiquetaPorID': (
+        'SELECT * FROM Etiquetas WHERE EtiquetaID = :p0',
+    ),
+    'CrearNotificacion': (
+        'INSERT INTO Notificaciones (UsuarioID, Mensaje, Fecha, Leida) VALUES (:p0, :p1, CURRENT_TIMESTAMP, :p2)',
+        'INSERT INTO ContadoresNotificaciones (UsuarioID, NoLeidas) SELECT :p0, 1 WHERE :p0 IS NOT NULL AND NOT :p2 '
+        'ON CONFLICT (UsuarioID) DO UPDATE SET NoLeidas = NoLeidas + 1',
+    ),
+    'ObtenerNotificacionPorID': (
+        'SELECT * FROM Notificaciones WHERE NotificacionID = :p0',
+    ),
+    # julianday() because SQLAlchemy stores microseconds and the cursor may not carry them.
+    'ObtenerBandejaNotificaciones': (
+        'SELECT * FROM Notificaciones WHERE UsuarioID = :p0 AND (:p1 IS NULL OR Leida = :p1) '
+        'AND (:p3 IS NULL OR julianday(Fecha) < julianday(:p2) '
+        'OR (julianday(Fecha) = julianday(:p2) AND NotificacionID < :p3)) '
+        'ORDER BY julianday(Fecha) DESC, NotificacionID DESC LIMIT :p4',
+    ),
+    'ObtenerContadorNotificaciones': (
+        'SELECT COALESCE((SELECT NoLeidas FROM ContadoresNotificaciones WHERE UsuarioID = :p0), 0) AS NoLeidas',
+    ),
+    'MarcarNotificacionesLeidas': (
+        'UPDATE ContadoresNotificaciones SET NoLeidas = 0 WHERE UsuarioID = :p0',
+        'UPDATE Notificaciones SET Leida = 1 WHERE UsuarioID = :p0 AND Leida = 0',
+        'SELECT changes() AS Actualizadas',
+    ),
+    'EliminarNotificacion': (
+        'UPDATE ContadoresNotificaciones SET NoLeidas = MAX(NoLeidas - 1, 0) WHERE UsuarioID = '
+        '(SELECT UsuarioID FROM Notificaciones WHERE NotificacionID = :p0 AND NOT Leida)',
+        'DELETE FROM Notificaciones WHERE NotificacionID = :p0',
+    ),
+}
+
+
+def _datetime(value):
+    return datetime.datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class ProcedureCursor(sqlite3.Cursor):
+    _datetimes = ()
+
+    def callproc(self, procedure_name, params):
+        try:
+            statements = PROCEDURES[procedure_name]
+        except KeyError:
+            raise sqlite3.OperationalError('PROCEDURE %s does not exist' % procedure_name)
+        bound = {'p%d' % i: value for i, value in enumerate(params)}
+        for statement in statements:
+            self.execute(statement, bound)
+        self._datetimes = [i for i, column in enumerate(self.description or ()) if column[0] in DATETIME_COLUMNS]
+        return params
+
+    def _convert(self, rows):
+        if not self._datetimes:
+            return rows
+        converted = []
+        for row in rows:
+            row = list(row)
+            for i in self._datetimes:
+                row[i] = _datetime(row[i])
+            converted.append(tuple(row))
+        return converted
+
+    def fetchone(self):
+        row = super().fetchone()
+        return row if row is None else self._convert([row])[0]
+
+    def fetchmany(self, size=None):
+        return self._convert(super().fetchmany(self.arraysize if size is None else size))
+
+    def fetchall(self):
+        return self._convert(super().fetchall())
+
+
+class ProcedureConnection(sqlite3.Connection):
+
+    def cursor(self, factory=ProcedureCursor):
+        return super().cursor(factory)
+
+
+class ProcedureConfig(DevelopmentConfig):
+    TESTING = True
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'factory': ProcedureConnection}}
@@ -0,0 +1,103 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from app import db, blob_storage
+from app.models import Adjunto, Blob
+from app.storage import MULTIPART_OVERHEAD
+from app.tests.base import AppTestCase
+from app.tests.sqlite_procedures import ProcedureConfig
+
+CONTENT = b'0123456789abcdefghijklmnopqrstuvwxyz'
+
+class AdjuntosTestCase(AppTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        class AdjuntosConfig(ProcedureConfig):
+            ADJUNTOS_DIR = self.root
+            ADJUNTOS_OFFLOAD = None
+            ADJUNTOS_MAX_BYTES = 64
+            PREVIEWS_ENABLED = False
+
+        self.config = AdjuntosConfig
+        super().setUp()
+        blob = blob_storage.receive(io.BytesIO(CONTENT))
+        blob_storage.commit(blob)
+        self.hash = blob.Hash
+        db.session.add(Adjunto(Archivo=blob_storage.relative_path(blob.Hash), Nombre='notas.txt', Hash=blob.Hash,
+                               Tamano=blob.Tamano, TipoContenido='text/plain'))
+        db.session.commit()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.root)
+
+    def download(self, **headers):
+        return self.client.get('/api/adjuntos/1/content', headers=dict(self.headers, **headers))
+
+    def test_download(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), CONTENT)
+        self.assertEqual(response.headers['ETag'], '"%s"' % self.hash)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertIn('notas.txt', response.headers['Content-Disposition'])
+        self.assertEqual(response.headers['X-Content-Type-Options'], 'nosniff')
+
+    def test_if_none_match(self):
+        response = self.download(**{'If-None-Match': '"%s"' % self.hash})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+    def test_range(self):
+        response = self.download(Range='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.get_data(), CONTENT[:10])
+        self.assertEqual(response.headers['Content-Range'], 'bytes 0-9/%d' % len(CONTENT))
+
+    def test_unsatisfiable_range(self):
+        response = self.download(Range='bytes=1000-2000')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */%d' % len(CONTENT))
+
+    def test_x_sendfile(self):
+        self.app.config['ADJUNTOS_OFFLOAD'] = 'x-sendfile'
+        response = self.download(Range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Sendfile'], blob_storage.path(self.hash))
+        self.assertEqual(response.get_data(), b'')
+
+    def test_x_accel_redirect(self):
+        self.app.config['ADJUNTOS_OFFLOAD'] = 'x-accel-redirect'
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Sendfile', response.headers)
+        self.assertEqual(response.headers['X-Accel-Redirect'],
+                         '/_adjuntos/' + blob_storage.relative_path(self.hash).replace('\\', '/'))
+        self.assertEqual(response.get_data(), b'')
+
+    def upload(self, content, chunked=False):
+        environ = {'wsgi.input_terminated': True, 'CONTENT_LENGTH': ''} if chunked else {}
+        return self.client.post('/api/tareas/1/adjuntos', data={'file': (io.BytesIO(content), 'subida.bin')},
+                                headers=self.headers, environ_overrides=environ)
+
+    def test_upload_limits(self):
+        self.assertEqual(self.app.config['MAX_CONTENT_LENGTH'], 64 + MULTIPART_OVERHEAD)
+        response = self.upload(b'x' * 64)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(db.session.get(Blob, response.get_json()['Hash']).Referencias, 1)
+        self.assertEqual(self.upload(b'x' * 65).status_code, 413)
+        self.assertEqual(self.upload(b'x' * (MULTIPART_OVERHEAD + 65)).status_code, 413)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+    def test_chunked_upload_limits(self):
+        self.assertEqual(self.upload(b'x' * 64, chunked=True).status_code, 201)
+        response = self.upload(b'x' * (MULTIPART_OVERHEAD + 65), chunked=True)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.get_json()['message'], 'File too large')
+
+if __name__ == '__main__':
+    unittest.main()
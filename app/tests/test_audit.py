@@ -0,0 +1,81 @@
+import json
+import os
+import queue
+import tempfile
+import unittest
+from app import db, audit
+from app.models import Board, Proyecto, Columna, Tarea, AuditLog
+from app.tests.base import AppTestCase, TestConfig
+
+class AuditConfig(TestConfig):
+    AUDIT_FLUSH_INTERVAL_MS = 10000
+    AUDIT_BATCH_SIZE = 3
+
+class AuditTestCase(AppTestCase):
+    config = AuditConfig
+
+    def setUp(self):
+        # A file database, so the worker thread gets a connection of its own.
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        AuditConfig.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + self.path
+        super().setUp()
+
+    def tearDown(self):
+        audit.shutdown()
+        super().tearDown()
+        db.get_engine(self.app).dispose()
+        os.remove(self.path)
+
+    def logged(self):
+        return db.session.query(AuditLog.Accion).count()
+
+    def test_batches_and_flush(self):
+        self.assertFalse(audit.inline)
+        for i in range(4):
+            self.assertTrue(audit.record('accion_%d' % i, {'n': i}, None))
+        audit.flush()
+        self.assertEqual(self.logged(), 4)
+        stats = audit.stats()
+        self.assertEqual((stats['written'], stats['batches'], stats['queued']), (4, 2, 0))
+
+    def test_shutdown_writes_pending_records(self):
+        audit.record('pendiente')
+        audit.shutdown()
+        self.assertEqual(self.logged(), 1)
+
+    def test_full_queue_drops(self):
+        audit.shutdown()
+        audit.overflow = 'drop'
+        audit._queue = queue.Queue(maxsize=2)
+        # Keep the worker from draining the queue while it fills up.
+        audit._ensure_worker = lambda: None
+        results = [audit.record('accion') for _ in range(3)]
+        del audit._ensure_worker
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(audit.stats()['dropped'], 1)
+
+    def test_mutating_requests_are_recorded(self):
+        board = Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board')
+        db.session.add(board)
+        db.session.flush()
+        proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto')
+        db.session.add(proyecto)
+        db.session.flush()
+        columna = Columna(ProyectoID=proyecto.ProyectoID, ColumnaNombre='Hacer')
+        tarea = Tarea(ProyectoID=proyecto.ProyectoID, Titulo='Tarea')
+        db.session.add_all([columna, tarea])
+        db.session.commit()
+        response = self.client.post('/api/tareas/%d/move' % tarea.TareaID, json={'ColumnaID': columna.ColumnaID},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.client.post('/api/tareas/%d/move' % tarea.TareaID, json={}, headers=self.headers)
+        self.client.get('/api/boards/%d/stats' % board.BoardID, headers=self.headers)
+        audit.flush()
+        logs = db.session.query(AuditLog).all()
+        self.assertEqual([(log.UsuarioID, log.Accion) for log in logs],
+                         [(self.usuario_id, 'tareas.move_tarea_route')])
+        self.assertEqual(json.loads(logs[0].Detalles)['args'], {'id': tarea.TareaID})
+
+if __name__ == '__main__':
+    unittest.main()
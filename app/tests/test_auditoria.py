@@ -0,0 +1,92 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from app import db
+from app.audit_archive import ARCHIVE_NAME, compact, retention_cutoff
+from app.models import Usuario, AuditLog
+from app.tests.base import AppTestCase
+
+class AuditoriaTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.archive = tempfile.mkdtemp()
+        self.app.config['AUDIT_ARCHIVE_DIR'] = self.archive
+        juan = Usuario(Nombre='Juan', Apellido='Gómez', CorreoElectronico='juan@example.com', PasswordHash='x')
+        db.session.add(juan)
+        db.session.flush()
+        self.usuario_ids = [self.usuario_id, juan.UsuarioID]
+        # Two logs a day from 2024-01-01 to 2024-03-31, alternating users.
+        start = datetime.datetime(2024, 1, 1)
+        db.session.add_all([AuditLog(UsuarioID=self.usuario_ids[i % 2], Accion='tareas.create_tarea' if i % 3 else
+                                     'tareas.delete_tarea', Fecha=start + datetime.timedelta(hours=12 * i))
+                            for i in range(182)])
+        db.session.commit()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.archive)
+
+    def pages(self, **args):
+        ids, after = [], None
+        while True:
+            query = dict(args, limit=7, **({'after': after} if after else {}))
+            body = self.client.get('/api/auditoria', query_string=query,
+                                   headers=self.headers).get_json()
+            ids.extend(log['LogID'] for log in body['items'])
+            after = body['next_cursor']
+            if after is None:
+                return ids
+
+    def expected(self, **filters):
+        query = AuditLog.query
+        if 'usuario_id' in filters:
+            query = query.filter_by(UsuarioID=filters['usuario_id'])
+        if 'desde' in filters:
+            query = query.filter(AuditLog.Fecha >= filters['desde'])
+        if 'hasta' in filters:
+            query = query.filter(AuditLog.Fecha < filters['hasta'])
+        return [log.LogID for log in query.order_by(AuditLog.Fecha.desc(), AuditLog.LogID.desc())]
+
+    def test_filters_and_keyset_pages(self):
+        filters = {'usuario_id': self.usuario_ids[1], 'desde': datetime.datetime(2024, 1, 20),
+                   'hasta': datetime.datetime(2024, 2, 10, 12)}
+        args = dict(filters, desde='2024-01-20', hasta='2024-02-10T12:00:00')
+        self.assertEqual(self.pages(**args), self.expected(**filters))
+        self.assertEqual(len(self.pages(accion='tareas.delete_tarea')), 61)
+        response = self.client.get('/api/auditoria?desde=ayer', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_compacted_months_are_still_listed(self):
+        everything = self.expected()
+        february = self.expected(desde=datetime.datetime(2024, 2, 1), hasta=datetime.datetime(2024, 3, 1))
+        moved = compact(retention_cutoff(10, today=datetime.date(2024, 3, 15)))
+        self.assertEqual(moved, {'2024-01': 62, '2024-02': 58})
+        self.assertTrue(os.path.exists(os.path.join(self.archive, ARCHIVE_NAME % (2024, 1))))
+        self.assertEqual(AuditLog.query.count(), 62)
+        self.assertEqual(self.pages(), everything)
+        self.assertEqual(self.pages(desde='2024-02-01', hasta='2024-03-01'), february)
+        # A late row for an archived month is merged into its file.
+        db.session.add(AuditLog(UsuarioID=self.usuario_ids[0], Accion='tardio', Fecha=datetime.datetime(2024, 1, 5)))
+        db.session.commit()
+        self.assertEqual(compact(datetime.datetime(2024, 3, 1)), {'2024-01': 1})
+        self.assertEqual(self.pages(accion='tardio', hasta='2024-02-01'), [183])
+
+    def test_late_rows_keep_their_place_before_compaction(self):
+        keys = [(log.Fecha, log.LogID) for log in AuditLog.query]
+        compact(datetime.datetime(2024, 3, 1))
+        # A row the audit writer commits late, for a month already archived.
+        tardio = AuditLog(UsuarioID=self.usuario_ids[0], Accion='tardio', Fecha=datetime.datetime(2024, 1, 5))
+        db.session.add(tardio)
+        db.session.commit()
+        keys.append((tardio.Fecha, tardio.LogID))
+        self.assertEqual(self.pages(), [log_id for _, log_id in sorted(keys, reverse=True)])
+        response = self.client.get('/api/auditoria?stream=ndjson', headers=self.headers)
+        self.assertEqual([json.loads(line)['LogID'] for line in response.get_data(as_text=True).splitlines()],
+                         [log_id for _, log_id in sorted(keys, reverse=True)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import datetime
+import time
+import unittest
+import jwt
+from app import create_app, db
+from app.cache import TTLCache
+from app.models import Usuario
+from app.routes.auth import token_required, invalidate_user, token_cache, user_cache
+
+class TTLCacheTestCase(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_expires_at_bounds_ttl(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1, expires_at=time.time() - 1)
+        self.assertIsNone(cache.get('a'))
+
+class TokenRequiredCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+
+        @self.app.route('/whoami')
+        @token_required
+        def whoami(current_user):
+            return {'Nombre': current_user.Nombre}
+
+        self.client = self.app.test_client()
+        token_cache.clear()
+        user_cache.clear()
+        with self.app.app_context():
+            db.create_all()
+            user = Usuario(
+                Nombre='Test',
+                Apellido='User',
+                CorreoElectronico='test@example.com',
+                PasswordHash='x'
+            )
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.UsuarioID
+        self.token = jwt.encode(
+            {'UsuarioID': self.user_id, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=5)},
+            self.app.config['SECRET_KEY'], algorithm="HS256")
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def get(self):
+        return self.client.get('/whoami', headers={'x-access-tokens': self.token})
+
+    def test_user_is_cached_until_invalidated(self):
+        self.assertEqual(self.get().get_json(), {'Nombre': 'Test'})
+        with self.app.app_context():
+            Usuario.query.filter_by(UsuarioID=self.user_id).update({'Nombre': 'Renamed'})
+            db.session.commit()
+        self.assertEqual(self.get().get_json(), {'Nombre': 'Test'})
+        self.assertEqual(user_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        invalidate_user(self.user_id)
+        self.assertEqual(self.get().get_json(), {'Nombre': 'Renamed'})
+
+    def test_deleted_user_is_rejected(self):
+        with self.app.app_context():
+            Usuario.query.filter_by(UsuarioID=self.user_id).delete()
+            db.session.commit()
+        response = self.get()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.get_json()['message'], 'Token is invalid!')
+        for url in ('/api/notificaciones/bandeja', '/api/tareas?estado=pendiente', '/api/admin/procedures'):
+            response = self.client.get(url, headers={'x-access-tokens': self.token})
+            self.assertEqual(response.status_code, 403, url)
+
+if __name__ == '__main__':
+    unittest.main()
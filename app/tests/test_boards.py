@@ -0,0 +1,64 @@
+import unittest
+from app import db
+from app.models import AsignacionTarea, Board, Columna, Etiqueta, Proyecto, Tarea, TareaColumna, TareaEtiqueta, Usuario
+from app.tests.base import AppTestCase
+
+class BoardSnapshotTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Usuario(Nombre='Juan', Apellido='Gómez', CorreoElectronico='juan@example.com', PasswordHash='x'),
+            Board(UsuarioPropietarioID=1, Titulo='Board'),
+            Proyecto(BoardID=1, Titulo='Proyecto'),
+            Columna(ProyectoID=1, ColumnaNombre='Por hacer'),
+            Tarea(ProyectoID=1, Titulo='Primera'),
+            Tarea(ProyectoID=1, Titulo='Segunda'),
+            Etiqueta(Nombre='urgente'),
+        ])
+        db.session.flush()
+        db.session.add_all([
+            TareaColumna(TareaID=1, ColumnaID=1, Posicion=1000),
+            TareaColumna(TareaID=2, ColumnaID=1, Posicion=2000),
+            TareaEtiqueta(TareaID=1, EtiquetaID=1),
+            AsignacionTarea(TareaID=1, UsuarioID=2),
+        ])
+        db.session.commit()
+        self.etag = self.get().headers['ETag']
+
+    def get(self, etag=None):
+        headers = dict(self.headers, **({'If-None-Match': etag} if etag else {}))
+        return self.client.get('/api/boards/1/snapshot', headers=headers)
+
+    def assertChanged(self):
+        response = self.get(self.etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], self.etag)
+        return response.get_json()
+
+    def test_unchanged_board_is_not_modified(self):
+        self.assertEqual(self.get(self.etag).status_code, 304)
+
+    def test_swapping_card_positions(self):
+        db.session.get(TareaColumna, (1, 1)).Posicion = 2000
+        db.session.get(TareaColumna, (2, 1)).Posicion = 1000
+        db.session.commit()
+        tareas = self.assertChanged()['proyectos'][0]['columnas'][0]['tareas']
+        self.assertEqual([t['Titulo'] for t in tareas], ['Segunda', 'Primera'])
+
+    def test_moving_tag_and_assignee_to_another_card(self):
+        db.session.query(TareaEtiqueta).update({'TareaID': 2})
+        db.session.query(AsignacionTarea).update({'TareaID': 2})
+        db.session.commit()
+        tareas = self.assertChanged()['proyectos'][0]['columnas'][0]['tareas']
+        self.assertEqual([(t['etiquetas'], t['asignados']) for t in tareas],
+                         [([], []), ([{'EtiquetaID': 1, 'Nombre': 'urgente'}], [2])])
+
+    def test_renaming_a_tag(self):
+        db.session.get(Etiqueta, 1).Nombre = 'bloqueada'
+        db.session.commit()
+        tareas = self.assertChanged()['proyectos'][0]['columnas'][0]['tareas']
+        self.assertEqual(tareas[0]['etiquetas'][0]['Nombre'], 'bloqueada')
+
+if __name__ == '__main__':
+    unittest.main()
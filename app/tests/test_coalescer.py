@@ -0,0 +1,59 @@
+import unittest
+from app.coalescer import TaskEventCoalescer
+
+class TaskEventCoalescerTestCase(unittest.TestCase):
+
+    def make(self, **kwargs):
+        self.sent = []
+        # Nothing is flushed in the background; the tests call flush().
+        return TaskEventCoalescer(lambda event, payload, rooms: self.sent.append((event, payload, rooms)),
+                                  start_task=lambda target: None, **kwargs)
+
+    def test_updates_within_window_are_merged_into_a_diff(self):
+        coalescer = self.make()
+        coalescer.submit(1, {'Titulo': 'a', 'Estado': 'pendiente'}, {'Titulo': 'ab', 'Estado': 'pendiente'}, ['board:1'])
+        coalescer.submit(1, {'Titulo': 'ab'}, {'Titulo': 'abc'}, ['board:1'])
+        coalescer.submit(1, {'Estado': 'pendiente'}, {'Estado': 'completada'}, ['board:1', 'proyecto:2'])
+        self.assertEqual(self.sent, [])
+        coalescer.flush()
+        self.assertEqual(self.sent, [('update_task', {'task': {'TareaID': 1, 'Titulo': 'abc', 'Estado': 'completada'}},
+                                      ['board:1', 'proyecto:2'])])
+        stats = coalescer.stats()
+        self.assertEqual((stats['events_in'], stats['events_out'], stats['merged']), (3, 1, 2))
+
+    def test_reverted_changes_send_nothing(self):
+        coalescer = self.make()
+        coalescer.submit(1, {'Titulo': 'a'}, {'Titulo': 'b'}, ['board:1'])
+        coalescer.submit(1, {'Titulo': 'b'}, {'Titulo': 'a'}, ['board:1'])
+        coalescer.flush()
+        self.assertEqual(self.sent, [])
+        self.assertEqual(coalescer.stats()['unchanged'], 1)
+
+    def test_discard_forgets_pending_update(self):
+        coalescer = self.make()
+        coalescer.submit(1, {'Titulo': 'a'}, {'Titulo': 'b'}, ['board:1'])
+        coalescer.discard(1)
+        coalescer.flush()
+        self.assertEqual(self.sent, [])
+
+    def test_overflow_policies(self):
+        coalescer = self.make(max_pending=1, overflow='flush')
+        coalescer.submit(1, {'Titulo': 'a'}, {'Titulo': 'b'}, ['board:1'])
+        coalescer.submit(2, {'Titulo': 'a'}, {'Titulo': 'c'}, ['board:1'])
+        self.assertEqual([payload['task']['TareaID'] for _, payload, _ in self.sent], [1])
+        self.assertEqual(coalescer.stats()['overflow_flushes'], 1)
+
+        coalescer = self.make(max_pending=1, overflow='drop')
+        coalescer.submit(1, {'Titulo': 'a'}, {'Titulo': 'b'}, ['board:1'])
+        coalescer.submit(2, {'Titulo': 'a'}, {'Titulo': 'c'}, ['board:1'])
+        coalescer.flush()
+        self.assertEqual([payload['task']['TareaID'] for _, payload, _ in self.sent], [1])
+        self.assertEqual(coalescer.stats()['dropped'], 1)
+
+    def test_zero_window_sends_immediately(self):
+        coalescer = self.make(window=0)
+        coalescer.submit(1, {'Titulo': 'a', 'Importancia': 1}, {'Titulo': 'b', 'Importancia': 1}, ['board:1'])
+        self.assertEqual(self.sent, [('update_task', {'task': {'TareaID': 1, 'Titulo': 'b'}}, ['board:1'])])
+
+if __name__ == '__main__':
+    unittest.main()
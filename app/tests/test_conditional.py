@@ -0,0 +1,62 @@
+import datetime
+import unittest
+from werkzeug.http import http_date
+from app import db
+from app.models import Board, Proyecto, Tarea
+from app.tests.base import AppTestCase
+from app.tests.sqlite_procedures import ProcedureConfig
+
+UPDATED = datetime.datetime(2026, 3, 2, 12, 30, 15)
+
+class ConditionalGetTestCase(AppTestCase):
+    config = ProcedureConfig
+
+    def setUp(self):
+        super().setUp()
+        db.session.add(Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board'))
+        db.session.add(Proyecto(BoardID=1, Titulo='Proyecto'))
+        db.session.add(Tarea(ProyectoID=1, Titulo='Tarea', UltimaActualizacion=UPDATED))
+        db.session.commit()
+
+    def get(self, **headers):
+        return self.client.get('/api/tareas/1', headers=dict(self.headers, **headers))
+
+    def test_if_none_match(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Last-Modified'], http_date(UPDATED.replace(tzinfo=datetime.timezone.utc)))
+        cached = self.get(**{'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers['ETag'], response.headers['ETag'])
+        self.assertEqual(cached.get_data(), b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.get().headers['Last-Modified']
+        self.assertEqual(self.get(**{'If-Modified-Since': last_modified}).status_code, 304)
+        earlier = http_date(UPDATED.replace(tzinfo=datetime.timezone.utc) - datetime.timedelta(seconds=1))
+        self.assertEqual(self.get(**{'If-Modified-Since': earlier}).status_code, 200)
+
+    def test_if_none_match_wins_over_if_modified_since(self):
+        last_modified = self.get().headers['Last-Modified']
+        response = self.get(**{'If-None-Match': '"otro"', 'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_within_the_same_second_is_not_cached(self):
+        last_modified = self.get().headers['Last-Modified']
+        tarea = db.session.get(Tarea, 1)
+        tarea.UltimaActualizacion = UPDATED.replace(microsecond=400000)
+        db.session.commit()
+        self.assertEqual(self.get(**{'If-Modified-Since': last_modified}).status_code, 200)
+
+    def test_etag_changes_after_update(self):
+        etag = self.get().headers['ETag']
+        tarea = db.session.get(Tarea, 1)
+        tarea.Titulo = 'Tarea editada'
+        db.session.commit()
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_json()['Titulo'], 'Tarea editada')
+
+if __name__ == '__main__':
+    unittest.main()
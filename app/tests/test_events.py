@@ -0,0 +1,85 @@
+import datetime
+import unittest
+import jwt
+from app import create_app, db, socketio
+from app.models import Usuario, Board, Proyecto, Tarea
+
+class TaskRoomsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            owners = []
+            for i in range(2):
+                user = Usuario(Nombre='Test', Apellido=str(i), CorreoElectronico='u%d@example.com' % i, PasswordHash='x')
+                db.session.add(user)
+                db.session.flush()
+                board = Board(UsuarioPropietarioID=user.UsuarioID, Titulo='Board %d' % i)
+                db.session.add(board)
+                db.session.flush()
+                proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto %d' % i)
+                db.session.add(proyecto)
+                db.session.flush()
+                owners.append((user.UsuarioID, board.BoardID, proyecto.ProyectoID))
+            db.session.commit()
+        self.owners = owners
+        self.tokens = [self.token(usuario_id) for usuario_id, _, _ in owners]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def token(self, usuario_id):
+        return jwt.encode(
+            {'UsuarioID': usuario_id, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=5)},
+            self.app.config['SECRET_KEY'], algorithm="HS256")
+
+    def socket(self, token, board_id):
+        client = socketio.test_client(self.app, auth={'token': token})
+        client.emit('join_board', {'BoardID': board_id})
+        return client
+
+    def test_connect_requires_token(self):
+        client = socketio.test_client(self.app)
+        self.assertFalse(client.is_connected())
+
+    def test_join_foreign_board_is_rejected(self):
+        client = self.socket(self.tokens[1], self.owners[0][1])
+        self.assertEqual(client.get_received()[0]['name'], 'error')
+
+    def test_task_events_only_reach_their_board(self):
+        first = self.socket(self.tokens[0], self.owners[0][1])
+        second = self.socket(self.tokens[1], self.owners[1][1])
+        first.get_received()
+        second.get_received()
+        response = self.client.post('/api/tareas/bulk', json=[{'ProyectoID': self.owners[0][2], 'Titulo': 'Nueva'}],
+                                    headers={'x-access-tokens': self.tokens[0]})
+        self.assertEqual(response.status_code, 201)
+        received = first.get_received()
+        self.assertEqual([event['name'] for event in received], ['new_tasks'])
+        self.assertEqual(received[0]['args'][0]['tasks'][0]['Titulo'], 'Nueva')
+        self.assertEqual(received[0]['args'][0]['tasks'][0]['TareaID'], response.get_json()['results'][0]['TareaID'])
+        self.assertEqual(second.get_received(), [])
+
+    def test_bulk_create_reports_each_item(self):
+        proyecto_id = self.owners[0][2]
+        response = self.client.post('/api/tareas/bulk', json=[
+            {'ProyectoID': proyecto_id, 'Titulo': 'Primera'},
+            {'ProyectoID': proyecto_id},
+            {'ProyectoID': 999, 'Titulo': 'Sin proyecto'},
+            {'ProyectoID': proyecto_id, 'Titulo': 'Segunda'},
+        ], headers={'x-access-tokens': self.tokens[0]})
+        self.assertEqual(response.status_code, 207)
+        results = response.get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'invalid', 'not_found', 'created'])
+        self.assertIn('Titulo', results[1]['errors'])
+        with self.app.app_context():
+            titulos = dict(db.session.query(Tarea.TareaID, Tarea.Titulo))
+        self.assertEqual(titulos, {results[0]['TareaID']: 'Primera', results[3]['TareaID']: 'Segunda'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import datetime
+import unittest
+from app import db
+from app.filters import get_tarea_filters, tareas_query
+from app.models import Board, Proyecto, Tarea, Etiqueta, TareaEtiqueta, AsignacionTarea
+from app.pagination import decode_cursor
+from app.tests.base import AppTestCase
+
+class TareaFiltersTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        board = Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board')
+        db.session.add(board)
+        db.session.flush()
+        proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto')
+        etiqueta = Etiqueta(Nombre='urgente')
+        db.session.add_all([proyecto, etiqueta])
+        db.session.flush()
+        self.proyecto_id, self.etiqueta_id = proyecto.ProyectoID, etiqueta.EtiquetaID
+        db.session.commit()
+
+    def add_tarea(self, importancia, estado='pendiente', dias=0, etiquetada=False, asignaciones=0):
+        tarea = Tarea(ProyectoID=self.proyecto_id, Titulo='Tarea', Importancia=importancia, Estado=estado,
+                      FechaVencimiento=datetime.date.today() + datetime.timedelta(days=dias))
+        db.session.add(tarea)
+        db.session.flush()
+        if etiquetada:
+            db.session.add(TareaEtiqueta(TareaID=tarea.TareaID, EtiquetaID=self.etiqueta_id))
+        for _ in range(asignaciones):
+            db.session.add(AsignacionTarea(TareaID=tarea.TareaID, UsuarioID=self.usuario_id))
+        db.session.commit()
+        return tarea.TareaID
+
+    def matching(self, **filters):
+        return [row[0] for row in db.session.execute(tareas_query(filters))]
+
+    def test_parse_filters(self):
+        with self.app.test_request_context('/?estado=pendiente,en_proceso&importancia_min=4'
+                                           '&vence_hasta=2024-05-01&usuario_id=me'):
+            self.assertEqual(get_tarea_filters(7), {
+                'estado': ['pendiente', 'en_proceso'], 'importancia_min': 4,
+                'vence_hasta': datetime.date(2024, 5, 1), 'usuario_id': 7})
+        for query in ('estado=cerrada', 'importancia_min=alta', 'vence_desde=mañana'):
+            with self.app.test_request_context('/?' + query):
+                with self.assertRaises(ValueError):
+                    get_tarea_filters(7)
+
+    def test_filters_are_combined(self):
+        vencida = self.add_tarea(5, dias=-1, etiquetada=True, asignaciones=2)
+        self.add_tarea(5, estado='completada', dias=-1, etiquetada=True, asignaciones=1)
+        self.add_tarea(2, dias=-1, etiquetada=True, asignaciones=1)
+        self.add_tarea(5, dias=3, etiquetada=True, asignaciones=1)
+        self.add_tarea(5, dias=-1, asignaciones=1)
+        self.add_tarea(5, dias=-1, etiquetada=True)
+        self.assertEqual(self.matching(estado=['pendiente', 'en_proceso'], importancia_min=4,
+                                       vence_hasta=datetime.date.today(), etiqueta_id=self.etiqueta_id,
+                                       usuario_id=self.usuario_id), [vencida])
+
+    def test_route_paginates_filtered_tasks(self):
+        ids = [self.add_tarea(4 + i % 2) for i in range(5)]
+        body = self.client.get('/api/tareas?importancia_min=5&limit=1', headers=self.headers).get_json()
+        self.assertEqual([item['TareaID'] for item in body['items']], [ids[1]])
+        after = body['next_cursor']
+        self.assertEqual(decode_cursor(after), [ids[1]])
+        body = self.client.get('/api/tareas?importancia_min=5&limit=1&after=' + after, headers=self.headers).get_json()
+        self.assertEqual([item['TareaID'] for item in body['items']], [ids[3]])
+        self.assertIsNone(body['next_cursor'])
+        response = self.client.get('/api/tareas?estado=cerrada', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
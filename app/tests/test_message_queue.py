@@ -0,0 +1,51 @@
+import time
+import unittest
+import uuid
+import socketio as python_socketio
+from app import create_app, socketio
+from app.message_queue import LocalPubSubManager, make_client_manager
+from config import DevelopmentConfig
+
+class MessageQueueTestCase(unittest.TestCase):
+    """Two Socket.IO servers sharing a local queue behave like two workers."""
+
+    def setUp(self):
+        channel = 'test-%s' % uuid.uuid4().hex
+
+        class QueueConfig(DevelopmentConfig):
+            SOCKETIO_MESSAGE_QUEUE = 'local://'
+            SOCKETIO_CHANNEL = channel
+
+        self.app = create_app(QueueConfig)
+        # The Flask-SocketIO test client refuses message queues, so the other
+        # worker is a bare server whose outgoing packets are recorded.
+        self.other = python_socketio.Server(client_manager=LocalPubSubManager(channel=channel),
+                                            async_mode='threading')
+        self.delivered = []
+        self.other._send_packet = lambda eio_sid, pkt: self.delivered.append((eio_sid, pkt.data))
+        self.other.manager.initialize()
+
+    def tearDown(self):
+        socketio.server.manager.close()
+        self.other.manager.close()
+
+    def wait_for_delivery(self, timeout=2):
+        deadline = time.monotonic() + timeout
+        while not self.delivered and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.delivered
+
+    def test_emit_reaches_clients_on_other_worker(self):
+        member = self.other.manager.connect('member', '/')
+        self.other.manager.connect('outsider', '/')
+        self.other.manager.enter_room(member, '/', 'board:1')
+        with self.app.app_context():
+            socketio.emit('update_task', {'task': {'TareaID': 1}}, to='board:1')
+        self.assertEqual(self.wait_for_delivery(), [('member', ['update_task', {'task': {'TareaID': 1}}])])
+
+    def test_without_url_keeps_default_manager(self):
+        self.assertIsNone(make_client_manager(None))
+        self.assertIsInstance(make_client_manager('local://'), LocalPubSubManager)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from app import db, metrics
+from app.models import Board, Proyecto, Tarea
+from app.profiler import SamplingProfiler
+from app.tests.base import AppTestCase, TestConfig
+
+class ProfiledConfig(TestConfig):
+    METRICS_PROFILE_SLOW_MS = 20
+    METRICS_PROFILE_INTERVAL_MS = 1
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+class MetricsTestCase(AppTestCase):
+    config = ProfiledConfig
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        ProfiledConfig.METRICS_PROFILE_DIR = self.dir
+        super().setUp()
+        self.app.add_url_rule('/lento', 'lento', self.lento)
+
+    @staticmethod
+    def lento():
+        busy(0.05)
+        return 'ok'
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.dir)
+
+    def test_request_phases_and_db_calls(self):
+        board = Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board')
+        db.session.add(board)
+        db.session.flush()
+        proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto')
+        db.session.add(proyecto)
+        db.session.flush()
+        db.session.add(Tarea(ProyectoID=proyecto.ProyectoID, Titulo='Tarea'))
+        db.session.commit()
+        response = self.client.get('/api/tareas?estado=pendiente', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.client.get('/api/tareas?estado=pendiente')
+
+        response = self.client.get('/metrics')
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        self.assertIn('http_requests_total{endpoint="tareas.get_tareas",method="GET",status="200"} 1', text)
+        self.assertIn('http_requests_total{endpoint="tareas.get_tareas",method="GET",status="403"} 1', text)
+        # Both requests encode a JSON body; only the authenticated one gets further.
+        for phase, count in (('auth', 1), ('user_lookup', 1), ('sql', 1), ('serialization', 2)):
+            self.assertIn('http_request_phase_seconds_count{endpoint="tareas.get_tareas",phase="%s"} %d'
+                          % (phase, count), text)
+        # The 403 made no query; the 200 made its user lookup and at least one listing query.
+        self.assertIn('http_request_db_calls_bucket{endpoint="tareas.get_tareas",le="0"} 1', text)
+        self.assertIn('http_request_db_calls_bucket{endpoint="tareas.get_tareas",le="+Inf"} 2', text)
+        self.assertIn('http_request_db_calls_bucket{endpoint="tareas.get_tareas",le="1"} 1', text)
+
+    def test_slow_requests_are_profiled(self):
+        client = self.app.test_client()
+        self.assertEqual(self.client.get('/swagger').status_code, 302)
+        self.assertEqual(os.listdir(self.dir), [])
+        self.assertEqual(self.client.get('/lento').status_code, 200)
+        [name] = os.listdir(self.dir)
+        self.assertRegex(name, r'-lento-\d+ms\.folded$')
+        with open(os.path.join(self.dir, name)) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any('busy (test_metrics.py' in line for line in lines))
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn('http_slow_request_profiles_total{endpoint="lento"} 1', metrics.render())
+
+    def test_profiler_folds_sampled_stacks(self):
+        profiler = SamplingProfiler(interval=0.001, directory=self.dir)
+        profiler.start()
+        busy(0.03)
+        counts = profiler.stop()
+        self.assertTrue(any(stack.split(';')[-1].startswith('busy (test_metrics.py') for stack in counts))
+        self.assertIsNone(profiler.stop())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import datetime
+import unittest
+from app import db
+from app.models import Notificacion, Usuario
+from app.tests.base import AppTestCase
+from app.tests.sqlite_procedures import ProcedureConfig
+
+class NotificacionesTestCase(AppTestCase):
+    config = ProcedureConfig
+
+    def setUp(self):
+        super().setUp()
+        db.session.add(Usuario(Nombre='Juan', Apellido='Gómez', CorreoElectronico='juan@example.com', PasswordHash='x'))
+        db.session.commit()
+
+    def add(self, fechas, usuario_id=1, leida=False):
+        notificaciones = [Notificacion(UsuarioID=usuario_id, Mensaje='Aviso', Fecha=fecha, Leida=leida)
+                          for fecha in fechas]
+        db.session.add_all(notificaciones)
+        db.session.commit()
+        return [n.NotificacionID for n in notificaciones]
+
+    def bandeja(self, query=''):
+        ids, after = [], None
+        while True:
+            url = '/api/notificaciones/bandeja?limit=2' + query + ('&after=' + after if after else '')
+            response = self.client.get(url, headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            body = response.get_json()
+            self.assertLessEqual(len(body['items']), 2)
+            ids.extend(item['NotificacionID'] for item in body['items'])
+            after = body['next_cursor']
+            if after is None:
+                return ids
+
+    def no_leidas(self):
+        return self.client.get('/api/notificaciones/no-leidas', headers=self.headers).get_json()['NoLeidas']
+
+    def test_inbox_pages_newest_first(self):
+        antes, mismo, despues = (datetime.datetime(2026, 5, 1, 9, 0, s) for s in (0, 30, 59))
+        primera = self.add([antes])
+        empatadas = self.add([mismo, mismo, mismo])
+        ultima = self.add([despues])
+        self.add([despues], usuario_id=2)
+        # Same Fecha: the higher NotificacionID comes first and none is skipped across pages.
+        self.assertEqual(self.bandeja(), ultima + empatadas[::-1] + primera)
+
+    def test_inbox_leida_filter(self):
+        fecha = datetime.datetime(2026, 5, 1, 9, 0)
+        leidas = self.add([fecha, fecha], leida=True)
+        no_leidas = self.add([fecha, fecha, fecha])
+        self.assertEqual(self.bandeja('&leida=false'), no_leidas[::-1])
+        self.assertEqual(self.bandeja('&leida=true'), leidas[::-1])
+        self.assertEqual(len(self.bandeja()), 5)
+        response = self.client.get('/api/notificaciones/bandeja?leida=quizas', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_unread_counter(self):
+        self.assertEqual(self.no_leidas(), 0)
+        for _ in range(3):
+            response = self.client.post('/api/notificaciones', json={'UsuarioID': 1, 'Mensaje': 'Aviso'},
+                                        headers=self.headers)
+            self.assertEqual(response.status_code, 201)
+        self.client.post('/api/notificaciones', json={'UsuarioID': 2, 'Mensaje': 'Aviso'}, headers=self.headers)
+        self.assertEqual(self.no_leidas(), 3)
+        self.assertEqual(self.client.delete('/api/notificaciones/1', headers=self.headers).status_code, 204)
+        self.assertEqual(self.no_leidas(), 2)
+        response = self.client.post('/api/notificaciones/marcar-leidas', headers=self.headers)
+        self.assertEqual(response.get_json(), {'Actualizadas': 2})
+        self.assertEqual(self.no_leidas(), 0)
+        self.assertEqual(self.client.delete('/api/notificaciones/2', headers=self.headers).status_code, 204)
+        self.assertEqual(self.no_leidas(), 0)
+        self.assertEqual(self.bandeja('&leida=false'), [])
+
+    def test_inbox_order_comes_from_an_index(self):
+        for leida in ('', 'AND Leida = 0 '):
+            plan = db.session.execute(db.text(
+                'EXPLAIN QUERY PLAN SELECT * FROM Notificaciones WHERE UsuarioID = 1 ' + leida +
+                'ORDER BY Fecha DESC, NotificacionID DESC LIMIT 10')).all()
+            details = ' '.join(row[-1] for row in plan)
+            self.assertIn('USING INDEX idx_notificaciones_usuario_', details)
+            self.assertNotIn('TEMP B-TREE', details)
+
+if __name__ == '__main__':
+    unittest.main()
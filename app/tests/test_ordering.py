@@ -0,0 +1,80 @@
+import unittest
+from app import db
+from app.models import Board, Proyecto, Columna, Tarea, TareaColumna
+from app.ordering import GAP, between, move_tarea, rebalancer, MoveConflict
+from app.tests.base import AppTestCase
+
+class OrderingTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        board = Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board')
+        db.session.add(board)
+        db.session.flush()
+        proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto')
+        db.session.add(proyecto)
+        db.session.flush()
+        columnas = [Columna(ProyectoID=proyecto.ProyectoID, ColumnaNombre=n) for n in ('Hacer', 'Hecho')]
+        tareas = [Tarea(ProyectoID=proyecto.ProyectoID, Titulo='Tarea %d' % i) for i in range(4)]
+        db.session.add_all(columnas + tareas)
+        db.session.flush()
+        # Dense positions, as the procedures used to write them.
+        db.session.add_all([TareaColumna(TareaID=t.TareaID, ColumnaID=columnas[0].ColumnaID, Posicion=i + 1)
+                            for i, t in enumerate(tareas)])
+        db.session.commit()
+        self.hacer, self.hecho = [c.ColumnaID for c in columnas]
+        self.ids = [t.TareaID for t in tareas]
+
+    def tearDown(self):
+        rebalancer.shutdown()
+        super().tearDown()
+
+    def column(self, columna_id):
+        return [row[0] for row in db.session.query(TareaColumna.TareaID).filter_by(ColumnaID=columna_id)
+                .order_by(TareaColumna.Posicion, TareaColumna.TareaID)]
+
+    def test_between(self):
+        self.assertEqual(between(None, None), GAP)
+        self.assertEqual(between(None, 10), 10 - GAP)
+        self.assertEqual(between(10, 20), 15)
+        self.assertIsNone(between(10, 11))
+
+    def test_moves_renumber_only_when_out_of_room(self):
+        a, b, c, d = self.ids
+        move_tarea(d, self.hacer, siguiente_id=a)
+        self.assertEqual(self.column(self.hacer), [d, a, b, c])
+        # 2 and 3 are adjacent, so this move renumbers the column first.
+        move_tarea(a, self.hacer, anterior_id=b, siguiente_id=c)
+        self.assertEqual(self.column(self.hacer), [d, b, a, c])
+        posiciones = dict(db.session.query(TareaColumna.TareaID, TareaColumna.Posicion))
+        self.assertEqual(posiciones[b] % GAP, 0)
+        move_tarea(b, self.hecho)
+        self.assertEqual((self.column(self.hacer), self.column(self.hecho)), ([d, a, c], [b]))
+
+    def test_repeated_moves_into_one_slot_keep_the_order(self):
+        a, b, c, d = self.ids
+        for _ in range(40):
+            move_tarea(d, self.hacer, anterior_id=a, siguiente_id=b)
+            move_tarea(c, self.hacer, anterior_id=a, siguiente_id=d)
+            move_tarea(d, self.hacer, anterior_id=a, siguiente_id=c)
+            rebalancer.shutdown()
+        self.assertEqual(self.column(self.hacer), [a, d, c, b])
+
+    def test_invalid_moves(self):
+        a, b, c, _ = self.ids
+        with self.assertRaises(MoveConflict):
+            move_tarea(a, self.hacer, anterior_id=c, siguiente_id=b)
+        with self.assertRaises(ValueError):
+            move_tarea(a, self.hecho, anterior_id=b)
+        self.assertIsNone(move_tarea(999, self.hacer))
+
+    def test_move_route(self):
+        response = self.client.post('/api/tareas/%d/move' % self.ids[0], json={'ColumnaID': self.hecho},
+                                    headers=self.headers)
+        self.assertEqual(response.get_json(), {'TareaID': self.ids[0], 'ColumnaID': self.hecho, 'Posicion': GAP})
+        response = self.client.post('/api/tareas/%d/move' % self.ids[1], json={'AnteriorID': 1},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
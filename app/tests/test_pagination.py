@@ -0,0 +1,38 @@
+import unittest
+from app import create_app
+from app.pagination import encode_cursor, decode_cursor, get_id_page_args, page_response
+
+class PaginationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+
+    def test_cursor_roundtrip(self):
+        cursor = encode_cursor(42, '2024-05-01 10:00:00')
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), [42, '2024-05-01 10:00:00'])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor')
+
+    def test_id_page_args(self):
+        with self.app.test_request_context('/?limit=1000&after=' + encode_cursor(7)):
+            self.assertEqual(get_id_page_args(), (200, 7))
+        with self.app.test_request_context('/?limit=0'):
+            with self.assertRaises(ValueError):
+                get_id_page_args()
+
+    def test_page_response(self):
+        rows = [(1, 'a'), (2, 'b'), (3, 'c')]
+        with self.app.test_request_context('/'):
+            body = page_response(rows, 2).get_json()
+        self.assertEqual(body['items'], [[1, 'a'], [2, 'b']])
+        self.assertEqual(decode_cursor(body['next_cursor']), [2])
+        with self.app.test_request_context('/'):
+            body = page_response(rows, 3).get_json()
+        self.assertIsNone(body['next_cursor'])
+
+if __name__ == '__main__':
+    unittest.main()
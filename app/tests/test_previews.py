@@ -0,0 +1,74 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from app import create_app, blob_storage, previews
+from app.previews import Image
+from config import DevelopmentConfig
+
+@unittest.skipIf(Image is None, 'Pillow is not installed')
+class PreviewPipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        class PreviewConfig(DevelopmentConfig):
+            ADJUNTOS_DIR = self.root
+            PREVIEWS_SIZE = 64
+            PREVIEWS_FAILED_MAX = 2
+
+        self.app = create_app(PreviewConfig)
+
+    def tearDown(self):
+        previews.shutdown()
+        shutil.rmtree(self.root)
+
+    def store(self, content):
+        blob = blob_storage.receive(io.BytesIO(content))
+        blob_storage.commit(blob)
+        return blob.Hash
+
+    def test_image_gets_thumbnail_next_to_blob(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 320), 'blue').save(buffer, 'PNG')
+        blob_hash = self.store(buffer.getvalue())
+        future = previews.submit(blob_hash, 'image/png')
+        self.assertIsNone(previews.submit(blob_hash, 'image/png'))
+        future.result()
+        self.assertFalse(previews.is_pending(blob_hash))
+        with Image.open(blob_storage.preview_path(blob_hash)) as preview:
+            self.assertEqual((preview.format, preview.size), ('JPEG', (64, 32)))
+        self.assertIsNone(previews.submit(blob_hash, 'image/png'))
+
+    def test_other_files_only_get_placeholder(self):
+        blob_hash = self.store(b'%PDF-1.4')
+        self.assertIsNone(previews.submit(blob_hash, 'application/pdf'))
+        self.assertFalse(os.path.exists(blob_storage.preview_path(blob_hash)))
+        self.assertIn(b'PDF', previews.placeholder('informe.pdf'))
+
+    def test_failed_preview_is_not_retried(self):
+        blob_hash = self.store(b'not really a PNG')
+        with self.assertLogs('app.previews', 'ERROR'):
+            previews.submit(blob_hash, 'image/png').result()
+        self.assertTrue(previews.has_failed(blob_hash))
+        self.assertFalse(previews.is_pending(blob_hash))
+        self.assertIsNone(previews.submit(blob_hash, 'image/png'))
+
+    def test_failed_hashes_are_bounded(self):
+        hashes = [self.store(b'not a PNG %d' % i) for i in range(3)]
+        with self.assertLogs('app.previews', 'ERROR'):
+            for blob_hash in hashes:
+                previews.submit(blob_hash, 'image/png').result()
+        self.assertEqual(previews._failed.stats()['size'], 2)
+        self.assertEqual([previews.has_failed(h) for h in hashes], [False, True, True])
+        with self.assertLogs('app.previews', 'ERROR'):
+            previews.submit(hashes[0], 'image/png').result()
+
+    def test_placeholder_label_is_alphanumeric(self):
+        body = previews.placeholder('x.<a>&"b')
+        self.assertIn(b'>AB</text>', body)
+        self.assertEqual(previews.placeholder('sin-extension'), previews.placeholder('x.<&>'))
+
+if __name__ == '__main__':
+    unittest.main()
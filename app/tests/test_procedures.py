@@ -0,0 +1,115 @@
+import unittest
+from flask import g
+from sqlalchemy import event
+from app import db, procedures
+from app.models import Usuario
+from app.procedures import ProcedureStats, REDACTED, result_size
+from app.tests.base import AppTestCase, TestConfig
+from app.tests.sqlite_procedures import ProcedureConfig
+
+class AdminConfig(TestConfig):
+    ADMIN_USUARIO_IDS = frozenset((1,))
+    PROCEDURES_SLOW_MS = 50
+
+class ProcedureStatsTestCase(AppTestCase):
+    config = AdminConfig
+
+    def test_latency_rows_and_slow_log(self):
+        stats = ProcedureStats(samples=100, slow_threshold=0.05)
+        for ms in range(1, 101):
+            stats.record('ObtenerTareas', [], ms / 1000.0, rows=2, size=30)
+        stats.record('CrearUsuario', ['Ana', 'Pérez', 'ana@example.com', '', '', 'hash'], 0.2)
+        snapshot = stats.snapshot()
+        self.assertEqual(list(snapshot), ['CrearUsuario', 'ObtenerTareas'])
+        tareas = snapshot['ObtenerTareas']
+        self.assertEqual((tareas['calls'], tareas['rows'], tareas['bytes'], tareas['errors']), (100, 200, 3000, 0))
+        self.assertEqual((tareas['p50_ms'], tareas['p95_ms'], tareas['p99_ms'], tareas['max_ms']),
+                         (51.0, 95.0, 99.0, 100.0))
+        slow = stats.slow_calls()
+        self.assertEqual([call['procedure'] for call in slow], ['CrearUsuario'] + ['ObtenerTareas'] * 51)
+        self.assertEqual(slow[0]['params'], ['Ana', 'Pérez', 'ana@example.com', '', '', REDACTED])
+        stats.reset()
+        self.assertEqual((stats.snapshot(), stats.slow_calls()), ({}, []))
+
+    def test_result_size(self):
+        self.assertEqual(result_size([(1, 'abc', b'xy', None)]), 8 + 3 + 2 + 8)
+        self.assertEqual(result_size([(1, 'a')] * 1000), 9000)
+        self.assertEqual(result_size(()), 0)
+
+    def test_failed_calls_are_counted(self):
+        # SQLite has no stored procedures, so the call fails.
+        with self.assertRaises(Exception):
+            procedures.call('ObtenerTareas', [])
+        self.assertEqual(procedures.stats.snapshot()['ObtenerTareas']['errors'], 1)
+
+    def test_admin_endpoint(self):
+        db.session.add(Usuario(Nombre='Juan', Apellido='Gómez', CorreoElectronico='juan@example.com', PasswordHash='x'))
+        db.session.commit()
+        procedures.stats.record('ActualizarUsuario', [1, 'Ana', 'Pérez', 'ana@example.com', '', '', 'hash'], 0.1)
+        client, admin = self.client, self.headers
+        self.assertEqual(client.get('/api/admin/procedures', headers={'x-access-tokens': self.token(2)}).status_code, 403)
+        body = client.get('/api/admin/procedures', headers=admin).get_json()
+        self.assertEqual(body['procedures']['ActualizarUsuario']['calls'], 1)
+        self.assertEqual(body['slow_calls'][0]['params'][-1], REDACTED)
+        self.assertIn('pool_class', body['pool'])
+        self.assertEqual(client.delete('/api/admin/procedures', headers=admin).status_code, 200)
+        self.assertEqual(client.get('/api/admin/procedures', headers=admin).get_json()['procedures'], {})
+
+class ProcedureExecutorTestCase(AppTestCase):
+    """Each ``with self.app.app_context()`` block stands for one request, with a ``g`` of its own."""
+    config = ProcedureConfig
+
+    def setUp(self):
+        super().setUp()
+        self.engine = db.engine
+        self.checkedout = 0
+        event.listen(self.engine, 'checkout', self.on_checkout)
+        event.listen(self.engine, 'checkin', self.on_checkin)
+        procedures.metrics.reset()
+
+    def tearDown(self):
+        event.remove(self.engine, 'checkout', self.on_checkout)
+        event.remove(self.engine, 'checkin', self.on_checkin)
+        super().tearDown()
+
+    def on_checkout(self, *args):
+        self.checkedout += 1
+
+    def on_checkin(self, *args):
+        self.checkedout -= 1
+
+    def test_connection_is_reused_within_a_request(self):
+        with self.app.app_context():
+            procedures.call('ObtenerUsuarioPorID', [1])
+            conn = g._procedure_conn
+            procedures.call('ObtenerUsuarios', [])
+            self.assertIs(g._procedure_conn, conn)
+        self.assertEqual(procedures.metrics.snapshot()['checkouts'], 1)
+        self.assertEqual(procedures.metrics.snapshot()['reused'], 1)
+
+    def test_connection_is_released_on_teardown(self):
+        with self.app.app_context():
+            procedures.call('ObtenerUsuarioPorID', [1])
+            self.assertEqual(self.checkedout, 1)
+        self.assertEqual(self.checkedout, 0)
+        with self.app.app_context():
+            self.assertNotIn('_procedure_conn', g)
+            procedures.call('ObtenerUsuarioPorID', [1])
+        self.assertEqual(procedures.metrics.snapshot()['checkouts'], 2)
+
+    def test_failed_procedure_rolls_back(self):
+        with self.app.app_context():
+            # Adjuntos.Archivo is NOT NULL, so the second insert fails after the Blobs one.
+            with self.assertRaises(Exception):
+                procedures.call('CrearAdjunto', [None, None, 'a.txt', 'abc', 3, 'text/plain'])
+            self.assertFalse(g._procedure_conn.in_transaction)
+        self.assertEqual(self.checkedout, 0)
+        with self.app.app_context():
+            conn = procedures.connection()
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM Blobs').fetchone(), (0,))
+        self.assertEqual(self.checkedout, 0)
+        self.assertEqual(procedures.stats.snapshot()['CrearAdjunto']['errors'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from app import db
+from app.models import Etiqueta, Notificacion, PerfilUsuario
+from app.tests.base import AppTestCase
+from app.tests.sqlite_procedures import ProcedureConfig
+
+class ProcedureRoutesTestCase(AppTestCase):
+    config = ProcedureConfig
+
+    def get(self, url):
+        response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        return response.get_json()
+
+    def test_get_usuario(self):
+        usuario = self.get('/api/usuarios/1')
+        self.assertEqual(usuario['CorreoElectronico'], 'ana@example.com')
+        self.assertNotIn('PasswordHash', usuario)
+
+    def test_get_perfil(self):
+        db.session.add(PerfilUsuario(UsuarioID=1, Ocupacion='Diseñadora'))
+        db.session.commit()
+        self.assertEqual(self.get('/api/perfiles/1')['Ocupacion'], 'Diseñadora')
+
+    def test_get_etiqueta(self):
+        db.session.add(Etiqueta(Nombre='urgente'))
+        db.session.commit()
+        self.assertEqual(self.get('/api/etiquetas/1')['Nombre'], 'urgente')
+
+    def test_get_notificacion(self):
+        db.session.add(Notificacion(UsuarioID=1, Mensaje='Nueva tarea asignada'))
+        db.session.commit()
+        self.assertEqual(self.get('/api/notificaciones/1')['Mensaje'], 'Nueva tarea asignada')
+
+if __name__ == '__main__':
+    unittest.main()
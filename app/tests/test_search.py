@@ -0,0 +1,100 @@
+import unittest
+from app import db
+from app.models import Board, Proyecto, Tarea, Comentario, IndiceBusquedaPendiente
+from app.search import tokenize, sync, search, COMENTARIO, TAREA
+from app.tests.base import AppTestCase
+
+class SearchTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        board = Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board')
+        db.session.add(board)
+        db.session.flush()
+        proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto')
+        db.session.add(proyecto)
+        db.session.flush()
+        self.proyecto_id = proyecto.ProyectoID
+        db.session.commit()
+
+    def add_tarea(self, titulo, descripcion=''):
+        tarea = Tarea(ProyectoID=self.proyecto_id, Titulo=titulo, Descripcion=descripcion)
+        db.session.add(tarea)
+        db.session.commit()
+        sync(TAREA, [tarea.TareaID])
+        return tarea.TareaID
+
+    def pendientes(self):
+        return sorted(tuple(row) for row in db.session.query(IndiceBusquedaPendiente.Tipo,
+                                                             IndiceBusquedaPendiente.DocumentoID))
+
+    def test_tokenize_folds_accents_and_plurals_but_keeps_enye(self):
+        self.assertEqual(tokenize('Revisión de las CANCIONES del año'), ['revision', 'cancion', 'año'])
+        self.assertNotEqual(tokenize('año'), tokenize('ano'))
+        self.assertEqual(tokenize('luces'), tokenize('luz'))
+
+    def test_ranks_title_matches_first_and_requires_every_term(self):
+        en_descripcion = self.add_tarea('Preparar informe', 'Incluir el presupuesto del año')
+        en_titulo = self.add_tarea('Presupuesto del año', 'Revisar con finanzas')
+        self.add_tarea('Presupuesto', 'Sin fecha')
+        hits = search('presupuesto AÑO', 10)
+        self.assertEqual([doc_id for _, doc_id, _ in hits], [en_titulo, en_descripcion])
+
+    def test_comments_are_indexed_and_removed(self):
+        tarea_id = self.add_tarea('Diseño')
+        comentario = Comentario(TareaID=tarea_id, UsuarioID=self.usuario_id, Texto='Falta la tipografía')
+        db.session.add(comentario)
+        db.session.commit()
+        sync(COMENTARIO, [comentario.ComentarioID])
+        self.assertEqual([hit[:2] for hit in search('tipografia', 10)], [(COMENTARIO, comentario.ComentarioID)])
+        db.session.delete(comentario)
+        db.session.commit()
+        self.assertEqual(self.pendientes(), [(COMENTARIO, comentario.ComentarioID)])
+        sync(COMENTARIO, [comentario.ComentarioID])
+        self.assertEqual((search('tipografia', 10), self.pendientes()), ([], []))
+
+    def test_writes_stay_pending_until_synced(self):
+        tarea_id = self.add_tarea('Diseño')
+        self.assertEqual(self.pendientes(), [])
+        # Written outside the API, as a failed index update would leave it.
+        db.session.query(Tarea).filter_by(TareaID=tarea_id).update({'Titulo': 'Tipografía'})
+        db.session.add(Tarea(ProyectoID=self.proyecto_id, Titulo='Paleta'))
+        db.session.commit()
+        self.assertEqual(self.pendientes(), [(TAREA, tarea_id), (TAREA, tarea_id + 1)])
+        self.assertEqual(search('tipografia', 10), [])
+        result = self.app.test_cli_runner().invoke(args=['search', 'sync'])
+        self.assertIn('Synced 2 documents', result.output)
+        self.assertEqual([hit[1] for hit in search('tipografia', 10)], [tarea_id])
+        self.assertEqual([hit[1] for hit in search('paleta', 10)], [tarea_id + 1])
+        self.assertEqual(search('diseño', 10), [])
+        self.assertEqual(self.pendientes(), [])
+
+    def test_bulk_writes_index_in_their_transaction(self):
+        response = self.client.post('/api/tareas/bulk', json=[{'ProyectoID': self.proyecto_id, 'Titulo': 'Paleta'}],
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        tarea_id = response.get_json()['results'][0]['TareaID']
+        self.assertEqual(([hit[1] for hit in search('paleta', 10)], self.pendientes()), ([tarea_id], []))
+        response = self.client.patch('/api/tareas/bulk', json=[{'TareaID': tarea_id, 'Titulo': 'Tipografía'}],
+                                     headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((search('paleta', 10), self.pendientes()), ([], []))
+        self.assertEqual([hit[1] for hit in search('tipografia', 10)], [tarea_id])
+
+    def test_endpoint_pages_and_rebuild_command(self):
+        for i in range(3):
+            db.session.add(Tarea(ProyectoID=self.proyecto_id, Titulo='Migración %d' % i))
+        db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=['search', 'rebuild'])
+        self.assertIn('Indexed 3 tasks and 0 comments', result.output)
+        self.assertEqual(self.pendientes(), [])
+        first = self.client.get('/api/search?q=migracion&limit=2', headers=self.headers).get_json()
+        self.assertEqual(len(first['items']), 2)
+        second = self.client.get('/api/search?q=migracion&limit=2&after=' + first['next_cursor'],
+                                 headers=self.headers).get_json()
+        self.assertEqual(len(second['items']), 1)
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(self.client.get('/api/search?q=', headers=self.headers).status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
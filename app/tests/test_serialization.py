@@ -0,0 +1,49 @@
+import datetime
+import decimal
+import json
+import unittest
+from sqlalchemy import select
+from app import db
+from app.models import Usuario, Board, Proyecto, Tarea
+from app.pagination import page_response, decode_cursor
+from app.serialization import dumps, description_encoder, row_encoder
+from app.tests.base import AppTestCase
+
+class SerializationTestCase(AppTestCase):
+
+    def test_row_encoders(self):
+        encode = description_encoder((('UsuarioID', None), ('Nombre', None), ('PasswordHash', None)))
+        self.assertEqual(encode((1, 'Ana', 'hash')), {'UsuarioID': 1, 'Nombre': 'Ana'})
+        self.assertIs(encode, row_encoder(('UsuarioID', 'Nombre', 'PasswordHash')))
+        # Names are only ever dict keys, whatever characters they hold.
+        self.assertEqual(row_encoder(("a'b", 'c]}), 1)#'))((1, 2)), {"a'b": 1, 'c]}), 1)#': 2})
+        self.assertEqual(row_encoder(('PasswordHash', 'x'))(('hash', 1)), {'x': 1})
+        self.assertNotIn('PasswordHash', Usuario(Nombre='Ana', PasswordHash='hash').to_dict())
+
+    def test_model_encoder_takes_instances_and_rows(self):
+        board = Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board')
+        db.session.add(board)
+        db.session.flush()
+        proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto')
+        db.session.add(proyecto)
+        db.session.flush()
+        tarea = Tarea(ProyectoID=proyecto.ProyectoID, Titulo='Tarea', FechaVencimiento=datetime.date(2024, 5, 1))
+        db.session.add(tarea)
+        db.session.commit()
+        row = db.session.execute(select(Tarea.__table__)).first()
+        self.assertEqual(Tarea.to_dict(row), tarea.to_dict())
+        encoded = json.loads(dumps(tarea.to_dict()))
+        self.assertEqual(encoded['FechaVencimiento'], '2024-05-01')
+        self.assertEqual(encoded['FechaCreacion'], tarea.FechaCreacion.isoformat())
+
+    def test_dumps_and_page_response(self):
+        value = {'Fecha': datetime.datetime(2024, 5, 1, 12, 30), 'Total': decimal.Decimal('2.5'), 'Texto': 'año'}
+        self.assertEqual(json.loads(dumps(value)), {'Fecha': '2024-05-01T12:30:00', 'Total': 2.5, 'Texto': 'año'})
+        rows = [{'TareaID': 1}, {'TareaID': 2}, {'TareaID': 3}]
+        with self.app.test_request_context('/'):
+            body = page_response(rows, 2).get_json()
+        self.assertEqual(body['items'], rows[:2])
+        self.assertEqual(decode_cursor(body['next_cursor']), [2])
+
+if __name__ == '__main__':
+    unittest.main()
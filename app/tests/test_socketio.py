@@ -30,7 +30,7 @@ class AuthTestCase(unittest.TestCase):
     def test_login(self):
         response = self.client.post('/api/auth/login', json={
             'CorreoElectronico': 'test@example.com',
-            'Password': 'password'
+            'Password': 'Thepassword'
         })
         self.assertEqual(response.status_code, 200)
         self.assertIn('token', response.get_json())
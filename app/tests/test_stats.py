@@ -0,0 +1,79 @@
+import datetime
+import unittest
+from app import db
+from app.models import Board, Proyecto, Tarea, EstadisticaProyecto, VencimientoProyecto
+from app.stats import proyecto_stats, rebuild
+from app.tests.base import AppTestCase
+
+class ProjectStatsTestCase(AppTestCase):
+
+    def setUp(self):
+        super().setUp()
+        board = Board(UsuarioPropietarioID=self.usuario_id, Titulo='Board')
+        db.session.add(board)
+        db.session.flush()
+        proyectos = [Proyecto(BoardID=board.BoardID, Titulo='Proyecto %d' % i) for i in range(2)]
+        db.session.add_all(proyectos)
+        db.session.commit()
+        self.board_id = board.BoardID
+        self.proyecto_ids = [p.ProyectoID for p in proyectos]
+        self.hoy = datetime.date.today()
+
+    def snapshot(self):
+        return (sorted(tuple(row) for row in db.session.query(EstadisticaProyecto.__table__)),
+                sorted(tuple(row) for row in db.session.query(VencimientoProyecto.__table__)))
+
+    def vencimientos(self):
+        return [(row.ProyectoID, row.FechaVencimiento, row.Abiertas)
+                for row in db.session.query(VencimientoProyecto).order_by(VencimientoProyecto.FechaVencimiento)]
+
+    def test_triggers_match_a_rebuild(self):
+        tareas = Tarea.__table__
+        ayer, manana = self.hoy - datetime.timedelta(days=1), self.hoy + datetime.timedelta(days=1)
+        a, b = self.proyecto_ids
+        db.session.execute(tareas.insert(), [
+            {'ProyectoID': a, 'Titulo': 't', 'Estado': 'pendiente', 'FechaVencimiento': ayer},
+            {'ProyectoID': a, 'Titulo': 't', 'Estado': 'en_proceso', 'FechaVencimiento': ayer},
+            {'ProyectoID': a, 'Titulo': 't', 'Estado': 'completada', 'FechaVencimiento': ayer},
+            {'ProyectoID': b, 'Titulo': 't', 'Estado': 'pendiente', 'FechaVencimiento': manana},
+            {'ProyectoID': b, 'Titulo': 't', 'Estado': 'pendiente', 'FechaVencimiento': None},
+        ])
+        db.session.commit()
+        ids = [row[0] for row in db.session.query(Tarea.TareaID).order_by(Tarea.TareaID)]
+        self.assertEqual(proyecto_stats(a), {'ProyectoID': a, 'Total': 3, 'Pendientes': 1, 'EnProceso': 1,
+                                             'Completadas': 1, 'Vencidas': 2, 'TasaCompletadas': 0.3333})
+        db.session.execute(tareas.update().where(tareas.c.TareaID == ids[0]).values(Estado='completada'))
+        db.session.execute(tareas.update().where(tareas.c.TareaID == ids[1]).values(ProyectoID=b))
+        db.session.execute(tareas.update().where(tareas.c.TareaID == ids[3]).values(FechaVencimiento=ayer))
+        db.session.execute(tareas.delete().where(tareas.c.TareaID == ids[4]))
+        db.session.commit()
+        incremental = self.snapshot()
+        rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(proyecto_stats(b)['Vencidas'], 2)
+
+    def test_completed_task_drops_its_due_date(self):
+        ayer = self.hoy - datetime.timedelta(days=1)
+        a = self.proyecto_ids[0]
+        tarea = Tarea(ProyectoID=a, Titulo='t', Estado='pendiente', FechaVencimiento=ayer)
+        db.session.add(tarea)
+        db.session.commit()
+        self.assertEqual(self.vencimientos(), [(a, ayer, 1)])
+        tarea.Estado = 'completada'
+        db.session.commit()
+        self.assertEqual(self.vencimientos(), [])
+        self.assertEqual(proyecto_stats(a)['Vencidas'], 0)
+
+    def test_routes(self):
+        db.session.add(Tarea(ProyectoID=self.proyecto_ids[0], Titulo='t', Estado='completada'))
+        db.session.commit()
+        body = self.client.get('/api/boards/%d/stats' % self.board_id, headers=self.headers).get_json()
+        self.assertEqual((body['Total'], body['TasaCompletadas']), (1, 1.0))
+        self.assertEqual([p['Total'] for p in body['proyectos']], [1, 0])
+        response = self.client.get('/api/proyectos/%d/stats' % self.proyecto_ids[1], headers=self.headers)
+        self.assertEqual(response.get_json()['Total'], 0)
+        response = self.client.get('/api/proyectos/999/stats', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
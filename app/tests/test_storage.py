@@ -0,0 +1,85 @@
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import jwt
+from app import create_app, db, blob_storage
+from app.models import Blob, Usuario
+from app.storage import BlobTooLarge, CappedStream
+from config import DevelopmentConfig
+
+class BlobStorageTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+        class StorageConfig(DevelopmentConfig):
+            ADJUNTOS_DIR = self.root
+            ADJUNTOS_MAX_BYTES = 32
+            ADJUNTOS_CHUNK_SIZE = 4
+
+        self.app = create_app(StorageConfig)
+        self.app.config['TESTING'] = True
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(self.root)
+
+    def test_identical_uploads_share_one_file(self):
+        content = b'contenido del adjunto'
+        first = blob_storage.receive(io.BytesIO(content))
+        second = blob_storage.receive(io.BytesIO(content))
+        self.assertEqual(first.Hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(first.Tamano, len(content))
+        path = blob_storage.commit(first)
+        self.assertEqual(blob_storage.commit(second), path)
+        with open(path, 'rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+    def test_too_large_upload_leaves_nothing(self):
+        with self.assertRaises(BlobTooLarge):
+            blob_storage.receive(io.BytesIO(b'x' * 33))
+        self.assertEqual(os.listdir(os.path.join(self.root, 'tmp')), [])
+
+    def test_capped_stream_stops_past_its_limit(self):
+        stream = CappedStream(io.BytesIO(b'line\n' + b'x' * 20), 10)
+        self.assertEqual(stream.readline(), b'line\n')
+        self.assertEqual(stream.read(5), b'xxxxx')
+        with self.assertRaises(BlobTooLarge):
+            stream.read(5)
+
+    def test_release_only_unreferenced_blobs(self):
+        blob = blob_storage.receive(io.BytesIO(b'abc'))
+        path = blob_storage.commit(blob)
+        with self.app.app_context():
+            db.session.add(Blob(Hash=blob.Hash, Tamano=blob.Tamano, Referencias=1))
+            db.session.commit()
+            self.assertFalse(blob_storage.release(blob.Hash))
+            self.assertTrue(os.path.exists(path))
+            Blob.query.get(blob.Hash).Referencias = 0
+            db.session.commit()
+            self.assertTrue(blob_storage.release(blob.Hash))
+            self.assertFalse(os.path.exists(path))
+            self.assertIsNone(Blob.query.get(blob.Hash))
+
+    def test_upload_rejects_large_body_before_reading_it(self):
+        token = jwt.encode({'UsuarioID': 1, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=5)},
+                           self.app.config['SECRET_KEY'], algorithm="HS256")
+        with self.app.app_context():
+            db.session.add(Usuario(UsuarioID=1, Nombre='A', Apellido='B', CorreoElectronico='a@b.c', PasswordHash='x'))
+            db.session.commit()
+        response = self.app.test_client().post('/api/tareas/1/adjuntos?nombre=grande.bin', data=b'x' * (64 * 1024),
+                                               content_type='application/octet-stream',
+                                               headers={'x-access-tokens': token})
+        self.assertEqual(response.status_code, 413)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import json
+import unittest
+from app import db
+from app.models import Usuario
+from app.streaming import stream_rows
+from app.tests.base import AppTestCase
+from app.tests.sqlite_procedures import ProcedureConfig
+
+class StreamingTestCase(AppTestCase):
+    config = ProcedureConfig
+
+    def setUp(self):
+        super().setUp()
+        db.session.add_all([
+            Usuario(Nombre='Usuario', Apellido=str(i), CorreoElectronico='u%d@example.com' % i, PasswordHash='secreto')
+            for i in range(6)
+        ])
+        db.session.commit()
+
+    def paged(self):
+        rows, after = [], None
+        while True:
+            url = '/api/usuarios?limit=3' + ('&after=' + after if after else '')
+            body = self.client.get(url, headers=self.headers).get_json()
+            rows.extend(body['items'])
+            after = body['next_cursor']
+            if after is None:
+                return rows
+
+    def test_ndjson_matches_paged_rows(self):
+        response = self.client.get('/api/usuarios?stream=ndjson', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.endswith('\n'))
+        self.assertNotIn('PasswordHash', body)
+        self.assertNotIn('secreto', body)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows, self.paged())
+
+    def test_json_array_matches_paged_rows(self):
+        response = self.client.get('/api/usuarios?stream=json', headers=self.headers)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.get_data()), self.paged())
+
+    def test_invalid_stream_format(self):
+        response = self.client.get('/api/usuarios?stream=csv', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_rows_are_flushed_in_batches(self):
+        rows = [{'id': i} for i in range(5)]
+        with self.app.test_request_context():
+            chunks = list(stream_rows(rows, 'ndjson', batch_size=2).response)
+            self.assertEqual(chunks, [b'{"id":0}\n{"id":1}\n', b'{"id":2}\n{"id":3}\n', b'{"id":4}\n'])
+            chunks = list(stream_rows(rows, 'json', batch_size=2).response)
+            self.assertEqual(b''.join(chunks), b'[{"id":0},{"id":1},{"id":2},{"id":3},{"id":4}]')
+            self.assertEqual(len(chunks), 4)
+            self.assertEqual(list(stream_rows([], 'json').response), [b'[]'])
+
+if __name__ == '__main__':
+    unittest.main()
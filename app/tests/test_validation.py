@@ -0,0 +1,50 @@
+import datetime
+import unittest
+from marshmallow import Schema
+from app.schemas import TareaSchema, UsuarioSchema, MoverTareaSchema
+
+class ValidationTestCase(unittest.TestCase):
+
+    CASES = [
+        {'ProyectoID': 1, 'Titulo': 'Tarea'},
+        {'ProyectoID': '2', 'Titulo': 'Tarea', 'FechaVencimiento': '2024-05-01', 'Estado': 'completada'},
+        {'Titulo': '', 'Importancia': 9, 'Estado': 'otro'},
+        {'ProyectoID': None, 'Titulo': 3, 'FechaVencimiento': 'mañana', 'Extra': 1},
+        {'ProyectoID': True, 'Titulo': 'x' * 101, 'TareaID': 5},
+        {},
+        [],
+        'texto',
+    ]
+
+    def assert_same_as_marshmallow(self, schema, data, partial=False):
+        expected = Schema.validate(schema, data, partial=partial)
+        self.assertEqual(schema.validate(data, partial=partial), expected)
+        loaded, errors = schema.check(data, partial=partial)
+        self.assertEqual(errors, expected)
+        if not errors:
+            self.assertEqual(loaded, schema.load(data, partial=partial))
+
+    def test_errors_and_loaded_data_match_marshmallow(self):
+        for schema in (TareaSchema(), UsuarioSchema(), MoverTareaSchema()):
+            for data in self.CASES:
+                for partial in (False, True):
+                    with self.subTest(schema=type(schema).__name__, data=data, partial=partial):
+                        self.assert_same_as_marshmallow(schema, data, partial)
+
+    def test_partial_skips_missing_required_fields(self):
+        schema = TareaSchema()
+        self.assertEqual(set(schema.validate({'Estado': 'completada'})), {'ProyectoID', 'Titulo'})
+        loaded, errors = schema.check({'Estado': 'completada'}, partial=True)
+        self.assertEqual((loaded, errors), ({'Estado': 'completada'}, {}))
+        self.assertIn('Titulo', schema.validate({'Titulo': ''}, partial=True))
+        self.assertEqual(TareaSchema(partial=True).check({'FechaVencimiento': '2024-05-01'}),
+                         ({'FechaVencimiento': datetime.date(2024, 5, 1)}, {}))
+
+    def test_many_uses_marshmallow(self):
+        schema = TareaSchema(many=True)
+        data = [{'ProyectoID': 1, 'Titulo': 'Tarea'}, {'Titulo': ''}]
+        self.assertEqual(schema.validate(data), Schema.validate(schema, data))
+        self.assertEqual(set(schema.validate(data)), {1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+from marshmallow import RAISE, INCLUDE, Schema, ValidationError, fields
+from marshmallow.validate import Validator
+from marshmallow.utils import missing
+from .metrics import timed
+
+# Field classes whose already-typed JSON values are taken as they are; any
+# other value goes through the field's own _deserialize, as in marshmallow.
+_FAST_TYPES = {
+    fields.Integer: lambda value: type(value) is int,
+    fields.String: lambda value: type(value) is str,
+    fields.Email: lambda value: type(value) is str,
+    fields.Boolean: lambda value: value is True or value is False,
+}
+
+
+def _has_hooks(schema):
+    return any(schema._hooks.values())
+
+
+def _field_plan(name, field):
+    fast = None
+    if type(field) in _FAST_TYPES and not getattr(field, 'strict', False):
+        fast = _FAST_TYPES[type(field)]
+    default = field.load_default
+    return (
+        field.data_key if field.data_key is not None else name,
+        field.attribute or name,
+        field,
+        field.required,
+        field.allow_none,
+        fast,
+        tuple(field.validators),
+        default,
+        field.error_messages['required'],
+        field.error_messages['null'],
+        field.error_messages['validator_failed'],
+    )
+
+
+def compile_loader(schema, partial=False):
+    """Compile ``schema`` into ``load(data) -> (loaded, errors)``.
+
+    ``errors`` is what ``schema.validate(data, partial=partial)`` returns
+    and ``loaded`` what ``schema.load`` would, for the valid fields. The
+    field list, messages and validators are read once here, so a call is a
+    loop over the fields with no schema machinery. ``partial`` skips the
+    required check of missing fields, as marshmallow's ``partial=True``
+    does. Schemas with pre/post hooks or schema-level validators are left
+    to marshmallow.
+    """
+    if schema.many or _has_hooks(schema) or partial not in (True, False):
+        def load(data):
+            errors = Schema.validate(schema, data, partial=partial)
+            return (schema.load(data, partial=partial) if not errors else None), errors
+        return load
+
+    plan = tuple(_field_plan(name, field) for name, field in schema.load_fields.items())
+    known = frozenset(entry[0] for entry in plan)
+    unknown = schema.unknown
+    type_error = [schema.error_messages['type']]
+    unknown_error = [schema.error_messages['unknown']]
+
+    def load(data):
+        if not isinstance(data, dict):
+            return None, {'_schema': type_error}
+        loaded, errors = {}, {}
+        for key, attribute, field, required, allow_none, fast, validators, default, \
+                required_msg, null_msg, failed_msg in plan:
+            value = data.get(key, missing)
+            if value is missing:
+                if partial:
+                    continue
+                if required:
+                    errors[key] = [required_msg]
+                elif default is not missing:
+                    loaded[attribute] = default() if callable(default) else default
+                continue
+            if value is None:
+                if allow_none:
+                    loaded[attribute] = None
+                else:
+                    errors[key] = [null_msg]
+                continue
+            if fast is None or not fast(value):
+                try:
+                    value = field._deserialize(value, key, data)
+                except ValidationError as err:
+                    errors[key] = err.messages
+                    continue
+            if validators:
+                messages = []
+                for validator in validators:
+                    try:
+                        if validator(value) is False and not isinstance(validator, Validator):
+                            messages.append(failed_msg)
+                    except ValidationError as err:
+                        if isinstance(err.messages, dict):
+                            messages.append(err.messages)
+                        else:
+                            messages.extend(err.messages)
+                if messages:
+                    errors[key] = messages
+                    continue
+            loaded[attribute] = value
+        if not known.issuperset(data):
+            for key in data:
+                if key not in known:
+                    if unknown == RAISE:
+                        errors[key] = unknown_error
+                    elif unknown == INCLUDE:
+                        loaded[key] = data[key]
+        return loaded, errors
+
+    return load
+
+
+class CompiledSchema(Schema):
+    """Schema whose ``validate`` runs a loader compiled on first use.
+
+    Errors are the same as Schema.validate. ``check`` also returns the
+    loaded data, so a request body is read once for both.
+    """
+
+    def _loader(self, partial):
+        loaders = self.__dict__.setdefault('_compiled_loaders', {})
+        key = partial if partial in (True, False) else tuple(partial)
+        if key not in loaders:
+            loaders[key] = compile_loader(self, partial)
+        return loaders[key]
+
+    @timed('validation')
+    def check(self, data, partial=None):
+        """Return ``(loaded, errors)`` for one item; ``loaded`` is None when invalid."""
+        loaded, errors = self._loader(self.partial if partial is None else partial)(data)
+        return (None if errors else loaded), errors
+
+    @timed('validation')
+    def validate(self, data, *, many=None, partial=None):
+        if many is not None:
+            return super().validate(data, many=many, partial=partial)
+        return self._loader(self.partial if partial is None else partial)(data)[1]
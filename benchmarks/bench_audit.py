@@ -0,0 +1,82 @@
+"""Cost of auditing mutating requests: synchronous inserts vs the audit queue.
+
+Times ``--requests`` card moves (POST /api/tareas/<id>/move) with auditing
+off, with one INSERT and COMMIT per request (``sync``) and with the
+background writer (``async``). For ``async`` it also times ``flush`` of
+what is left after the last request and reports the batches written.
+
+In-memory SQLite always writes inline, so without ``--database-uri`` a
+temporary SQLite file is used.
+"""
+import os
+import random
+import tempfile
+import time
+from app import db, audit
+from app.models import AuditLog, Columna, Tarea
+from .common import base_parser, make_app, make_token, seed_board, summarize, report
+
+
+def run(client, token, moves):
+    samples = []
+    for tarea_id, columna_id in moves:
+        start = time.perf_counter()
+        response = client.post('/api/tareas/%d/move' % tarea_id, json={'ColumnaID': columna_id},
+                               headers={'x-access-tokens': token})
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+    return summarize(samples)
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--tareas', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+
+    path = None
+    uri = args.database_uri
+    if uri is None:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        uri = 'sqlite:///' + path
+    app = make_app(uri)
+    audit.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            board_id, owner_id = seed_board(args.tareas, seed=args.seed)
+            token = make_token(app, owner_id)
+            columnas = {}
+            for columna_id, proyecto_id in db.session.query(Columna.ColumnaID, Columna.ProyectoID):
+                columnas.setdefault(proyecto_id, []).append(columna_id)
+            tareas = db.session.query(Tarea.TareaID, Tarea.ProyectoID).all()
+            moves = [(t, rnd.choice(columnas[p])) for t, p in (rnd.choice(tareas) for _ in range(args.requests))]
+            client = app.test_client()
+            results = {}
+
+            audit.enabled = False
+            results['off'] = run(client, token, moves)
+            audit.enabled = True
+
+            audit.inline = True
+            results['sync'] = run(client, token, moves)
+            audit.inline = False
+
+            results['async'] = run(client, token, moves)
+            start = time.perf_counter()
+            audit.flush()
+            results['async']['flush_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            results['async'].update(audit.stats())
+            logged = db.session.query(AuditLog).count()
+            assert logged == 2 * args.requests, logged
+            report('audit', tareas=args.tareas, requests=args.requests, database=db.engine.dialect.name, **results)
+    finally:
+        audit.shutdown()
+        if path:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
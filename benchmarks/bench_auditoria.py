@@ -0,0 +1,84 @@
+"""Audit log listings: the whole table vs keyset pages, and archive compaction.
+
+Seeds ``--logs`` rows spread over ``--months`` months and times:
+
+- ``all``: loading and serializing every row, as GET /auditoria did.
+- ``first_page`` / ``deep_page``: one page of 50 newest first, from the
+  start and from a cursor halfway down the table.
+- ``user_range``: one page filtered by user and a one-month range.
+
+Then it archives every month but the last with audit_archive.compact,
+reports the time taken and the archive size, and times ``archived_page``:
+a page from a cursor inside the archive.
+"""
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import time
+from app import db
+from app.audit_archive import audit_logs, compact, log_dict
+from app.filters import audit_logs_query
+from app.models import AuditLog, Usuario
+from .common import base_parser, make_app, insert_rows, time_calls, summarize, report
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--logs', type=int, default=200000)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--usuarios', type=int, default=50)
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+
+    app = make_app(args.database_uri)
+    directory = tempfile.mkdtemp()
+    app.config['AUDIT_ARCHIVE_DIR'] = directory
+    try:
+        with app.test_request_context():
+            db.create_all()
+            insert_rows(Usuario, [{'Nombre': 'U', 'Apellido': str(i), 'CorreoElectronico': 'u%d@example.com' % i,
+                                   'PasswordHash': 'x'} for i in range(args.usuarios)])
+            start = datetime.datetime(2024, 1, 1)
+            span = args.months * 30 * 86400
+            insert_rows(AuditLog, sorted((
+                {'UsuarioID': rnd.randint(1, args.usuarios), 'Accion': 'tareas.update_tarea',
+                 'Detalles': '{"method":"PUT","path":"/api/tareas/%d","status":200}' % rnd.randint(1, 10000),
+                 'Fecha': start + datetime.timedelta(seconds=rnd.randrange(span))}
+                for _ in range(args.logs)), key=lambda row: row['Fecha']))
+            middle = db.session.execute(audit_logs_query({}).offset(args.logs // 2).limit(1)).first()
+            middle = (middle.Fecha, middle.LogID)
+            month = {'usuario_id': 1, 'desde': start + datetime.timedelta(days=60),
+                     'hasta': start + datetime.timedelta(days=90)}
+
+            def page(filters, after=None):
+                return list(audit_logs(filters, after, 51))
+
+            results = {
+                'all': summarize(time_calls(lambda: [log_dict(row) for row in AuditLog.query.all()],
+                                            max(1, args.repeat // 10))),
+                'first_page': summarize(time_calls(lambda: page({}), args.repeat)),
+                'deep_page': summarize(time_calls(lambda: page({}, middle), args.repeat)),
+                'user_range': summarize(time_calls(lambda: page(month), args.repeat)),
+            }
+            last_month = db.session.query(db.func.max(AuditLog.Fecha)).scalar()
+            t = time.perf_counter()
+            moved = compact(last_month)
+            results['compact'] = {
+                'seconds': round(time.perf_counter() - t, 2),
+                'rows': sum(moved.values()),
+                'files': len(moved),
+                'archive_bytes': sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)),
+                'rows_left': AuditLog.query.count(),
+            }
+            assert page({}, middle)[0]['LogID'] < middle[1]
+            results['archived_page'] = summarize(time_calls(lambda: page({}, middle), args.repeat))
+            results['archived_user_range'] = summarize(time_calls(lambda: page(month), args.repeat))
+            report('auditoria', logs=args.logs, months=args.months, **results)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
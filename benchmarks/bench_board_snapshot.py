@@ -0,0 +1,64 @@
+"""Query count and latency of GET /boards/<id>/snapshot.
+
+Compares the batched snapshot with the per-entity lookups the frontend
+effectively performs today (one query per project, column and task).
+"""
+from app import db
+from app.models import Proyecto, Columna, Tarea, TareaColumna, TareaEtiqueta, AsignacionTarea
+from app.routes.boards import build_board_snapshot
+from .common import base_parser, make_app, make_token, seed_board, QueryCounter, time_calls, summarize, report
+
+
+def naive_snapshot(board_id):
+    proyectos = []
+    for proyecto in Proyecto.query.filter_by(BoardID=board_id):
+        columnas = []
+        for columna in Columna.query.filter_by(ProyectoID=proyecto.ProyectoID):
+            tareas = []
+            for posicion in TareaColumna.query.filter_by(ColumnaID=columna.ColumnaID).order_by(TareaColumna.Posicion):
+                tarea = Tarea.query.get(posicion.TareaID)
+                tareas.append({
+                    'TareaID': tarea.TareaID,
+                    'etiquetas': [e.EtiquetaID for e in TareaEtiqueta.query.filter_by(TareaID=tarea.TareaID)],
+                    'asignados': [a.UsuarioID for a in AsignacionTarea.query.filter_by(TareaID=tarea.TareaID)],
+                })
+            columnas.append(tareas)
+        proyectos.append(columnas)
+    return proyectos
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--tareas', type=int, default=10000)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        board_id, owner_id = seed_board(args.tareas, seed=args.seed)
+        token = make_token(app, owner_id)
+        client = app.test_client()
+        url = '/api/boards/%d/snapshot' % board_id
+        headers = {'x-access-tokens': token}
+
+        with QueryCounter(db.engine) as snapshot_queries:
+            build_board_snapshot(board_id)
+            db.session.expunge_all()
+        with QueryCounter(db.engine) as naive_queries:
+            naive_snapshot(board_id)
+            db.session.expunge_all()
+
+        def fetch():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+
+        snapshot_samples = time_calls(fetch, args.repeat)
+        naive_samples = time_calls(lambda: (naive_snapshot(board_id), db.session.expunge_all()),
+                                   max(1, args.repeat // 10))
+        report('board_snapshot', tareas=args.tareas,
+               snapshot={'queries': snapshot_queries.count, 'latency': summarize(snapshot_samples)},
+               per_entity={'queries': naive_queries.count, 'latency': summarize(naive_samples)})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Single vs bulk task creation.
+
+"single" reproduces what one POST /tareas costs at the database level: one
+INSERT and one commit per task. "bulk" sends the same tasks through
+POST /tareas/bulk in chunks, including validation and the HTTP layer.
+"""
+import time
+from app import db
+from app.models import Tarea, Proyecto
+from .common import base_parser, make_app, make_token, seed_board, report
+
+
+def make_items(proyecto_id, n):
+    return [{'ProyectoID': proyecto_id, 'Titulo': 'Importada %d' % i, 'Importancia': 1 + i % 5}
+            for i in range(n)]
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--tareas', type=int, default=10000)
+    parser.add_argument('--chunk', type=int, default=10000)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        board_id, owner_id = seed_board(0, n_proyectos=1, seed=args.seed)
+        proyecto_id = Proyecto.query.filter_by(BoardID=board_id).first().ProyectoID
+        items = make_items(proyecto_id, args.tareas)
+
+        insert = Tarea.__table__.insert()
+        start = time.perf_counter()
+        for item in items:
+            db.session.execute(insert, item)
+            db.session.commit()
+        single = time.perf_counter() - start
+
+        client = app.test_client()
+        headers = {'x-access-tokens': make_token(app, owner_id)}
+        start = time.perf_counter()
+        for offset in range(0, len(items), args.chunk):
+            response = client.post('/api/tareas/bulk', json=items[offset:offset + args.chunk], headers=headers)
+            assert response.status_code == 201, response.get_json()
+        bulk = time.perf_counter() - start
+
+        report('bulk_tareas', tareas=args.tareas, chunk=args.chunk,
+               single={'seconds': round(single, 3), 'rows_per_s': round(args.tareas / single),
+                       'commits': args.tareas, 'socket_events': args.tareas},
+               bulk={'seconds': round(bulk, 3), 'rows_per_s': round(args.tareas / bulk),
+                     'commits': -(-args.tareas // args.chunk), 'socket_events': -(-args.tareas // args.chunk)},
+               speedup=round(single / bulk, 2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Card moves in one ``--cards`` column: dense positions vs gap ranks.
+
+``dense_per_card`` is what clients do today: put the card at the new index
+and rewrite Posicion for every card in between, one UPDATE per card (as
+with ActualizarTareaColumna). ``dense_shift`` does the same shift with a
+single set-based UPDATE. ``gap`` is ordering.move_tarea. Every mode runs
+the same ``--moves`` random moves. ``gap_same_slot`` keeps dropping cards
+into one slot, the worst case for gap ranks, and counts how often the
+column was renumbered, in the background or inline because a slot ran
+out. SQLite has no row locks, so there "background" rebalances run in the
+request and show up in the move latency.
+"""
+import random
+import time
+from sqlalchemy import select
+from app import db, ordering
+from app.models import Usuario, Board, Proyecto, Columna, Tarea, TareaColumna
+from .common import base_parser, make_app, insert_rows, summarize, report, QueryCounter
+
+
+def seed_column(n):
+    insert_rows(Usuario, [{'Nombre': 'U', 'Apellido': 'U', 'CorreoElectronico': 'u@example.com',
+                           'PasswordHash': 'x'}])
+    board = Board(UsuarioPropietarioID=db.session.query(Usuario.UsuarioID).scalar(), Titulo='Benchmark')
+    db.session.add(board)
+    db.session.flush()
+    proyecto = Proyecto(BoardID=board.BoardID, Titulo='Proyecto')
+    db.session.add(proyecto)
+    db.session.flush()
+    columna = Columna(ProyectoID=proyecto.ProyectoID, ColumnaNombre='Columna')
+    db.session.add(columna)
+    db.session.commit()
+    insert_rows(Tarea, [{'ProyectoID': proyecto.ProyectoID, 'Titulo': 'Tarea %d' % i} for i in range(n)])
+    ids = [row[0] for row in db.session.query(Tarea.TareaID).order_by(Tarea.TareaID)]
+    return columna.ColumnaID, ids
+
+
+def reset(columna_id, ids, step):
+    db.session.execute(TareaColumna.__table__.delete())
+    insert_rows(TareaColumna, [{'TareaID': t, 'ColumnaID': columna_id, 'Posicion': (i + 1) * step}
+                               for i, t in enumerate(ids)])
+
+
+def order(columna_id):
+    return [row[0] for row in db.session.execute(
+        select(TareaColumna.TareaID).where(TareaColumna.ColumnaID == columna_id)
+        .order_by(TareaColumna.Posicion, TareaColumna.TareaID))]
+
+
+def dense_move(columna_id, cards, source, target, per_card):
+    """Move ``cards[source]`` to index ``target`` with positions 1..n."""
+    table = TareaColumna.__table__
+    tarea_id = cards.pop(source)
+    cards.insert(target, tarea_id)
+    lo, hi = min(source, target), max(source, target)
+    if per_card:
+        for i in range(lo, hi + 1):
+            db.session.execute(table.update().where(table.c.ColumnaID == columna_id)
+                               .where(table.c.TareaID == cards[i]).values(Posicion=i + 1))
+    else:
+        shift = 1 if target < source else -1
+        db.session.execute(table.update().where(table.c.ColumnaID == columna_id)
+                           .where(table.c.Posicion.between(lo + 1, hi + 1))
+                           .values(Posicion=table.c.Posicion + shift))
+        db.session.execute(table.update().where(table.c.TareaID == tarea_id).values(Posicion=target + 1))
+    db.session.commit()
+    return hi - lo + 1
+
+
+def gap_move(columna_id, cards, source, target):
+    tarea_id = cards.pop(source)
+    anterior = cards[target - 1] if target > 0 else None
+    siguiente = cards[target] if target < len(cards) else None
+    cards.insert(target, tarea_id)
+    ordering.move_tarea(tarea_id, columna_id, anterior, siguiente)
+
+
+def run(moves, move):
+    samples = []
+    with QueryCounter(db.engine) as counter:
+        for source, target in moves:
+            start = time.perf_counter()
+            move(source, target)
+            samples.append(time.perf_counter() - start)
+    return dict(summarize(samples), statements_per_move=round(counter.count / len(moves), 1))
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--cards', type=int, default=5000)
+    parser.add_argument('--moves', type=int, default=200)
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        columna_id, ids = seed_column(args.cards)
+        moves = [(rnd.randrange(args.cards), rnd.randrange(args.cards)) for _ in range(args.moves)]
+        results = {}
+
+        dense_rows = round(sum(abs(s - t) + 1 for s, t in moves) / len(moves), 1)
+        for name, per_card in (('dense_per_card', True), ('dense_shift', False)):
+            reset(columna_id, ids, 1)
+            cards = list(ids)
+            results[name] = run(moves, lambda s, t: dense_move(columna_id, cards, s, t, per_card))
+            results[name]['rows_written_per_move'] = dense_rows
+            assert order(columna_id) == cards
+
+        inline, background = [], []
+        rebalance = ordering.rebalance
+
+        def counting_rebalance(columna, commit=True):
+            (background if commit else inline).append(columna)
+            return rebalance(columna, commit)
+
+        ordering.rebalance = counting_rebalance
+        try:
+            reset(columna_id, ids, ordering.GAP)
+            cards = list(ids)
+            results['gap'] = run(moves, lambda s, t: gap_move(columna_id, cards, s, t))
+            ordering.rebalancer.shutdown()
+            assert order(columna_id) == cards
+            results['gap'].update(inline_rebalances=len(inline), background_rebalances=len(background))
+
+            del inline[:], background[:]
+            reset(columna_id, ids, ordering.GAP)
+            cards = list(ids)
+            # Always take the bottom card and drop it right below the top one.
+            slot_moves = [(args.cards - 1, 1)] * args.moves
+            results['gap_same_slot'] = run(slot_moves, lambda s, t: gap_move(columna_id, cards, s, t))
+            ordering.rebalancer.shutdown()
+            assert order(columna_id) == cards
+            results['gap_same_slot'].update(inline_rebalances=len(inline), background_rebalances=len(background))
+        finally:
+            ordering.rebalance = rebalance
+
+        start = time.perf_counter()
+        ordering.rebalance(columna_id)
+        report('card_moves', cards=args.cards, moves=args.moves,
+               rebalance_ms=round((time.perf_counter() - start) * 1000, 1), **results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Overhead of the request metrics on a typical authenticated listing.
+
+Times ``--requests`` GET /api/tareas?estado=pendiente&limit=50 calls with
+metrics off (``metrics.enabled = False``), on, and on with the sampling
+profiler running on every request (its slow threshold set high enough
+that nothing is written). Also reports how long rendering /metrics takes
+afterwards.
+"""
+import time
+from app import db, metrics
+from app.profiler import SamplingProfiler
+from .common import base_parser, make_app, make_token, seed_board, summarize, time_calls, report
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--tareas', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        board_id, owner_id = seed_board(args.tareas, seed=args.seed)
+        client = app.test_client()
+        headers = {'x-access-tokens': make_token(app, owner_id)}
+
+        def call():
+            response = client.get('/api/tareas?estado=pendiente&limit=50', headers=headers)
+            assert response.status_code == 200, response.get_json()
+
+        time_calls(call, 100)
+        results = {}
+        metrics.enabled = False
+        results['off'] = summarize(time_calls(call, args.requests))
+        metrics.enabled = True
+        results['on'] = summarize(time_calls(call, args.requests))
+        metrics.profiler, metrics.profile_slow = SamplingProfiler(interval=0.005), 3600.0
+        results['profiling'] = summarize(time_calls(call, args.requests))
+        metrics.profiler = metrics.profile_slow = None
+
+        start = time.perf_counter()
+        size = len(client.get('/metrics').data)
+        results['render'] = {'ms': round((time.perf_counter() - start) * 1000, 3), 'bytes': size}
+        report('metrics', tareas=args.tareas, requests=args.requests, **results)
+
+
+if __name__ == '__main__':
+    main()
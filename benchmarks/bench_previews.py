@@ -0,0 +1,78 @@
+"""Upload latency with no previews, inline previews and the preview pipeline.
+
+Every mode stores ``--uploads`` JPEG photos of ``--width`` x ``--height``
+through BlobStorage, as upload_adjunto does after reading the request.
+"inline" also builds the thumbnail before returning. "pipeline" hands it
+to the worker pool. CrearAdjunto is left out because it costs the same in
+every mode. ``ready_s`` is the time until every preview exists. Needs
+Pillow.
+"""
+import io
+import random
+import shutil
+import tempfile
+import time
+from app import blob_storage, previews
+from app.previews import Image
+from config import DevelopmentConfig
+from .common import base_parser, make_app, summarize, report
+
+
+def make_photos(n, width, height, seed):
+    rnd = random.Random(seed)
+    photos = []
+    for _ in range(n):
+        # Noise keeps each file distinct and the JPEG about as heavy as a photo.
+        image = Image.merge('RGB', [Image.effect_noise((width, height), rnd.randint(20, 80)) for _ in range(3)])
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=90)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def run(mode, photos):
+    samples, futures = [], []
+    start = time.perf_counter()
+    for content in photos:
+        t0 = time.perf_counter()
+        blob = blob_storage.receive(io.BytesIO(content))
+        blob_storage.commit(blob)
+        if mode == 'inline':
+            previews.generate(blob.Hash)
+        elif mode == 'pipeline':
+            futures.append(previews.submit(blob.Hash, 'image/jpeg'))
+        samples.append(time.perf_counter() - t0)
+    for future in futures:
+        future.result()
+    ready = time.perf_counter() - start
+    return dict(summarize(samples), ready_s=round(ready, 3))
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--uploads', type=int, default=50)
+    parser.add_argument('--width', type=int, default=2000)
+    parser.add_argument('--height', type=int, default=1500)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+    if Image is None:
+        parser.error('Pillow is not installed')
+
+    make_app(args.database_uri)
+    previews.workers = args.workers
+    photos = make_photos(args.uploads, args.width, args.height, args.seed)
+    results = {}
+    for mode in ('none', 'inline', 'pipeline'):
+        blob_storage.root = tempfile.mkdtemp()
+        try:
+            results[mode] = run(mode, photos)
+        finally:
+            shutil.rmtree(blob_storage.root)
+            blob_storage.root = DevelopmentConfig.ADJUNTOS_DIR
+    previews.shutdown()
+    report('previews', uploads=args.uploads, size='%dx%d' % (args.width, args.height),
+           workers=args.workers, **results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Project stats from the aggregate tables vs computing them from Tareas.
+
+Seeds one board with ``--tareas`` tasks, then times for one project and for
+the board:
+
+- ``materialized``: stats.proyecto_stats / stats.board_stats.
+- ``group_by``: the same numbers aggregated from Tareas on every request.
+- ``fetch_all``: reading every task of the board and counting in Python,
+  as dashboards do today.
+
+It also times ``--writes`` single-row inserts and updates of Estado with and
+without the triggers that keep the aggregates current.
+"""
+import datetime
+import time
+from sqlalchemy import case, func, select, text
+from app import db, stats
+from app.models import Proyecto, Tarea
+from .common import base_parser, make_app, seed_board, time_calls, summarize, report
+
+
+def group_by(proyecto_ids, today):
+    tareas = Tarea.__table__
+
+    def contar(condicion):
+        return func.sum(case((condicion, 1), else_=0))
+
+    query = (select(tareas.c.ProyectoID, func.count(), contar(tareas.c.Estado == 'pendiente'),
+                    contar(tareas.c.Estado == 'en_proceso'), contar(tareas.c.Estado == 'completada'),
+                    contar((tareas.c.Estado != 'completada') & (tareas.c.FechaVencimiento < today)))
+             .where(tareas.c.ProyectoID.in_(proyecto_ids))
+             .group_by(tareas.c.ProyectoID))
+    return db.session.execute(query).all()
+
+
+def fetch_all(proyecto_ids, today):
+    counts = {}
+    query = select(Tarea.__table__).where(Tarea.ProyectoID.in_(proyecto_ids))
+    for row in db.session.execute(query):
+        c = counts.setdefault(row.ProyectoID, {'Total': 0, 'Vencidas': 0})
+        c['Total'] += 1
+        c[row.Estado] = c.get(row.Estado, 0) + 1
+        if row.Estado != 'completada' and row.FechaVencimiento and row.FechaVencimiento < today:
+            c['Vencidas'] += 1
+    return counts
+
+
+def time_writes(proyecto_id, n):
+    tareas = Tarea.__table__
+    start = time.perf_counter()
+    for i in range(n):
+        db.session.execute(tareas.insert().values(ProyectoID=proyecto_id, Titulo='Nueva %d' % i, Estado='pendiente',
+                                                  FechaVencimiento=datetime.date.today()))
+        db.session.commit()
+    inserts = time.perf_counter() - start
+    ids = [row[0] for row in db.session.query(Tarea.TareaID).order_by(Tarea.TareaID.desc()).limit(n)]
+    start = time.perf_counter()
+    for tarea_id in ids:
+        db.session.execute(tareas.update().where(tareas.c.TareaID == tarea_id).values(Estado='completada'))
+        db.session.commit()
+    updates = time.perf_counter() - start
+    return {'insert_us': round(inserts / n * 1e6, 1), 'update_us': round(updates / n * 1e6, 1)}
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--tareas', type=int, default=200000)
+    parser.add_argument('--writes', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        board_id, _ = seed_board(args.tareas, seed=args.seed)
+        stats.rebuild()
+        proyecto_ids = [row[0] for row in db.session.query(Proyecto.ProyectoID).filter_by(BoardID=board_id)]
+        today = datetime.date.today()
+        one = proyecto_ids[:1]
+        results = {
+            'proyecto': {
+                'materialized': summarize(time_calls(lambda: stats.proyecto_stats(one[0]), args.repeat)),
+                'group_by': summarize(time_calls(lambda: group_by(one, today), args.repeat)),
+                'fetch_all': summarize(time_calls(lambda: fetch_all(one, today), max(1, args.repeat // 4))),
+            },
+            'board': {
+                'materialized': summarize(time_calls(lambda: stats.board_stats(board_id), args.repeat)),
+                'group_by': summarize(time_calls(lambda: group_by(proyecto_ids, today), args.repeat)),
+                'fetch_all': summarize(time_calls(lambda: fetch_all(proyecto_ids, today), max(1, args.repeat // 4))),
+            },
+        }
+        writes = {'with_triggers': time_writes(one[0], args.writes)}
+        if db.engine.dialect.name == 'sqlite':
+            for name in ('TareasEstadisticasInsert', 'TareasEstadisticasUpdate', 'TareasEstadisticasDelete'):
+                db.session.execute(text('DROP TRIGGER %s' % name))
+            db.session.commit()
+            writes['without_triggers'] = time_writes(one[0], args.writes)
+        report('project_stats', tareas=args.tareas, proyectos=len(proyecto_ids), writes=writes, **results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Search over the inverted index vs scanning comments with LIKE.
+
+Seeds ``--tareas`` tasks and ``--comentarios`` comments of Zipf-distributed
+words, then times ``flask search rebuild`` (search.rebuild). It then
+compares ``search.search`` with ``LIKE '%term%'`` on Comentarios.Texto
+for frequent, medium and rare terms and a two-word query. ``like_page``
+stops at the first 51 matches, unranked. ``like_all`` counts every match,
+which is the least any ranking over LIKE has to read. The default of one
+million comments takes a few minutes on SQLite.
+"""
+import random
+import time
+from app import db, search
+from app.models import Comentario, Tarea, IndiceBusqueda
+from .common import base_parser, make_app, seed_board, insert_rows, time_calls, summarize, report
+
+SILABAS = ['ca', 'me', 'ti', 'po', 'ra', 'sa', 'lu', 'ne', 'go', 'ri', 'ta', 'ño', 'ci', 'ma', 'de', 'so', 've', 'la']
+PALABRAS = ['revisar', 'cliente', 'presupuesto', 'diseño', 'migración', 'pruebas', 'servidor', 'reunión',
+            'entrega', 'factura', 'informe', 'campaña', 'urgente', 'año', 'error', 'página', 'versión', 'contrato']
+
+
+def vocabulary(rnd, size):
+    words = list(PALABRAS)
+    while len(words) < size:
+        words.append(''.join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4))))
+    return words
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--tareas', type=int, default=10000)
+    parser.add_argument('--comentarios', type=int, default=1000000)
+    parser.add_argument('--vocabulario', type=int, default=20000)
+    parser.add_argument('--palabras', type=int, default=12)
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        board_id, owner_id = seed_board(args.tareas, seed=args.seed)
+        tarea_ids = [row[0] for row in db.session.query(Tarea.TareaID)]
+        words = vocabulary(rnd, args.vocabulario)
+        weights = [1.0 / (rank + 1) for rank in range(len(words))]
+        chunk = 50000
+        for start in range(0, args.comentarios, chunk):
+            n = min(chunk, args.comentarios - start)
+            texts = [' '.join(rnd.choices(words, weights, k=args.palabras)) for _ in range(n)]
+            insert_rows(Comentario, [{'TareaID': rnd.choice(tarea_ids), 'UsuarioID': owner_id, 'Texto': text}
+                                     for text in texts])
+
+        start = time.perf_counter()
+        counts = search.rebuild()
+        rebuild_s = time.perf_counter() - start
+        postings = db.session.query(db.func.count()).select_from(IndiceBusqueda).scalar()
+
+        queries = {
+            'frequent': words[0],
+            'medium': words[200],
+            'rare': words[args.vocabulario // 2],
+            'two_words': '%s %s' % (words[1], words[50]),
+        }
+        results = {}
+        for name, query in queries.items():
+            hits = search.search(query, 51)
+            indexed = summarize(time_calls(lambda: search.hydrate(search.search(query, 51)[:50]), args.repeat))
+            like = db.session.query(Comentario.ComentarioID).filter(
+                *[Comentario.Texto.like('%' + term + '%') for term in query.split()])
+            page = summarize(time_calls(lambda: like.limit(51).all(), max(1, args.repeat // 4)))
+            scan = summarize(time_calls(like.count, max(1, args.repeat // 4)))
+            results[name] = {'query': query, 'hits_page': len(hits), 'index': indexed,
+                             'like_page': page, 'like_all': scan}
+
+        report('search', tareas=counts[search.TAREA], comentarios=counts[search.COMENTARIO], postings=postings,
+               rebuild_s=round(rebuild_s, 1), docs_per_s=round(sum(counts.values()) / rebuild_s), **results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Rows per second turning ``--rows`` Tareas rows into a JSON body.
+
+Positional rows come from a DB-API cursor, as the procedures return them:
+
+- ``jsonify_tuples``: Flask's encoder over the raw tuples (the old
+  procedure routes; no field names at all).
+- ``zip_stdlib``: ``dict(zip(names, row))`` and the stdlib encoder.
+- ``compiled_stdlib``: serialization.description_encoder and the stdlib
+  encoder.
+- ``compiled``: serialization.description_encoder and serialization.dumps
+  (orjson when installed, see ``encoder``).
+
+ORM instances, as the model routes load them:
+
+- ``marshmallow``: TareaSchema(many=True).dump and Flask's encoder.
+- ``model_encoder``: Tarea.to_dict and serialization.dumps.
+
+Each mode encodes the same rows ``--repeat`` times; fetching is not timed.
+"""
+import json
+import time
+from flask import json as flask_json
+from app import db, serialization
+from app.models import Tarea
+from app.schemas import TareaSchema
+from app.serialization import description_encoder, dumps
+from .common import base_parser, make_app, seed_board, report
+
+
+def rate(fn, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'rows_per_s': int(rows / best), 'best_ms': round(best * 1000, 1)}
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.set_defaults(repeat=5)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.test_request_context():
+        db.create_all()
+        seed_board(args.rows, seed=args.seed)
+        conn = db.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM Tareas')
+            description = cursor.description
+            tuples = cursor.fetchall()
+        finally:
+            conn.close()
+        names = [column[0] for column in description]
+        stdlib = json.JSONEncoder(default=serialization._default, separators=(',', ':'))
+        tareas = Tarea.query.all()
+        schema = TareaSchema(many=True)
+        n = len(tuples)
+
+        def compiled(encoder):
+            encode = description_encoder(description)
+            return encoder([encode(row) for row in tuples])
+
+        results = {
+            'encoder': 'orjson' if serialization.orjson is not None else 'json',
+            'tuples': {
+                'jsonify_tuples': rate(lambda: flask_json.dumps(tuples), n, args.repeat),
+                'zip_stdlib': rate(lambda: stdlib.encode([dict(zip(names, row)) for row in tuples]), n, args.repeat),
+                'compiled_stdlib': rate(lambda: compiled(stdlib.encode), n, args.repeat),
+                'compiled': rate(lambda: compiled(dumps), n, args.repeat),
+            },
+            'orm': {
+                'marshmallow': rate(lambda: flask_json.dumps(schema.dump(tareas)), n, args.repeat),
+                'model_encoder': rate(lambda: dumps([tarea.to_dict() for tarea in tareas]), n, args.repeat),
+            },
+        }
+        report('serialization', rows=n, **results)
+
+
+if __name__ == '__main__':
+    main()
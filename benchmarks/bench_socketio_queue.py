@@ -0,0 +1,127 @@
+"""Cross-worker latency of task events through the Socket.IO message queue.
+
+The main process plays the HTTP worker: it updates one task ``--events``
+times, writing the send time (``time.monotonic()``, shared by every process
+on the host) into the task title. ``--workers`` receiver processes each hold
+``--clients`` sockets in the task's board room. Each receiver records the
+time the event reaches the packet writer for every socket. The benchmark
+reports latency from the start of the request to that point. It excludes
+the final network hop to the browser.
+
+``--endpoint put`` goes through update_tarea and needs a MySQL database with
+BasedeDatos.txt loaded (``--database-uri``). ``--endpoint bulk`` uses
+PATCH /tareas/bulk and also runs on the default SQLite file. Start a broker
+first, e.g. ``redis-server`` for the default ``--message-queue``.
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from app import create_app, db, socketio
+from app.events import board_room
+from app.models import Tarea
+from config import DevelopmentConfig
+from .common import base_parser, make_token, seed_board, summarize, report
+
+
+def make_worker_app(message_queue, database_uri):
+    class QueueConfig(DevelopmentConfig):
+        SOCKETIO_MESSAGE_QUEUE = message_queue
+        SQLALCHEMY_DATABASE_URI = database_uri
+
+    app = create_app(QueueConfig)
+    app.config['TESTING'] = True
+    return app
+
+
+def receive(message_queue, database_uri, board_id, clients, expected, timeout, ready, results):
+    make_worker_app(message_queue, database_uri)
+    server = socketio.server
+    latencies = []
+    done = threading.Event()
+
+    def record(eio_sid, pkt):
+        now = time.monotonic()
+        payload = pkt.data[1]
+        task = payload['tasks'][0] if 'tasks' in payload else payload['task']
+        latencies.append(now - float(task['Titulo']))
+        if len(latencies) >= expected:
+            done.set()
+
+    server._send_packet = record
+    server.manager_initialized = True
+    server.manager.initialize()
+    for i in range(clients):
+        sid = server.manager.connect('client-%d' % i, '/')
+        server.manager.enter_room(sid, '/', board_room(board_id))
+    ready.put(os.getpid())
+    done.wait(timeout)
+    results.put(latencies)
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--message-queue', default='redis://localhost:6379/0')
+    parser.add_argument('--endpoint', choices=('put', 'bulk'), default='put')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.005)
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+    database_uri = args.database_uri or 'sqlite:///%s' % os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    app = make_worker_app(args.message_queue, database_uri)
+    with app.app_context():
+        db.create_all()
+        board_id, owner_id = seed_board(1, n_proyectos=1, seed=args.seed)
+        tarea = Tarea.query.first()
+        tarea_id, proyecto_id = tarea.TareaID, tarea.ProyectoID
+    headers = {'x-access-tokens': make_token(app, owner_id)}
+    # This process only publishes. Its queue listener would be a non-daemon
+    # thread that keeps the benchmark from exiting.
+    socketio.server.manager_initialized = True
+
+    context = multiprocessing.get_context('spawn')
+    ready, results = context.Queue(), context.Queue()
+    workers = [context.Process(target=receive, args=(
+        args.message_queue, database_uri, board_id, args.clients, args.clients * args.events,
+        args.timeout, ready, results)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.get(timeout=args.timeout)
+
+    client = app.test_client()
+    requests = []
+    for _ in range(args.events):
+        start = time.monotonic()
+        titulo = '%.9f' % start
+        if args.endpoint == 'put':
+            response = client.put('/api/tareas/%d' % tarea_id, headers=headers,
+                                  json={'ProyectoID': proyecto_id, 'Titulo': titulo})
+        else:
+            response = client.patch('/api/tareas/bulk', headers=headers,
+                                    json=[{'TareaID': tarea_id, 'Titulo': titulo}])
+        assert response.status_code == 200, response.get_json()
+        requests.append(time.monotonic() - start)
+        time.sleep(args.interval)
+
+    latencies = []
+    for _ in workers:
+        latencies.extend(results.get(timeout=args.timeout + 5))
+    for worker in workers:
+        # Receivers block in their queue listener thread; stop them here.
+        worker.terminate()
+        worker.join()
+
+    expected = args.workers * args.clients * args.events
+    report('socketio_queue', message_queue=args.message_queue, endpoint=args.endpoint,
+           workers=args.workers, clients_per_worker=args.clients, events=args.events,
+           deliveries={'expected': expected, 'received': len(latencies)},
+           request=summarize(requests), latency=summarize(latencies) if latencies else None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Socket.IO fan-out: global broadcast vs board rooms.
+
+Connects ``--clients`` in-process test clients spread evenly over
+``--boards`` boards. It then emits ``--events`` task events, first with
+broadcast and then only to the affected board's room. It reports how many
+events were delivered and how many the server delivered per second.
+"""
+import time
+from app import db, socketio
+from app.events import board_room
+from app.models import Usuario, Board
+from .common import base_parser, make_app, make_token, insert_rows, report
+
+
+def drain(clients):
+    return sum(len(client.get_received()) for client in clients)
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--boards', type=int, default=100)
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        insert_rows(Usuario, [{'Nombre': 'U', 'Apellido': str(i), 'CorreoElectronico': 'u%d@example.com' % i,
+                               'PasswordHash': 'x'} for i in range(args.boards)])
+        owners = [row[0] for row in db.session.query(Usuario.UsuarioID)]
+        insert_rows(Board, [{'UsuarioPropietarioID': owner, 'Titulo': 'Board'} for owner in owners])
+        boards = db.session.query(Board.BoardID, Board.UsuarioPropietarioID).all()
+        tokens = {owner: make_token(app, owner) for _, owner in boards}
+
+    clients = []
+    for i in range(args.clients):
+        board_id, owner = boards[i % len(boards)]
+        client = socketio.test_client(app, auth={'token': tokens[owner]})
+        client.emit('join_board', {'BoardID': board_id})
+        clients.append(client)
+    drain(clients)
+
+    results = {}
+    for mode in ('broadcast', 'room'):
+        start = time.perf_counter()
+        for n in range(args.events):
+            board_id = boards[n % len(boards)][0]
+            payload = {'task': {'TareaID': n, 'Titulo': 'Tarea %d' % n}}
+            if mode == 'broadcast':
+                socketio.emit('update_task', payload)
+            else:
+                socketio.emit('update_task', payload, to=board_room(board_id))
+        elapsed = time.perf_counter() - start
+        delivered = drain(clients)
+        results[mode] = {
+            'seconds': round(elapsed, 3),
+            'deliveries': delivered,
+            'deliveries_per_event': round(delivered / args.events, 1),
+            'deliveries_per_s': round(delivered / elapsed),
+            'events_per_s': round(args.events / elapsed),
+        }
+
+    for client in clients:
+        client.disconnect()
+    report('socketio_rooms', clients=args.clients, boards=args.boards, events=args.events, **results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Filtered task queries vs fetching every task and filtering on the client.
+
+Seeds one board with ``--tareas`` tasks (tags and assignees as in
+seed_board). ``fetch_all`` reads Tareas, Tareas_Etiquetas and
+AsignacionesTareas whole and filters in Python, as dashboards do without
+server-side filters. For each filter set, ``page`` is the first page of 50
+from tareas_query and ``all`` is every match. Each query then runs again
+after dropping the indexes added for the filters (``no_index``).
+"""
+import datetime
+from sqlalchemy import select
+from app import db
+from app.filters import tareas_query
+from app.models import Tarea, TareaEtiqueta, AsignacionTarea
+from .common import base_parser, make_app, seed_board, time_calls, summarize, report
+
+FILTER_INDEXES = ('idx_tareas_proyecto_estado', 'idx_tareas_etiquetas_etiqueta', 'idx_asignaciones_usuario_tarea')
+
+
+def fetch_all(filters):
+    etiquetas, asignados = {}, {}
+    for tarea_id, etiqueta_id in db.session.execute(select(TareaEtiqueta.TareaID, TareaEtiqueta.EtiquetaID)):
+        etiquetas.setdefault(tarea_id, set()).add(etiqueta_id)
+    for tarea_id, usuario_id in db.session.execute(select(AsignacionTarea.TareaID, AsignacionTarea.UsuarioID)):
+        asignados.setdefault(tarea_id, set()).add(usuario_id)
+    matches = []
+    for row in db.session.execute(select(Tarea.__table__)):
+        if 'proyecto_id' in filters and row.ProyectoID != filters['proyecto_id']:
+            continue
+        if 'estado' in filters and row.Estado not in filters['estado']:
+            continue
+        if 'importancia_min' in filters and row.Importancia < filters['importancia_min']:
+            continue
+        if 'vence_hasta' in filters and row.FechaVencimiento > filters['vence_hasta']:
+            continue
+        if 'etiqueta_id' in filters and filters['etiqueta_id'] not in etiquetas.get(row.TareaID, ()):
+            continue
+        if 'usuario_id' in filters and filters['usuario_id'] not in asignados.get(row.TareaID, ()):
+            continue
+        matches.append(tuple(row))
+    return matches
+
+
+def time_queries(cases, repeat):
+    results = {}
+    for name, filters in cases.items():
+        results[name] = {
+            'matches': len(db.session.execute(tareas_query(filters)).all()),
+            'page': summarize(time_calls(lambda: db.session.execute(tareas_query(filters, 0, 51)).all(), repeat)),
+            'all': summarize(time_calls(lambda: db.session.execute(tareas_query(filters)).all(), repeat)),
+        }
+    return results
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--tareas', type=int, default=200000)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    with app.app_context():
+        db.create_all()
+        board_id, owner_id = seed_board(args.tareas, seed=args.seed)
+        proyecto_id = db.session.query(Tarea.ProyectoID).first()[0]
+        etiqueta_id = db.session.query(TareaEtiqueta.EtiquetaID).first()[0]
+        hoy = datetime.date.today()
+        abiertas = ['pendiente', 'en_proceso']
+        cases = {
+            'vencidas': {'estado': abiertas, 'vence_hasta': hoy},
+            'proyecto_pendientes': {'proyecto_id': proyecto_id, 'estado': ['pendiente']},
+            'etiqueta': {'etiqueta_id': etiqueta_id},
+            'asignadas': {'usuario_id': owner_id},
+            'tablero': {'estado': abiertas, 'vence_hasta': hoy, 'importancia_min': 4,
+                        'etiqueta_id': etiqueta_id, 'usuario_id': owner_id},
+        }
+        fetch = summarize(time_calls(lambda: fetch_all(cases['tablero']), max(1, args.repeat // 4)))
+        indexed = time_queries(cases, args.repeat)
+        for table in (Tarea.__table__, TareaEtiqueta.__table__, AsignacionTarea.__table__):
+            for index in table.indexes:
+                if index.name in FILTER_INDEXES:
+                    index.drop(db.engine)
+        no_index = time_queries(cases, args.repeat)
+        for name in cases:
+            indexed[name]['no_index'] = {'page': no_index[name]['page'], 'all': no_index[name]['all']}
+        report('tareas_filters', tareas=args.tareas, fetch_all_tablero=fetch, **indexed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""Helpers shared by the benchmark scripts.
+
+Run the scripts from the repository root, e.g.
+``python -m benchmarks.bench_board_snapshot --tareas 10000``. They use the
+in-memory SQLite database of DevelopmentConfig unless ``--database-uri`` is
+given.
+"""
+import argparse
+import datetime
+import json
+import random
+import statistics
+import time
+import jwt
+from sqlalchemy import event
+from app import create_app, db
+from app.models import (Usuario, PerfilUsuario, Board, Proyecto, Columna, Tarea, TareaColumna,
+                        Etiqueta, TareaEtiqueta, AsignacionTarea, Comentario, Notificacion)
+from app.ordering import GAP
+
+ESTADOS = ('pendiente', 'en_proceso', 'completada')
+
+
+def base_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--database-uri', default=None)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    return parser
+
+
+def make_app(database_uri=None):
+    app = create_app()
+    app.config['TESTING'] = True
+    if database_uri:
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    return app
+
+
+def make_token(app, usuario_id, minutes=60):
+    return jwt.encode(
+        {'UsuarioID': usuario_id, 'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=minutes)},
+        app.config['SECRET_KEY'], algorithm="HS256")
+
+
+class QueryCounter:
+    """Count the SQL statements executed on the engine inside the block."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 3),
+        'p50_ms': round(pct(50) * 1000, 3),
+        'p95_ms': round(pct(95) * 1000, 3),
+        'p99_ms': round(pct(99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name, **results):
+    print(json.dumps({'benchmark': name, **results}, indent=2, default=str))
+
+
+def insert_rows(model, rows, chunk=5000):
+    for start in range(0, len(rows), chunk):
+        db.session.execute(model.__table__.insert(), rows[start:start + chunk])
+    db.session.commit()
+
+
+def seed_board(n_tareas, n_proyectos=5, n_columnas=4, n_etiquetas=20, n_usuarios=20, seed=1):
+    """Create one board holding ``n_tareas`` tasks spread over its projects.
+
+    Every task sits in one column and gets up to two tags and one assignee.
+    Returns ``(board_id, owner_id)``.
+    """
+    rnd = random.Random(seed)
+    insert_rows(Usuario, [
+        {'Nombre': 'Usuario', 'Apellido': str(i), 'CorreoElectronico': 'u%d@example.com' % i, 'PasswordHash': 'x'}
+        for i in range(n_usuarios)
+    ])
+    usuario_ids = [row[0] for row in db.session.query(Usuario.UsuarioID)]
+    board = Board(UsuarioPropietarioID=usuario_ids[0], Titulo='Benchmark')
+    db.session.add(board)
+    db.session.commit()
+    insert_rows(Proyecto, [{'BoardID': board.BoardID, 'Titulo': 'Proyecto %d' % i} for i in range(n_proyectos)])
+    proyecto_ids = [row[0] for row in db.session.query(Proyecto.ProyectoID).filter_by(BoardID=board.BoardID)]
+    insert_rows(Columna, [{'ProyectoID': p, 'ColumnaNombre': 'Columna %d' % i}
+                          for p in proyecto_ids for i in range(n_columnas)])
+    columnas = {}
+    for columna_id, proyecto_id in db.session.query(Columna.ColumnaID, Columna.ProyectoID):
+        columnas.setdefault(proyecto_id, []).append(columna_id)
+    insert_rows(Etiqueta, [{'Nombre': 'Etiqueta %d' % i} for i in range(n_etiquetas)])
+    etiqueta_ids = [row[0] for row in db.session.query(Etiqueta.EtiquetaID)]
+    hoy = datetime.date.today()
+    insert_rows(Tarea, [{
+        'ProyectoID': rnd.choice(proyecto_ids),
+        'Titulo': 'Tarea %d' % i,
+        'Descripcion': 'Descripción de la tarea %d' % i,
+        'Importancia': rnd.randint(1, 5),
+        'Estado': rnd.choice(ESTADOS),
+        'FechaVencimiento': hoy + datetime.timedelta(days=rnd.randint(-30, 60)),
+    } for i in range(n_tareas)])
+    tareas = db.session.query(Tarea.TareaID, Tarea.ProyectoID).join(
+        Proyecto, Tarea.ProyectoID == Proyecto.ProyectoID).filter(Proyecto.BoardID == board.BoardID).all()
+    posiciones, etiquetas, asignaciones = [], [], []
+    siguiente = {}
+    for tarea_id, proyecto_id in tareas:
+        columna_id = rnd.choice(columnas[proyecto_id])
+        siguiente[columna_id] = siguiente.get(columna_id, 0) + 1
+        posiciones.append({'TareaID': tarea_id, 'ColumnaID': columna_id, 'Posicion': siguiente[columna_id]})
+        for etiqueta_id in rnd.sample(etiqueta_ids, rnd.randint(0, 2)):
+            etiquetas.append({'TareaID': tarea_id, 'EtiquetaID': etiqueta_id})
+        asignaciones.append({'TareaID': tarea_id, 'UsuarioID': rnd.choice(usuario_ids)})
+    insert_rows(TareaColumna, posiciones)
+    insert_rows(TareaEtiqueta, etiquetas)
+    insert_rows(AsignacionTarea, asignaciones)
+    return board.BoardID, usuario_ids[0]
+
+
+def seed_dataset(n_usuarios=1000, n_boards=100, n_proyectos=5, n_columnas=4, n_tareas=100000,
+                 n_comentarios=1000000, n_notificaciones=100000, n_etiquetas=50, password_hash='x', seed=1):
+    """Create a synthetic dataset spread over ``n_boards`` boards.
+
+    Every user gets a profile. Boards belong to the first ``n_boards`` users
+    and have ``n_proyectos`` projects of ``n_columnas`` columns each. Tasks
+    are spread over all projects; each one sits in a column, gets up to two
+    tags and one assignee. Comments and notifications are spread over all
+    tasks and users; they are written in chunks, so a million of them does
+    not need to fit in memory.
+
+    Returns a dict with the ids needed to build requests: ``usuarios``
+    (id -> email), ``boards`` (``(board_id, owner_id)`` pairs),
+    ``proyectos`` and ``columnas`` (per board and per project), ``tareas``
+    (``(tarea_id, proyecto_id)`` pairs per board), ``etiquetas``, and the
+    id ranges of ``comentarios`` and ``notificaciones``.
+    """
+    rnd = random.Random(seed)
+    insert_rows(Usuario, [
+        {'Nombre': 'Usuario', 'Apellido': str(i), 'CorreoElectronico': 'u%d@example.com' % i,
+         'PasswordHash': password_hash}
+        for i in range(n_usuarios)
+    ])
+    usuarios = dict(db.session.query(Usuario.UsuarioID, Usuario.CorreoElectronico).order_by(Usuario.UsuarioID))
+    usuario_ids = list(usuarios)
+    insert_rows(PerfilUsuario, [{'UsuarioID': u, 'Biografia': 'Biografía %d' % u} for u in usuario_ids])
+    insert_rows(Board, [{'UsuarioPropietarioID': usuario_ids[i % len(usuario_ids)], 'Titulo': 'Board %d' % i}
+                        for i in range(n_boards)])
+    boards = db.session.query(Board.BoardID, Board.UsuarioPropietarioID).order_by(Board.BoardID).all()
+    insert_rows(Proyecto, [{'BoardID': b, 'Titulo': 'Proyecto %d' % i} for b, _ in boards for i in range(n_proyectos)])
+    board_of = dict(db.session.query(Proyecto.ProyectoID, Proyecto.BoardID))
+    insert_rows(Columna, [{'ProyectoID': p, 'ColumnaNombre': 'Columna %d' % i}
+                          for p in board_of for i in range(n_columnas)])
+    columnas = {}
+    for columna_id, proyecto_id in db.session.query(Columna.ColumnaID, Columna.ProyectoID):
+        columnas.setdefault(proyecto_id, []).append(columna_id)
+    insert_rows(Etiqueta, [{'Nombre': 'Etiqueta %d' % i} for i in range(n_etiquetas)])
+    etiqueta_ids = [row[0] for row in db.session.query(Etiqueta.EtiquetaID)]
+
+    proyecto_ids = list(board_of)
+    hoy = datetime.date.today()
+    insert_rows(Tarea, [{
+        'ProyectoID': rnd.choice(proyecto_ids),
+        'Titulo': 'Tarea %d' % i,
+        'Descripcion': 'Descripción de la tarea %d' % i,
+        'Importancia': rnd.randint(1, 5),
+        'Estado': rnd.choice(ESTADOS),
+        'FechaVencimiento': hoy + datetime.timedelta(days=rnd.randint(-30, 60)),
+    } for i in range(n_tareas)])
+    tareas = db.session.query(Tarea.TareaID, Tarea.ProyectoID).order_by(Tarea.TareaID).all()
+    posiciones, etiquetas, asignaciones = [], [], []
+    siguiente = {}
+    for tarea_id, proyecto_id in tareas:
+        columna_id = rnd.choice(columnas[proyecto_id])
+        siguiente[columna_id] = siguiente.get(columna_id, 0) + GAP
+        posiciones.append({'TareaID': tarea_id, 'ColumnaID': columna_id, 'Posicion': siguiente[columna_id]})
+        for etiqueta_id in rnd.sample(etiqueta_ids, min(len(etiqueta_ids), rnd.randint(0, 2))):
+            etiquetas.append({'TareaID': tarea_id, 'EtiquetaID': etiqueta_id})
+        asignaciones.append({'TareaID': tarea_id, 'UsuarioID': rnd.choice(usuario_ids)})
+    insert_rows(TareaColumna, posiciones)
+    insert_rows(TareaEtiqueta, etiquetas)
+    insert_rows(AsignacionTarea, asignaciones)
+    del posiciones, etiquetas, asignaciones
+
+    tarea_ids = [tarea_id for tarea_id, _ in tareas]
+    for start in range(0, n_comentarios, 5000):
+        insert_rows(Comentario, [{'TareaID': rnd.choice(tarea_ids), 'UsuarioID': rnd.choice(usuario_ids),
+                                  'Texto': 'Comentario %d sobre la tarea' % i}
+                                 for i in range(start, min(start + 5000, n_comentarios))])
+    for start in range(0, n_notificaciones, 5000):
+        insert_rows(Notificacion, [{'UsuarioID': rnd.choice(usuario_ids), 'Mensaje': 'Notificación %d' % i,
+                                    'Leida': rnd.random() < 0.5}
+                                   for i in range(start, min(start + 5000, n_notificaciones))])
+
+    tareas_por_board, proyectos_por_board = {}, {}
+    for tarea_id, proyecto_id in tareas:
+        tareas_por_board.setdefault(board_of[proyecto_id], []).append((tarea_id, proyecto_id))
+    for proyecto_id, board_id in board_of.items():
+        proyectos_por_board.setdefault(board_id, []).append(proyecto_id)
+
+    def id_range(column):
+        return tuple(db.session.query(db.func.min(column), db.func.max(column)).one())
+
+    return {
+        'usuarios': usuarios,
+        'boards': boards,
+        'proyectos': proyectos_por_board,
+        'columnas': columnas,
+        'tareas': tareas_por_board,
+        'etiquetas': etiqueta_ids,
+        'comentarios': id_range(Comentario.ComentarioID),
+        'notificaciones': id_range(Notificacion.NotificacionID),
+    }
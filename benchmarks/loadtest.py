@@ -0,0 +1,436 @@
+"""Load test driving the endpoints of every blueprint at a given concurrency.
+
+Boots create_app against ``--database-uri`` (a temporary SQLite file by
+default), which must be empty, and seeds it with common.seed_dataset:
+``--usuarios`` users, ``--boards`` boards of ``--proyectos`` projects,
+``--tareas`` tasks and ``--comentarios`` comments. By default that is 100k
+tasks and 1M comments. All users share the password ``loadtest``.
+
+Each scenario then sends ``--requests`` requests from ``--concurrency``
+threads. Every thread acts as the owner of one board and has its own test
+client. Requests, and whatever rows they need (e.g. the row a DELETE
+removes), are prepared before the clock starts.
+
+For every scenario the report gives:
+
+- req/s
+- latency percentiles
+- the status codes received, with the scenario marked ``failed`` when any
+  of them is a 5xx
+- database calls per request (SQL statements plus procedure calls, read
+  from the metrics middleware)
+
+Requests are served in process, so the numbers leave out the network and
+the WSGI server.
+
+Scenarios whose endpoints run stored procedures need MySQL. On SQLite they
+are skipped and listed under ``skipped``. ``--scenarios`` takes regular
+expressions to run only some of the scenarios.
+
+With ``--socket-clients``, that many Socket.IO test clients join the boards'
+rooms. While they listen, the card move scenario runs again. The report
+then adds how long connecting and joining took and how many events reached
+the clients.
+
+The result is printed as JSON and written to ``--output`` if given. With
+``--baseline`` (a previous ``--output``), each scenario also gets its change
+in req/s and p95 against the baseline. Failed scenarios are listed under
+``failed`` and make the run exit with status 1, after the report is written.
+"""
+import collections
+import io
+import itertools
+import json
+import os
+import re
+import shutil
+import random
+import tempfile
+import threading
+import time
+from werkzeug.security import generate_password_hash
+from app import create_app, db, audit, metrics, socketio, search
+from app import stats as project_stats
+from app.models import Usuario, PerfilUsuario, Tarea, Comentario, Notificacion, Etiqueta, TareaEtiqueta
+from config import Config, DevelopmentConfig
+from .common import base_parser, make_token, seed_dataset, summarize, report
+
+PASSWORD = 'loadtest'
+BULK_ITEMS = 100
+
+Scenario = collections.namedtuple('Scenario', ['name', 'endpoint', 'procedures', 'build'])
+_unique = itertools.count(1)
+
+
+class Worker:
+    """One simulated client: the owner of ``board_id``, with its own test client."""
+
+    def __init__(self, app, data, board_id, usuario_id, seed):
+        self.app = app
+        self.data = data
+        self.board_id = board_id
+        self.usuario_id = usuario_id
+        self.email = data['usuarios'][usuario_id]
+        self.client = app.test_client()
+        self.headers = {'x-access-tokens': make_token(app, usuario_id)}
+        self.rnd = random.Random(seed)
+
+    def tarea(self):
+        return self.rnd.choice(self.data['tareas'][self.board_id])
+
+    def proyecto(self):
+        return self.rnd.choice(self.data['proyectos'][self.board_id])
+
+    def any_id(self, key):
+        return self.rnd.randint(*self.data[key])
+
+    def usuario(self):
+        return self.rnd.choice(self.data['usuario_ids'])
+
+    def insert(self, model, **values):
+        """Insert a row outside the timed requests and return its id."""
+        with self.app.app_context():
+            result = db.session.execute(model.__table__.insert().values(**values))
+            db.session.commit()
+            return result.inserted_primary_key[0]
+
+    def upload(self):
+        response = self.client.post('/api/tareas/%d/adjuntos' % self.tarea()[0], headers=self.headers,
+                                    data={'file': attachment()}, content_type='multipart/form-data')
+        return response.get_json()['AdjuntoID']
+
+
+def attachment():
+    n = next(_unique)
+    return io.BytesIO(b'adjunto %d\n' % n * 400), 'adjunto-%d.txt' % n
+
+
+def usuario_body(email):
+    return {'Nombre': 'Carga', 'Apellido': 'Prueba', 'CorreoElectronico': email,
+            'PasswordHash': PASSWORD, 'Password': PASSWORD}
+
+
+def get(path):
+    return lambda w: ('GET', path, {})
+
+
+def scenarios():
+    def tarea_etiqueta(w):
+        tarea_id = w.tarea()[0]
+        etiqueta_id = w.insert(Etiqueta, Nombre='Carga %d' % next(_unique))
+        return tarea_id, etiqueta_id
+
+    def add_etiqueta(w):
+        tarea_id, etiqueta_id = tarea_etiqueta(w)
+        return 'POST', '/api/tareas/%d/etiquetas' % tarea_id, {'json': {'TareaID': tarea_id, 'EtiquetaID': etiqueta_id}}
+
+    def remove_etiqueta(w):
+        tarea_id, etiqueta_id = tarea_etiqueta(w)
+        w.insert(TareaEtiqueta, TareaID=tarea_id, EtiquetaID=etiqueta_id)
+        return 'DELETE', '/api/tareas/%d/etiquetas/%d' % (tarea_id, etiqueta_id), {}
+
+    def move(w):
+        tarea_id, proyecto_id = w.tarea()
+        return 'POST', '/api/tareas/%d/move' % tarea_id, {
+            'json': {'ColumnaID': w.rnd.choice(w.data['columnas'][proyecto_id])}}
+
+    def create_bulk(w):
+        return 'POST', '/api/tareas/bulk', {'json': [
+            {'ProyectoID': w.proyecto(), 'Titulo': 'Carga %d' % next(_unique), 'Importancia': w.rnd.randint(1, 5)}
+            for _ in range(BULK_ITEMS)]}
+
+    def update_bulk(w):
+        return 'PATCH', '/api/tareas/bulk', {'json': [
+            {'TareaID': w.tarea()[0], 'Estado': w.rnd.choice(('pendiente', 'en_proceso', 'completada'))}
+            for _ in range(BULK_ITEMS)]}
+
+    return [
+        Scenario('auth.login', 'auth.login', False, lambda w: (
+            'POST', '/api/auth/login', {'json': {'CorreoElectronico': w.email, 'Password': PASSWORD}})),
+
+        Scenario('usuarios.list', 'usuarios.get_usuarios', True, get('/api/usuarios?limit=50')),
+        Scenario('usuarios.get', 'usuarios.get_usuario', True, lambda w: ('GET', '/api/usuarios/%d' % w.usuario(), {})),
+        Scenario('usuarios.create', 'usuarios.create_usuario', True, lambda w: (
+            'POST', '/api/usuarios', {'json': usuario_body('carga%d@example.com' % next(_unique))})),
+        Scenario('usuarios.update', 'usuarios.update_usuario', True, lambda w: (
+            'PUT', '/api/usuarios/%d' % w.usuario_id, {'json': usuario_body(w.email)})),
+        Scenario('usuarios.delete', 'usuarios.delete_usuario', True, lambda w: (
+            'DELETE', '/api/usuarios/%d' % w.insert(
+                Usuario, Nombre='Carga', Apellido='Prueba', PasswordHash='x',
+                CorreoElectronico='borrar%d@example.com' % next(_unique)), {})),
+
+        Scenario('perfiles.list', 'perfiles.get_perfiles', True, get('/api/perfiles?limit=50')),
+        Scenario('perfiles.get', 'perfiles.get_perfil', True, lambda w: (
+            'GET', '/api/perfiles/%d' % w.any_id('perfiles'), {})),
+        Scenario('perfiles.create', 'perfiles.create_perfil', True, lambda w: (
+            'POST', '/api/perfiles', {'json': {'UsuarioID': w.usuario_id, 'Biografia': 'Carga'}})),
+        Scenario('perfiles.update', 'perfiles.update_perfil', True, lambda w: (
+            'PUT', '/api/perfiles/%d' % w.any_id('perfiles'), {'json': {'UsuarioID': w.usuario_id, 'Ocupacion': 'QA'}})),
+        Scenario('perfiles.delete', 'perfiles.delete_perfil', True, lambda w: (
+            'DELETE', '/api/perfiles/%d' % w.insert(PerfilUsuario, UsuarioID=w.usuario_id), {})),
+
+        Scenario('tareas.list', 'tareas.get_tareas', True, get('/api/tareas?limit=50')),
+        Scenario('tareas.list_filtered', 'tareas.get_tareas', False, lambda w: (
+            'GET', '/api/tareas?estado=pendiente,en_proceso&proyecto_id=%d&limit=50' % w.proyecto(), {})),
+        Scenario('tareas.get', 'tareas.get_tarea', True, lambda w: ('GET', '/api/tareas/%d' % w.tarea()[0], {})),
+        Scenario('tareas.create', 'tareas.create_tarea', True, lambda w: (
+            'POST', '/api/tareas', {'json': {'ProyectoID': w.proyecto(), 'Titulo': 'Carga %d' % next(_unique)}})),
+        Scenario('tareas.update', 'tareas.update_tarea', True, lambda w: (
+            'PUT', '/api/tareas/%d' % w.tarea()[0], {'json': {'Importancia': w.rnd.randint(1, 5)}})),
+        Scenario('tareas.delete', 'tareas.delete_tarea', True, lambda w: (
+            'DELETE', '/api/tareas/%d' % w.insert(Tarea, ProyectoID=w.proyecto(), Titulo='Borrar'), {})),
+        Scenario('tareas.move', 'tareas.move_tarea_route', False, move),
+        Scenario('tareas.create_bulk', 'tareas.create_tareas_bulk', False, create_bulk),
+        Scenario('tareas.update_bulk', 'tareas.update_tareas_bulk', False, update_bulk),
+
+        Scenario('comentarios.list', 'comentarios.get_comentarios', True, get('/api/comentarios?limit=50')),
+        Scenario('comentarios.get', 'comentarios.get_comentario', True, lambda w: (
+            'GET', '/api/comentarios/%d' % w.any_id('comentarios'), {})),
+        Scenario('comentarios.create', 'comentarios.create_comentario', True, lambda w: (
+            'POST', '/api/comentarios', {'json': {'TareaID': w.tarea()[0], 'UsuarioID': w.usuario_id,
+                                                  'Texto': 'Comentario de carga %d' % next(_unique)}})),
+        Scenario('comentarios.update', 'comentarios.update_comentario', True, lambda w: (
+            'PUT', '/api/comentarios/%d' % w.any_id('comentarios'),
+            {'json': {'TareaID': w.tarea()[0], 'UsuarioID': w.usuario_id, 'Texto': 'Comentario editado'}})),
+        Scenario('comentarios.delete', 'comentarios.delete_comentario', True, lambda w: (
+            'DELETE', '/api/comentarios/%d' % w.insert(
+                Comentario, TareaID=w.tarea()[0], UsuarioID=w.usuario_id, Texto='Borrar'), {})),
+
+        Scenario('notificaciones.list', 'notificaciones.get_notificaciones', True,
+                 get('/api/notificaciones?limit=50')),
+        Scenario('notificaciones.bandeja', 'notificaciones.get_bandeja', True,
+                 get('/api/notificaciones/bandeja?leida=false&limit=50')),
+        Scenario('notificaciones.no_leidas', 'notificaciones.get_no_leidas', True, get('/api/notificaciones/no-leidas')),
+        Scenario('notificaciones.get', 'notificaciones.get_notificacion', True, lambda w: (
+            'GET', '/api/notificaciones/%d' % w.any_id('notificaciones'), {})),
+        Scenario('notificaciones.create', 'notificaciones.create_notificacion', True, lambda w: (
+            'POST', '/api/notificaciones', {'json': {'UsuarioID': w.usuario(), 'Mensaje': 'Aviso de carga'}})),
+        Scenario('notificaciones.update', 'notificaciones.update_notificacion', True, lambda w: (
+            'PUT', '/api/notificaciones/%d' % w.any_id('notificaciones'),
+            {'json': {'UsuarioID': w.usuario_id, 'Mensaje': 'Aviso editado', 'Leida': True}})),
+        Scenario('notificaciones.marcar_leidas', 'notificaciones.marcar_leidas', True, lambda w: (
+            'POST', '/api/notificaciones/marcar-leidas', {})),
+        Scenario('notificaciones.delete', 'notificaciones.delete_notificacion', True, lambda w: (
+            'DELETE', '/api/notificaciones/%d' % w.insert(Notificacion, UsuarioID=w.usuario_id, Mensaje='Borrar'), {})),
+
+        Scenario('etiquetas.list', 'etiquetas.get_etiquetas', True, get('/api/etiquetas?limit=50')),
+        Scenario('etiquetas.get', 'etiquetas.get_etiqueta', True, lambda w: (
+            'GET', '/api/etiquetas/%d' % w.rnd.choice(w.data['etiquetas']), {})),
+        Scenario('etiquetas.create', 'etiquetas.create_etiqueta', True, lambda w: (
+            'POST', '/api/etiquetas', {'json': {'Nombre': 'Carga %d' % next(_unique)}})),
+        Scenario('etiquetas.update', 'etiquetas.update_etiqueta', True, lambda w: (
+            'PUT', '/api/etiquetas/%d' % w.rnd.choice(w.data['etiquetas']), {'json': {'Nombre': 'Etiqueta editada'}})),
+        Scenario('etiquetas.delete', 'etiquetas.delete_etiqueta', True, lambda w: (
+            'DELETE', '/api/etiquetas/%d' % w.insert(Etiqueta, Nombre='Borrar'), {})),
+        Scenario('etiquetas.add_to_tarea', 'etiquetas.add_etiqueta_to_tarea', True, add_etiqueta),
+        Scenario('etiquetas.remove_from_tarea', 'etiquetas.remove_etiqueta_from_tarea', True, remove_etiqueta),
+
+        Scenario('adjuntos.upload', 'adjuntos.upload_adjunto', True, lambda w: (
+            'POST', '/api/tareas/%d/adjuntos' % w.tarea()[0],
+            {'data': {'file': attachment()}, 'content_type': 'multipart/form-data'})),
+        Scenario('adjuntos.get', 'adjuntos.get_adjunto', True, lambda w: (
+            'GET', '/api/adjuntos/%d' % w.rnd.choice(w.data['adjuntos']), {})),
+        Scenario('adjuntos.download', 'adjuntos.download_adjunto', True, lambda w: (
+            'GET', '/api/adjuntos/%d/content' % w.rnd.choice(w.data['adjuntos']), {})),
+        Scenario('adjuntos.preview', 'adjuntos.preview_adjunto', True, lambda w: (
+            'GET', '/api/adjuntos/%d/preview' % w.rnd.choice(w.data['adjuntos']), {})),
+        Scenario('adjuntos.delete', 'adjuntos.delete_adjunto', True, lambda w: (
+            'DELETE', '/api/adjuntos/%d' % w.upload(), {})),
+
+        Scenario('boards.list', 'boards.get_boards', False, get('/api/boards')),
+        Scenario('boards.create', 'boards.create_board', False, lambda w: (
+            'POST', '/api/boards', {'json': {'UsuarioPropietarioID': w.usuario_id, 'Titulo': 'Carga'}})),
+        Scenario('boards.snapshot', 'boards.get_board_snapshot', False, lambda w: (
+            'GET', '/api/boards/%d/snapshot' % w.board_id, {})),
+        Scenario('boards.stats', 'boards.get_board_stats', False, lambda w: (
+            'GET', '/api/boards/%d/stats' % w.board_id, {})),
+
+        Scenario('proyectos.list', 'proyectos.get_proyectos', False, get('/api/proyectos')),
+        Scenario('proyectos.create', 'proyectos.create_proyecto', False, lambda w: (
+            'POST', '/api/proyectos', {'json': {'BoardID': w.board_id, 'Titulo': 'Carga'}})),
+        Scenario('proyectos.stats', 'proyectos.get_proyecto_stats', False, lambda w: (
+            'GET', '/api/proyectos/%d/stats' % w.proyecto(), {})),
+
+        Scenario('search', 'search.search_documents', False, lambda w: (
+            'GET', '/api/search?q=tarea+%d&limit=20' % w.rnd.randint(0, 999), {})),
+        Scenario('auditoria', 'auditoria.get_audit_logs', False, get('/api/auditoria?limit=50')),
+        Scenario('metrics', 'metrics', False, get('/metrics')),
+        Scenario('admin.procedures', 'admin.get_procedure_stats', False, get('/api/admin/procedures')),
+        Scenario('admin.reset', 'admin.reset_procedure_stats', False, lambda w: ('DELETE', '/api/admin/procedures', {})),
+    ]
+
+
+def run_scenario(scenario, workers, n_requests):
+    """Send ``n_requests`` requests of ``scenario`` spread over ``workers``, one thread each."""
+    plans = [[scenario.build(w) for _ in range(n_requests // len(workers) + (i < n_requests % len(workers)))]
+             for i, w in enumerate(workers)]
+    metrics.reset()
+    latencies, statuses = [], collections.Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(workers) + 1)
+
+    def work(worker, plan):
+        samples, codes = [], collections.Counter()
+        barrier.wait()
+        for method, path, kwargs in plan:
+            start = time.perf_counter()
+            response = worker.client.open(path, method=method, headers=worker.headers, **kwargs)
+            response.get_data()
+            samples.append(time.perf_counter() - start)
+            codes[response.status_code] += 1
+            response.close()
+        with lock:
+            latencies.extend(samples)
+            statuses.update(codes)
+
+    threads = [threading.Thread(target=work, args=(w, plan)) for w, plan in zip(workers, plans)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    count, total = metrics.db_calls.totals((scenario.endpoint,))
+    return dict(summarize(latencies), **{
+        'req_per_s': round(len(latencies) / elapsed, 1),
+        'status': {str(code): n for code, n in sorted(statuses.items())},
+        'failed': any(code >= 500 for code in statuses),
+        'db_calls_per_request': round(total / count, 2) if count else None,
+    })
+
+
+def run_socketio(app, data, workers, n_clients, n_requests, scenario):
+    """Move cards while ``n_clients`` Socket.IO clients listen on the boards' rooms."""
+    clients, connect = [], []
+    tokens = {}
+    for i in range(n_clients):
+        board_id, owner_id = data['boards'][i % len(data['boards'])]
+        token = tokens.get(owner_id) or tokens.setdefault(owner_id, make_token(app, owner_id))
+        start = time.perf_counter()
+        client = socketio.test_client(app, auth={'token': token})
+        client.emit('join_board', {'BoardID': board_id})
+        connect.append(time.perf_counter() - start)
+        client.get_received()
+        clients.append(client)
+    moves = run_scenario(scenario, workers, n_requests)
+    received = sum(len(client.get_received()) for client in clients)
+    for client in clients:
+        client.disconnect()
+    return {
+        'clients': n_clients,
+        'connect_and_join': summarize(connect),
+        'moves': moves,
+        'events_received': received,
+        'events_per_move': round(received / n_requests, 2),
+    }
+
+
+def compare(results, baseline):
+    """Per-scenario change against ``baseline``, in percent."""
+    deltas = {}
+    for name, result in results.items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before or not before.get('req_per_s') or not before.get('p95_ms'):
+            continue
+        deltas[name] = {
+            'req_per_s_pct': round((result['req_per_s'] - before['req_per_s']) / before['req_per_s'] * 100, 1),
+            'p95_ms_pct': round((result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100, 1),
+        }
+    return deltas
+
+
+def main():
+    parser = base_parser(__doc__)
+    parser.add_argument('--usuarios', type=int, default=1000)
+    parser.add_argument('--boards', type=int, default=100)
+    parser.add_argument('--proyectos', type=int, default=5, help='projects per board')
+    parser.add_argument('--tareas', type=int, default=100000)
+    parser.add_argument('--comentarios', type=int, default=1000000)
+    parser.add_argument('--notificaciones', type=int, default=100000)
+    parser.add_argument('--no-search-index', action='store_true', help='skip indexing the seeded rows')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help='requests per scenario')
+    parser.add_argument('--scenarios', nargs='*', default=None, help='regular expressions of scenarios to run')
+    parser.add_argument('--socket-clients', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    uri = args.database_uri or 'sqlite:///' + os.path.join(workdir, 'loadtest.db')
+    config = type('LoadTestConfig', (DevelopmentConfig if uri.startswith('sqlite') else Config,), {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'ADJUNTOS_DIR': os.path.join(workdir, 'adjuntos'),
+        'AUDIT_ARCHIVE_DIR': os.path.join(workdir, 'audit_archive'),
+    })
+    app = create_app(config)
+    try:
+        with app.app_context():
+            db.create_all()
+            if db.session.query(Usuario.UsuarioID).first() is not None:
+                raise SystemExit('The load test seeds its own data; %s must be empty.' % uri.split('@')[-1])
+            start = time.perf_counter()
+            data = seed_dataset(n_usuarios=args.usuarios, n_boards=args.boards, n_proyectos=args.proyectos,
+                                n_tareas=args.tareas, n_comentarios=args.comentarios,
+                                n_notificaciones=args.notificaciones,
+                                password_hash=generate_password_hash(PASSWORD), seed=args.seed)
+            project_stats.rebuild()
+            if not args.no_search_index:
+                search.rebuild()
+            seed_seconds = round(time.perf_counter() - start, 1)
+            data['usuario_ids'] = list(data['usuarios'])
+            data['perfiles'] = tuple(db.session.query(db.func.min(PerfilUsuario.PerfilID),
+                                                      db.func.max(PerfilUsuario.PerfilID)).one())
+            dialect = db.engine.dialect.name
+            has_procedures = dialect != 'sqlite'
+        app.config['ADMIN_USUARIO_IDS'] = frozenset(owner for _, owner in data['boards'])
+
+        workers = [Worker(app, data, board_id, owner_id, args.seed + i)
+                   for i, (board_id, owner_id) in
+                   zip(range(args.concurrency), itertools.cycle(data['boards']))]
+        if has_procedures:
+            data['adjuntos'] = [workers[0].upload() for _ in range(20)]
+
+        selected = [s for s in scenarios()
+                    if not args.scenarios or any(re.search(p, s.name) for p in args.scenarios)]
+        results, skipped = {}, []
+        for scenario in selected:
+            if scenario.procedures and not has_procedures:
+                skipped.append(scenario.name)
+                continue
+            results[scenario.name] = run_scenario(scenario, workers, args.requests)
+
+        output = {
+            'database': dialect,
+            'dataset': {'usuarios': args.usuarios, 'boards': args.boards, 'proyectos_por_board': args.proyectos,
+                        'tareas': args.tareas, 'comentarios': args.comentarios,
+                        'notificaciones': args.notificaciones, 'seed_seconds': seed_seconds},
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'scenarios': results,
+            'skipped': skipped,
+            'failed': [name for name, result in results.items() if result['failed']],
+        }
+        if args.socket_clients:
+            move = next(s for s in scenarios() if s.name == 'tareas.move')
+            output['socketio'] = run_socketio(app, data, workers, args.socket_clients, args.requests, move)
+            if output['socketio']['moves']['failed']:
+                output['failed'].append('socketio')
+        if args.baseline:
+            with open(args.baseline) as f:
+                output['vs_baseline'] = compare(results, json.load(f))
+        report('loadtest', **output)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(dict(benchmark='loadtest', **output), f, indent=2, default=str)
+    finally:
+        # Write the queued audit records before their database goes away.
+        audit.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    if output['failed']:
+        raise SystemExit('Server errors in: %s' % ', '.join(output['failed']))
+
+
+if __name__ == '__main__':
+    main()